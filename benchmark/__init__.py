@@ -0,0 +1,7 @@
+# Μετρήσεις απόδοσης του Optic με συνθετικά δεδομένα, χωρίς γραφικό περιβάλλον.
+#
+#   python -m benchmark --sizes 1000,10000,100000 --storage journal,sqlite
+#
+# Τα αρχεία δεδομένων δημιουργούνται σε προσωρινό φάκελο και η αναφορά
+# γράφεται σε JSON. Με --baseline δίνεται παλαιότερη αναφορά για σύγκριση: αν
+# κάποια λειτουργία έγινε πιο αργή από το όριο, ο κωδικός εξόδου είναι 1.
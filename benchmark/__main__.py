@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmark',
+                                     description="Μετρήσεις απόδοσης του Optic με συνθετικά δεδομένα")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="μεγέθη συνόλων δεδομένων, έως 1000000 (προεπιλογή: %(default)s)")
+    parser.add_argument('--storage', default='journal',
+                        help="csv, journal ή sqlite, χωρισμένα με κόμμα (προεπιλογή: %(default)s)")
+    parser.add_argument('--scenarios', default='load,search,sale,cart,scan,import,rename,delete')
+    parser.add_argument('--operations', type=int, default=50,
+                        help="επαναλήψεις ανά σενάριο (προεπιλογή: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="επαναλήψεις της φόρτωσης")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_report.json')
+    parser.add_argument('--baseline', help="παλαιότερη αναφορά για σύγκριση")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="επιτρεπτή αύξηση του p95 σε σχέση με το baseline (προεπιλογή: %(default)s)")
+    parser.add_argument('--workdir', help="φάκελος για τα δεδομένα, κρατιέται μετά το τέλος")
+    return parser.parse_args(argv)
+
+def compare(report, baseline, tolerance):
+    # Οι πολύ γρήγορες λειτουργίες (κάτω από 1 ms) αγνοούνται, γιατί ο θόρυβος
+    # της μέτρησης είναι μεγαλύτερος από τη διαφορά
+    previous = {}
+    for run in baseline.get('runs', []):
+        for name, values in run['scenarios'].items():
+            previous[(run['storage'], run['size'], name)] = values['p95_ms']
+    regressions = []
+    for run in report['runs']:
+        for name, values in run['scenarios'].items():
+            before = previous.get((run['storage'], run['size'], name))
+            after = values['p95_ms']
+            if before is not None and after > 1 and after > before * (1 + tolerance):
+                regressions.append({'storage': run['storage'], 'size': run['size'], 'operation': name,
+                                    'baseline_p95_ms': before, 'p95_ms': after})
+    return regressions
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    storages = [kind.strip() for kind in args.storage.split(',') if kind.strip()]
+    selected = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix='optic-benchmark-')
+    os.makedirs(workdir, exist_ok=True)
+    # Το optic δουλεύει με αρχεία στον τρέχοντα φάκελο και δημιουργεί μερικά
+    # ήδη κατά το import, οπότε εισάγεται αφού αλλάξει ο φάκελος
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    from benchmark import datasets, scenarios
+
+    for kind in storages:
+        if kind not in scenarios.STORAGES:
+            raise SystemExit(f"Άγνωστος τρόπος αποθήκευσης: {kind}")
+    for name in selected:
+        if name not in scenarios.SCENARIOS:
+            raise SystemExit(f"Άγνωστο σενάριο: {name}")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'operations': args.operations,
+        'repeat': args.repeat,
+        'runs': [],
+    }
+    try:
+        for size in sizes:
+            data_dir = os.path.join(workdir, f"data-{size}")
+            started = time.perf_counter()
+            dataset = datasets.generate(data_dir, size, seed=args.seed)
+            dataset['generate_s'] = round(time.perf_counter() - started, 3)
+            print(f"{size} εγγραφές: δεδομένα σε {dataset['generate_s']} s", flush=True)
+            for kind in storages:
+                run_dir = os.path.join(workdir, f"{kind}-{size}")
+                shutil.rmtree(run_dir, ignore_errors=True)
+                shutil.copytree(data_dir, run_dir)
+                os.chdir(run_dir)
+                try:
+                    run = scenarios.BenchmarkRun(kind, args.operations, args.repeat, args.seed)
+                    measured, internals = run.run(selected)
+                finally:
+                    os.chdir(workdir)
+                report['runs'].append({'storage': kind, 'size': size, 'dataset': dataset,
+                                       'scenarios': measured, 'internals': internals})
+                for name, values in measured.items():
+                    print(f"  {kind:8} {name:22} p50 {values['p50_ms']:>10.3f} ms"
+                          f"  p95 {values['p95_ms']:>10.3f} ms  max {values['max_ms']:>10.3f} ms", flush=True)
+    finally:
+        os.chdir(previous_dir)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if baseline is not None:
+        report['regressions'] = compare(report, baseline, args.tolerance)
+    with open(output, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Η αναφορά γράφτηκε στο {output}")
+    if report.get('regressions'):
+        for item in report['regressions']:
+            print(f"Πιο αργό: {item['storage']} {item['size']} {item['operation']}: "
+                  f"{item['baseline_p95_ms']} -> {item['p95_ms']} ms")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import csv
+import os
+import random
+from array import array
+from datetime import datetime, timedelta
+
+import optic
+
+# Συνθετικά αλλά ρεαλιστικά δεδομένα για τα τέσσερα αρχεία CSV. Με τον ίδιο
+# seed και το ίδιο μέγεθος παράγονται πάντα ακριβώς τα ίδια αρχεία.
+
+MALE_NAMES = [
+    "Γιώργος", "Δημήτρης", "Κωνσταντίνος", "Νίκος", "Γιάννης", "Παναγιώτης", "Βασίλης",
+    "Χρήστος", "Αθανάσιος", "Μιχάλης", "Ευάγγελος", "Σπύρος", "Αντώνης", "Θεόδωρος",
+    "Ηλίας", "Σταύρος", "Αλέξανδρος", "Πέτρος", "Εμμανουήλ", "Στέλιος", "Άγγελος",
+    "Λευτέρης", "Θανάσης", "Φώτης", "Μάριος", "Άρης", "Στέφανος", "Ζήσης",
+]
+FEMALE_NAMES = [
+    "Μαρία", "Ελένη", "Αικατερίνη", "Βασιλική", "Σοφία", "Αγγελική", "Γεωργία",
+    "Δήμητρα", "Κωνσταντίνα", "Ευαγγελία", "Ιωάννα", "Χριστίνα", "Παρασκευή", "Ειρήνη",
+    "Αναστασία", "Δέσποινα", "Φωτεινή", "Αθηνά", "Ζωή", "Στυλιανή", "Χαρίκλεια",
+    "Ευτυχία", "Ολυμπία", "Ραλλού", "Νεφέλη", "Μυρτώ", "Ξανθή", "Θεοπίστη",
+]
+SURNAME_STEMS = [
+    "Παπαδ", "Γεωργ", "Νικολ", "Δημητρ", "Κωνσταντιν", "Αντων", "Βασιλ", "Χριστ",
+    "Ιωανν", "Παναγιωτ", "Σταυρ", "Μιχαηλ", "Αθανασ", "Ευαγγελ", "Σπυρ", "Θεοδωρ",
+    "Αλεξ", "Πετρ", "Μαρκ", "Λαμπρ", "Στεφαν", "Κυριακ", "Μανωλ", "Φωτ", "Ζαχαρ",
+    "Καλ", "Ραπτ", "Τσαμ", "Μαυρ", "Κοντ", "Λιακ", "Σαρ", "Χατζ", "Πολυχρον",
+    "Ηλι", "Τριαντ", "Ανδρε", "Καραγιανν", "Μπακ", "Ρουσ", "Ξεν", "Ζερβ",
+]
+# Κατάληξη ανδρικού και γυναικείου επωνύμου
+SURNAME_SUFFIXES = [
+    ("όπουλος", "οπούλου"), ("άκης", "άκη"), ("ίδης", "ίδου"),
+    ("άτος", "άτου"), ("ίου", "ίου"), ("έας", "έα"),
+]
+STREETS = [
+    "Ερμού", "Αθηνάς", "Πανεπιστημίου", "Σταδίου", "Ακαδημίας", "Βασιλίσσης Σοφίας",
+    "Λεωφ. Κηφισίας", "Αγίου Δημητρίου", "Τσιμισκή", "Εγνατίας", "Μητροπόλεως",
+    "25ης Μαρτίου", "Ελευθερίου Βενιζέλου", "Κολοκοτρώνη", "Καραϊσκάκη", "Μιαούλη",
+    "Ανδρέα Παπανδρέου", "Αριστοτέλους", "Πλαστήρα", "Ιπποκράτους", "Σολωμού",
+]
+CITIES = [
+    "Αθήνα", "Θεσσαλονίκη", "Πάτρα", "Ηράκλειο", "Λάρισα", "Βόλος", "Ιωάννινα",
+    "Χανιά", "Καλαμάτα", "Σέρρες", "Κομοτηνή", "Τρίπολη", "Κέρκυρα", "Ρόδος",
+]
+# Τα σχέδια είναι το πιο αργό κομμάτι της δημιουργίας, οπότε οι συνταγές
+# διαλέγουν από ένα σύνολο έτοιμων σχεδίων
+DRAWING_POOL = 500
+
+EMAIL_DOMAINS = ["gmail.com", "yahoo.gr", "hotmail.com", "otenet.gr", "outlook.com"]
+
+CATEGORIES = {
+    "Σκελετοί οράσεως": (60, 320),
+    "Γυαλιά ηλίου": (40, 280),
+    "Φακοί οράσεως": (25, 180),
+    "Φακοί επαφής": (15, 60),
+    "Υγρά φακών": (6, 18),
+    "Θήκες": (4, 25),
+    "Αξεσουάρ": (3, 20),
+}
+BRANDS = ["Ray-Ban", "Oakley", "Persol", "Vogue", "Carrera", "Police", "Polaroid",
+          "Essilor", "Hoya", "Zeiss", "Acuvue", "Bausch", "Optica"]
+COLORS = ["μαύρο", "ταρταρούγα", "χρυσό", "ασημί", "μπλε", "διάφανο", "κόκκινο"]
+
+NOTE_PHRASES = [
+    "Παράπονο για θολή όραση στο διάβασμα.",
+    "Προτιμά ελαφριούς σκελετούς.",
+    "Να ειδοποιηθεί όταν έρθουν οι φακοί.",
+    "Έλεγχος ξανά σε έξι μήνες.",
+    "Φοράει φακούς επαφής μόνο τα Σαββατοκύριακα.",
+    "Ζήτησε αντιθαμβωτική επίστρωση.",
+    "Πονοκέφαλοι μετά από πολλές ώρες στον υπολογιστή.",
+    "Πληρωμή με κάρτα, απόδειξη στο email.",
+    "Ευαισθησία στο φως, προτάθηκαν φωτοχρωμικοί φακοί.",
+]
+
+GREEKLISH = str.maketrans({
+    'α': 'a', 'ά': 'a', 'β': 'v', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'έ': 'e', 'ζ': 'z',
+    'η': 'i', 'ή': 'i', 'θ': 'th', 'ι': 'i', 'ί': 'i', 'ϊ': 'i', 'ΐ': 'i', 'κ': 'k',
+    'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'x', 'ο': 'o', 'ό': 'o', 'π': 'p', 'ρ': 'r',
+    'σ': 's', 'ς': 's', 'τ': 't', 'υ': 'y', 'ύ': 'y', 'ϋ': 'y', 'φ': 'f', 'χ': 'ch',
+    'ψ': 'ps', 'ω': 'o', 'ώ': 'o', '-': '',
+})
+
+# Ο πολλαπλασιαστής είναι πρώτος ως προς 10^8 και 10^9, οπότε κάθε δείκτης
+# πελάτη δίνει διαφορετικό τηλέφωνο
+PHONE_MULTIPLIER = 48271
+
+def greeklish(text):
+    return text.lower().replace('ου', 'ou').replace('ού', 'ou').translate(GREEKLISH)
+
+def customer_phone(index):
+    # Ένας στους πέντε έχει σταθερό, οι υπόλοιποι κινητό
+    index += 1
+    if index % 5 == 0:
+        return '2' + f"{(index * PHONE_MULTIPLIER) % 10 ** 9:09d}"
+    return '69' + f"{(index * PHONE_MULTIPLIER) % 10 ** 8:08d}"
+
+def random_surname(rng, female):
+    stem = rng.choice(SURNAME_STEMS)
+    suffix = rng.choice(SURNAME_SUFFIXES)[1 if female else 0]
+    return stem + suffix
+
+def random_drawing(rng, legacy=False):
+    # Μερικές ελεύθερες γραμμές μέσα σε ένα από τα μοιρογνωμόνια
+    cx, cy, _ = rng.choice(optic.PrescriptionRenderer.PROTRACTORS)
+    radius = optic.PrescriptionRenderer.RADIUS
+    polylines = []
+    for _ in range(rng.randint(1, 4)):
+        x = cx + rng.uniform(-radius, radius)
+        y = cy - rng.uniform(0, radius)
+        points = [(x, y)]
+        for _ in range(rng.randint(10, 80)):
+            x = min(max(x + rng.uniform(-6, 6), cx - radius), cx + radius)
+            y = min(max(y + rng.uniform(-6, 6), cy - radius), cy)
+            points.append((x, y))
+        polylines.append(points)
+    if legacy:
+        # Η παλιά μορφή: str() μιας λίστας τμημάτων
+        return str([(int(x1), int(y1), int(x2), int(y2))
+                    for points in polylines for (x1, y1), (x2, y2) in zip(points, points[1:])])
+    return optic.encode_drawing(polylines)
+
+def random_lens(rng):
+    sph = rng.choice(range(-32, 25)) * 0.25
+    cyl = rng.choice(range(-12, 1)) * 0.25
+    return [f"{sph:+.2f}", f"{cyl:+.2f}" if cyl else "", str(rng.randrange(0, 181, 5)) if cyl else ""]
+
+def ean13(number):
+    # Barcode EAN-13 με πρόθεμα Ελλάδας (520) και ψηφίο ελέγχου
+    digits = f"520{number:09d}"
+    check = (10 - sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits)) % 10) % 10
+    return digits + str(check)
+
+def random_timestamp(rng, start):
+    moment = start + timedelta(seconds=rng.randrange(5 * 365 * 24 * 3600))
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+def _writer(path, headers):
+    file = open(path, mode='w', newline='', encoding='utf-8', buffering=optic.WRITE_BUFFER_SIZE)
+    writer = csv.writer(file)
+    writer.writerow(headers)
+    return file, writer
+
+def generate(directory, size, seed=42, drawing_ratio=0.5, legacy_ratio=0.1):
+    # Δημιουργεί στο directory τα αρχεία πελατών, αποθήκης, συνταγών και
+    # σημειώσεων, με size εγγραφές το καθένα. Επιστρέφει στοιχεία του συνόλου.
+    rng = random.Random(f"{seed}:{size}")
+    start = datetime(2020, 1, 1)
+    os.makedirs(directory, exist_ok=True)
+
+    # Οι συνταγές και οι σημειώσεις μοιράζονται πρώτα, ώστε οι σημαίες των
+    # πελατών να γράφονται με τη μία. Ένας στους πενήντα πελάτες είναι τακτικός
+    # και έχει πολλές συνταγές.
+    regulars = max(size // 50, 1)
+    prescription_owners = array('l', (rng.randrange(regulars) * 50 % size if rng.random() < 0.3
+                                      else rng.randrange(size) for _ in range(size)))
+    note_owners = array('l', (rng.randrange(size) for _ in range(size)))
+    flags = bytearray(size)
+    for owner in prescription_owners:
+        flags[owner] |= 1
+    for owner in note_owners:
+        flags[owner] |= 2
+
+    full_names = []
+    used = set()
+    file, writer = _writer(os.path.join(directory, optic.FILE_NAME), optic.CUSTOMER_HEADERS)
+    with file:
+        for index in range(size):
+            female = rng.random() < 0.55
+            name = rng.choice(FEMALE_NAMES if female else MALE_NAMES)
+            surname = random_surname(rng, female)
+            # Οι πελάτες είναι μοναδικοί, όπως απαιτεί ο έλεγχος διπλοεγγραφών
+            while optic.full_name_key(name, surname) in used:
+                surname = random_surname(rng, female) + '-' + random_surname(rng, female)
+            used.add(optic.full_name_key(name, surname))
+            email = (f"{greeklish(name)}.{greeklish(surname)}{index}@{rng.choice(EMAIL_DOMAINS)}"
+                     if rng.random() < 0.6 else "")
+            address = f"{rng.choice(STREETS)} {rng.randint(1, 250)}, {rng.choice(CITIES)}"
+            customer_flags = []
+            if flags[index] & 1:
+                customer_flags.append("Συνταγές")
+            if flags[index] & 2:
+                customer_flags.append("Σημειώσεις")
+            writer.writerow([name, surname, customer_phone(index), email, address, "", ", ".join(customer_flags),
+                             str(index + 1)])
+            full_names.append(f"{name} {surname}")
+    del used
+
+    file, writer = _writer(os.path.join(directory, optic.INVENTORY_FILE), optic.INVENTORY_HEADERS)
+    with file:
+        categories = list(CATEGORIES)
+        for index in range(size):
+            category = rng.choice(categories)
+            low, high = CATEGORIES[category]
+            product = f"{rng.choice(BRANDS)} {category.split()[0][:4].upper()}-{1000 + index} {rng.choice(COLORS)}"
+            # Ένα στα πέντε προϊόντα δεν έχει ακόμα barcode
+            sku = ean13(index) if index % 5 != 4 else ''
+            writer.writerow([product, category, str(rng.randint(0, 40)), str(round(rng.uniform(low, high), 2)), sku])
+
+    drawing_pool = [random_drawing(rng) for _ in range(DRAWING_POOL)]
+    legacy_pool = [random_drawing(rng, legacy=True) for _ in range(DRAWING_POOL // 10)]
+    drawings = 0
+    file, writer = _writer(os.path.join(directory, optic.PRESCRIPTION_CSV), optic.PRESCRIPTION_HEADERS)
+    with file:
+        for owner in prescription_owners:
+            row = [random_timestamp(rng, start), full_names[owner]]
+            for _ in range(2):
+                right, left = random_lens(rng), random_lens(rng)
+                row += right + left + [str(rng.randint(56, 72))]
+            lines = ['', '']
+            if rng.random() < drawing_ratio:
+                pool = legacy_pool if rng.random() < legacy_ratio else drawing_pool
+                lines[rng.randrange(2)] = rng.choice(pool)
+                drawings += 1
+            writer.writerow(row + lines + [str(owner + 1)])
+
+    file, writer = _writer(os.path.join(directory, optic.NOTES_CSV), optic.NOTES_HEADERS)
+    with file:
+        for owner in note_owners:
+            text = " ".join(rng.sample(NOTE_PHRASES, rng.randint(1, 3)))
+            writer.writerow([random_timestamp(rng, start), full_names[owner], text, str(owner + 1)])
+
+    return {
+        'size': size,
+        'seed': seed,
+        'drawings': drawings,
+        'files': {path: os.path.getsize(os.path.join(directory, path))
+                  for path in (optic.FILE_NAME, optic.INVENTORY_FILE, optic.PRESCRIPTION_CSV, optic.NOTES_CSV)},
+    }
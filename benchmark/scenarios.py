@@ -0,0 +1,187 @@
+import csv
+import random
+
+import optic
+
+# Σενάρια χωρίς γραφικό περιβάλλον που αντιστοιχούν στις λειτουργίες του
+# προγράμματος: φόρτωση και εμφάνιση πελατών, αναζήτηση και έλεγχος
+# διπλοεγγραφών, πώληση, καλάθι πολλών προϊόντων, σάρωση barcode, μαζική
+# εισαγωγή πελατών, μετονομασία πελάτη και διαγραφή πελάτη μαζί με τις
+# συνταγές/σημειώσεις του, μέσα από τις ίδιες υπηρεσίες που χρησιμοποιούν τα
+# παράθυρα. Οι χρόνοι κρατιούνται σε ένα ξεχωριστό optic.Metrics.
+
+SCENARIOS = ('load', 'search', 'sale', 'cart', 'scan', 'import', 'rename', 'delete')
+STORAGES = ('csv', 'journal', 'sqlite')
+
+def open_storage(kind):
+    if kind == 'sqlite':
+        return optic.SqliteStorage(optic.STORAGE_DB)
+    if kind == 'csv':
+        return optic.CsvStorage()
+    return optic.JournalStorage()
+
+class BenchmarkRun:
+    # Ένα μέγεθος συνόλου δεδομένων με έναν τρόπο αποθήκευσης. Τρέχει μέσα
+    # στον φάκελο των δεδομένων, όπως το πρόγραμμα.
+    def __init__(self, kind, operations=50, repeat=3, seed=42):
+        self.kind = kind
+        self.operations = operations
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+        self.metrics = optic.Metrics()
+        self.storage = None
+        self.customers = None
+        self.inventory = None
+        self.customer_service = None
+        self.inventory_service = None
+        self.sales = None
+
+    def timer(self, name):
+        return self.metrics.timer(name)
+
+    def prepare(self):
+        if self.kind == 'sqlite':
+            with self.timer('prepare.migrate_sqlite'):
+                optic.migrate_csv_to_sqlite()
+
+    def run(self, scenarios=SCENARIOS):
+        optic.METRICS.reset()
+        self.prepare()
+        try:
+            for name in scenarios:
+                getattr(self, 'run_' + name)()
+        finally:
+            if self.sales is not None:
+                self.sales.close()
+            if self.storage is not None:
+                self.storage.close()
+        return self.metrics.summary(), optic.METRICS.summary()
+
+    def _open(self):
+        if self.storage is None:
+            self.storage = open_storage(self.kind)
+            self.customers = optic.CustomerRepository(self.storage)
+            self.inventory = optic.InventoryRepository(self.storage)
+            self.customer_service = optic.CustomerService(self.customers, self.storage, optic.DocumentStore())
+            self.sales = optic.SalesLedger(self.storage)
+            self.inventory_service = optic.InventoryService(self.inventory, self.sales)
+
+    def run_load(self):
+        # Όπως η εκκίνηση: άνοιγμα αποθήκευσης, φόρτωση και γραμμές της λίστας πελατών
+        for _ in range(self.repeat):
+            with self.timer('load.total'):
+                with self.timer('load.open'):
+                    storage = open_storage(self.kind)
+                with self.timer('load.customers'):
+                    customers = optic.CustomerRepository(storage)
+                with self.timer('load.inventory'):
+                    optic.InventoryRepository(storage)
+                with self.timer('load.display'):
+                    [optic.customer_display_row(row) for row in customers.rows.values()]
+            storage.close()
+
+    def _customer_sample(self, count):
+        ids = list(self.customers.rows)
+        return [self.customers.rows[row_id] for row_id in self.rng.sample(ids, min(count, len(ids)))]
+
+    def run_search(self):
+        self._open()
+        self.customer_service.search_index = optic.CustomerSearchIndex(self.customers)
+        with self.timer('search.index_build'):
+            self.customer_service.search_index.rebuild()
+        for row in self._customer_sample(self.operations):
+            queries = {
+                'name': row[1][:4],
+                'phone': optic.normalize_phone(row[2])[-4:],
+                'email': row[3].split('@')[0][:6],
+                'address': row[4].split(',')[0],
+            }
+            for field, text in queries.items():
+                if not text:
+                    continue
+                with self.timer('search.' + field):
+                    [optic.customer_display_row(row) for _, row in self.customer_service.search(field, text)]
+            # Ο έλεγχος της καταχώρησης, για υπάρχοντα και για νέο πελάτη
+            with self.timer('search.duplicate'):
+                self.customers.is_duplicate(row[0], row[1], row[2], row[3])
+            with self.timer('search.duplicate'):
+                self.customers.is_duplicate(row[0], row[1] + 'ς', '6999999999', '')
+
+    def run_sale(self):
+        self._open()
+        products = [row[0] for row in self.inventory.rows.values() if row[2].isdigit() and int(row[2]) > 0]
+        for product in self.rng.sample(products, min(self.operations, len(products))):
+            with self.timer('sale'):
+                self.inventory_service.sell(product, 1)
+        # Οι αναφορές διαβάζονται από τα σύνολα του βιβλίου πωλήσεων
+        month = optic.datetime.now().strftime("%Y-%m")
+        for _ in range(self.repeat):
+            with self.timer('sale.report'):
+                self.sales.totals(month)
+                self.sales.monthly()
+                self.sales.best_sellers(limit=20, month=month)
+                self.sales.best_sellers(limit=20)
+                self.sales.by_category()
+
+    def run_cart(self):
+        # Καλάθια 2-8 προϊόντων που γράφονται μαζί με μία εγγραφή
+        self._open()
+        for _ in range(self.operations):
+            products = [row[0] for row in self.inventory.rows.values() if row[2].isdigit() and int(row[2]) > 0]
+            if not products:
+                break
+            cart = [(product, 1) for product in self.rng.sample(products, min(self.rng.randint(2, 8), len(products)))]
+            with self.timer('cart.checkout'):
+                self.inventory_service.checkout(cart)
+
+    def run_scan(self):
+        # Γρήγορη πώληση με σαρωτή: εύρεση από τον κωδικό και πώληση των σαρώσεων
+        self._open()
+        codes = [optic.product_sku(row) for row in self.inventory.rows.values()
+                 if optic.product_sku(row) and row[2].isdigit() and int(row[2]) > 0]
+        for _ in range(self.operations):
+            cart = []
+            for code in self.rng.sample(codes, min(5, len(codes))):
+                with self.timer('scan.lookup'):
+                    row = self.inventory_service.lookup(code)
+                    self.inventory_service.validate_cart(cart + [(row[0], 1)])
+                cart.append((row[0], 1))
+            if not cart:
+                break
+            with self.timer('scan.checkout'):
+                self.inventory_service.checkout(cart)
+            codes = [code for code in codes if int(self.inventory.find_sku(code)[2]) > 0]
+
+    def run_import(self):
+        # Εισαγωγή από εξωτερικό CSV με όσες γραμμές έχει το σύνολο δεδομένων:
+        # ένας στους δέκα υπάρχει ήδη και ένας στους είκοσι έχει λάθος τηλέφωνο
+        self._open()
+        existing = list(self.customers.rows.values())
+        path = 'εισαγωγή.csv'
+        with open(path, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file, delimiter=';')
+            writer.writerow(optic.CUSTOMER_HEADERS[:5])
+            for index in range(len(existing)):
+                if index % 10 == 0:
+                    writer.writerow(self.rng.choice(existing)[:5])
+                    continue
+                phone = f"2{index:09d}" if index % 20 else "12345"
+                writer.writerow([f"Πελάτης{index}", f"Νέου Καταστήματος{index}", phone, '', ''])
+        with self.timer('import.read'):
+            result = self.customer_service.read_import(path)
+        with self.timer('import.save'):
+            self.customer_service.save_import(result)
+
+    def run_rename(self):
+        # Αλλαγή επωνύμου (π.χ. μετά από γάμο)· οι συνταγές/σημειώσεις ακολουθούν τον κωδικό
+        self._open()
+        for row in self._customer_sample(self.operations):
+            surname = f"{row[1]}-{self.rng.choice(('Παππά', 'Λάμπρου', 'Ζέρβα', 'Νικολάου'))}"
+            with self.timer('rename'):
+                self.customer_service.update(optic.customer_id_of(row), row[0], surname, row[2], row[3], row[4])
+
+    def run_delete(self):
+        self._open()
+        for row in self._customer_sample(self.operations):
+            with self.timer('delete'):
+                self.customer_service.delete(optic.customer_id_of(row))
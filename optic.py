@@ -3,13 +3,32 @@ import os
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog, scrolledtext
 from datetime import datetime
-import shutil
 import logging
 import re
 import math
-import zipfile
 import sys
-import subprocess
+import sqlite3
+import threading
+import queue
+import time
+import unicodedata
+import json
+import ast
+import base64
+import zlib
+import contextlib
+import hashlib
+import concurrent.futures
+import collections
+import platform
+import io
+import heapq
+import codecs
+import itertools
+from array import array
+
+# Για τη μέτρηση του χρόνου μέχρι το πρώτο καρέ
+APP_START = time.perf_counter()
 
 logging.basicConfig(
     filename='optic_system.log',
@@ -26,14 +45,11 @@ def check_file_size(filepath):
         logging.error(f"Σφάλμα κατά τον έλεγχο μεγέθους αρχείου: {str(e)}")
         return False
 
-def create_backup(filepath):
+def create_backup(reason=''):
     try:
-        if not os.path.exists(BACKUP_DIR):
-            os.makedirs(BACKUP_DIR)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(BACKUP_DIR, f"{os.path.basename(filepath)}_{timestamp}")
-        shutil.copy2(filepath, backup_path)
-        logging.info(f"Δημιουργήθηκε αντίγραφο ασφαλείας: {backup_path}")
+        store = BackupStore()
+        store.snapshot(reason)
+        store.prune_if_due()
         return True
     except Exception as e:
         logging.error(f"Σφάλμα κατά τη δημιουργία αντιγράφου ασφαλείας: {str(e)}")
@@ -76,10 +92,36 @@ DOCUMENTS_DIR = "έγγραφα πελατών"
 BACKUP_DIR = "backup"
 MAX_FILE_SIZE = 10 * 1024 * 1024  
 NOTES_CSV = "σημειώσεις.csv"
-
-CUSTOMER_HEADERS = ["Όνομα", "Επώνυμο", "Τηλέφωνο", "Email", "Διεύθυνση", "Έγγραφα"]
-INVENTORY_HEADERS = ["Όνομα Προϊόντος", "Κατηγορία", "Ποσότητα", "Τιμή"]
-NOTES_HEADERS = ["Ημερομηνία", "Ονοματεπώνυμο", "Σημειώσεις"]
+PRESCRIPTION_CSV = "συνταγολόγια.csv"
+SALES_CSV = "πωλήσεις.csv"
+SALES_ROLLUP_FILE = "πωλήσεις.rollup.json"
+SALES_TAIL_BYTES = 256
+SALES_CHECKPOINT_LINES = 500
+STORAGE_DB = "optic.db"
+LOAD_BATCH_SIZE = 2000
+LOAD_POLL_MS = 20
+
+CUSTOMER_HEADERS = ["Όνομα", "Επώνυμο", "Τηλέφωνο", "Email", "Διεύθυνση", "Έγγραφα", "Σημαίες", "Κωδικός"]
+INVENTORY_HEADERS = ["Όνομα Προϊόντος", "Κατηγορία", "Ποσότητα", "Τιμή", "Κωδικός"]
+NOTES_HEADERS = ["Ημερομηνία", "Ονοματεπώνυμο", "Σημειώσεις", "Κωδικός Πελάτη"]
+PRESCRIPTION_HEADERS = [
+    "Ημερομηνία", "Ονοματεπώνυμο",
+    "Μακριά_Sph1", "Μακριά_Cyl1", "Μακριά_Axe1", "Μακριά_Sph2", "Μακριά_Cyl2", "Μακριά_Axe2", "Μακριά_Ecartement",
+    "Πλησίον_Sph1", "Πλησίον_Cyl1", "Πλησίον_Axe1", "Πλησίον_Sph2", "Πλησίον_Cyl2", "Πλησίον_Axe2", "Πλησίον_Ecartement",
+    "Δ_Γραμμές", "A_Γραμμές", "Κωδικός Πελάτη"
+]
+
+SALES_HEADERS = ["Ημερομηνία", "Απόδειξη", "Προϊόν", "Κατηγορία", "Ποσότητα", "Τιμή Μονάδας", "Σύνολο"]
+
+# Κάθε πελάτης έχει σταθερό ακέραιο κωδικό (τελευταία στήλη), και οι συνταγές/
+# σημειώσεις συνδέονται με αυτόν. Το ονοματεπώνυμό τους κρατιέται όπως ήταν
+# τη στιγμή της εγγραφής.
+CUSTOMER_ID_COLUMN = 7
+PRESCRIPTION_CUSTOMER_COLUMN = 18
+NOTE_CUSTOMER_COLUMN = 3
+# Προαιρετικός κωδικός προϊόντος (SKU ή barcode)· τα παλιά αρχεία αποθήκης
+# δεν έχουν αυτή τη στήλη
+INVENTORY_SKU_COLUMN = 4
 
 for file_name, headers in [(FILE_NAME, CUSTOMER_HEADERS),
                          (INVENTORY_FILE, INVENTORY_HEADERS),
@@ -89,8 +131,3703 @@ for file_name, headers in [(FILE_NAME, CUSTOMER_HEADERS),
             writer = csv.writer(file)
             writer.writerow(headers)
 
+def normalize_text(value):
+    return ' '.join(str(value).split()).lower()
+
+def normalize_phone(phone):
+    return ''.join(filter(str.isdigit, str(phone)))
+
+def customer_key(name, surname):
+    return (normalize_text(name), normalize_text(surname))
+
+def full_name_key(name, surname=''):
+    return normalize_text(f"{name} {surname}")
+
+def normalize_sku(value):
+    return ''.join(str(value).split()).upper()
+
+def product_sku(row):
+    return normalize_sku(row[INVENTORY_SKU_COLUMN]) if len(row) > INVENTORY_SKU_COLUMN else ''
+
+def customer_id_of(row, column=CUSTOMER_ID_COLUMN):
+    # Ο κωδικός πελάτη μιας εγγραφής, ή None για εγγραφές χωρίς σύνδεση
+    value = str(row[column]).strip() if len(row) > column else ''
+    return int(value) if value.isdigit() else None
+
+DRAWING_FORMAT = 'P1:'
+DRAWING_TOLERANCE = 1.0
+DRAWING_MIN_STEP = 2
+
+def segments_to_polylines(segments):
+    # Ενώνει τα διαδοχικά τμήματα (x1, y1, x2, y2) σε συνεχείς γραμμές
+    polylines = []
+    for x1, y1, x2, y2 in segments:
+        if polylines and polylines[-1][-1] == (x1, y1):
+            polylines[-1].append((x2, y2))
+        else:
+            polylines.append([(x1, y1), (x2, y2)])
+    return polylines
+
+def simplify_polyline(points, tolerance=DRAWING_TOLERANCE):
+    # Ramer-Douglas-Peucker: κρατά μόνο τα σημεία που απέχουν από την ευθεία
+    # περισσότερο από tolerance pixels
+    points = [(int(round(x)), int(round(y))) for x, y in points]
+    points = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+    if len(points) < 3:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        length = math.hypot(x2 - x1, y2 - y1)
+        best, best_dist = None, tolerance
+        for i in range(first + 1, last):
+            x, y = points[i]
+            if length:
+                dist = abs((x2 - x1) * (y1 - y) - (x1 - x) * (y2 - y1)) / length
+            else:
+                dist = math.hypot(x - x1, y - y1)
+            if dist > best_dist:
+                best, best_dist = i, dist
+        if best is not None:
+            keep[best] = True
+            stack.append((first, best))
+            stack.append((best, last))
+    return [p for p, kept in zip(points, keep) if kept]
+
+def _write_varint(out, value):
+    value = (value << 1) ^ (value >> 63)  # zigzag για τις αρνητικές διαφορές
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varints(data):
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        yield (value >> 1) ^ -(value & 1)
+        value = shift = 0
+
+def encode_drawing(polylines):
+    # Μορφή: πλήθος γραμμών, και για κάθε γραμμή το πλήθος σημείων, το πρώτο
+    # σημείο και οι διαφορές από το προηγούμενο, ως varints σε base64
+    polylines = [simplify_polyline(points) for points in polylines]
+    polylines = [points for points in polylines if len(points) >= 2]
+    if not polylines:
+        return ''
+    out = bytearray()
+    _write_varint(out, len(polylines))
+    for points in polylines:
+        _write_varint(out, len(points))
+        px = py = 0
+        for x, y in points:
+            _write_varint(out, x - px)
+            _write_varint(out, y - py)
+            px, py = x, y
+    return DRAWING_FORMAT + base64.b64encode(bytes(out)).decode('ascii')
+
+def decode_drawing(text):
+    # Επιστρέφει λίστα από γραμμές [(x, y), ...]. Δέχεται και την παλιά μορφή
+    # (str μιας λίστας τμημάτων), χωρίς eval.
+    text = (text or '').strip()
+    if not text:
+        return []
+    try:
+        if text.startswith(DRAWING_FORMAT):
+            values = _read_varints(base64.b64decode(text[len(DRAWING_FORMAT):], validate=True))
+            polylines = []
+            for _ in range(next(values)):
+                points = []
+                x = y = 0
+                for _ in range(next(values)):
+                    x += next(values)
+                    y += next(values)
+                    points.append((x, y))
+                polylines.append(points)
+            return polylines
+        segments = ast.literal_eval(text)
+        return segments_to_polylines(tuple(segment) for segment in segments
+                                     if len(segment) == 4 and all(isinstance(v, (int, float)) for v in segment))
+    except (ValueError, TypeError, SyntaxError, StopIteration, MemoryError, RecursionError) as e:
+        logging.warning(f"Μη έγκυρα δεδομένα σχεδίου συνταγής: {str(e)}")
+        return []
+
+def migrate_drawing(text):
+    # Μετατροπή μιας τιμής στη συμπαγή μορφή. Οι τιμές που δεν αναγνωρίζονται
+    # μένουν όπως είναι.
+    if not text or text.startswith(DRAWING_FORMAT):
+        return text
+    polylines = decode_drawing(text)
+    return encode_drawing(polylines) if polylines or text.strip() == '[]' else text
+
+WRITE_BUFFER_SIZE = 1024 * 1024
+PENDING_WRITES = "optic_pending_writes.json"
+
+class AtomicWriteGroup:
+    # Ομάδα εγγραφών αρχείων με ένα σημείο ολοκλήρωσης. Κάθε αρχείο γράφεται σε
+    # προσωρινό αρχείο στον ίδιο φάκελο και αντικαθιστά το αρχικό με os.replace,
+    # οπότε το αρχικό δεν μένει ποτέ μισογραμμένο. Όταν αλλάζουν πολλά αρχεία
+    # μαζί, η λίστα των αλλαγών γράφεται πρώτα στο PENDING_WRITES: αν το
+    # πρόγραμμα διακοπεί ενδιάμεσα, η recover_pending_writes τις ολοκληρώνει.
+    def __init__(self):
+        self.files = {}
+        self.appends = []
+
+    def open(self, path, mode='w'):
+        # Αν το ίδιο αρχείο ξαναγραφτεί στην ίδια ομάδα, κρατιέται η τελευταία εκδοχή
+        temp_path = path + '.tmp'
+        if path in self.files:
+            self.files[path][1].close()
+        if 'b' in mode:
+            file = open(temp_path, mode=mode, buffering=WRITE_BUFFER_SIZE)
+        else:
+            file = open(temp_path, mode=mode, newline='', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+        self.files[path] = (temp_path, file)
+        return file
+
+    def append(self, path, text):
+        self.appends.append((path, text))
+
+    def commit(self):
+        for temp_path, file in self.files.values():
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+        replaces = [(temp_path, path) for path, (temp_path, _) in self.files.items()]
+        appends = []
+        for path, text in self.appends:
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            appends.append((path, offset, text))
+        pending = len(replaces) + len(appends) > 1
+        if pending:
+            with open(PENDING_WRITES, mode='w', encoding='utf-8') as file:
+                json.dump({'replace': replaces, 'append': appends}, file, ensure_ascii=False)
+                file.flush()
+                os.fsync(file.fileno())
+        _apply_writes(replaces, appends)
+        if pending:
+            os.remove(PENDING_WRITES)
+        self.files = {}
+        self.appends = []
+
+    def abort(self):
+        for temp_path, file in self.files.values():
+            file.close()
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        self.files = {}
+        self.appends = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+def _apply_writes(replaces, appends):
+    # Επαναλαμβάνεται με ασφάλεια: οι προσθήκες ξεκινούν πάντα από την αρχική
+    # θέση του αρχείου και οι αντικαταστάσεις αγνοούνται αν έχουν ήδη γίνει
+    for path, offset, text in appends:
+        with open(path, mode='a+b') as file:
+            file.truncate(offset)
+            file.write(text.encode('utf-8'))
+            file.flush()
+            os.fsync(file.fileno())
+    for temp_path, path in replaces:
+        if os.path.exists(temp_path):
+            os.replace(temp_path, path)
+
+def recover_pending_writes():
+    if not os.path.exists(PENDING_WRITES):
+        return
+    try:
+        with open(PENDING_WRITES, mode='r', encoding='utf-8') as file:
+            pending = json.load(file)
+    except ValueError:
+        # Το σημείο ολοκλήρωσης δεν γράφτηκε ποτέ ολόκληρο, τα αρχικά αρχεία ισχύουν
+        os.remove(PENDING_WRITES)
+        logging.warning("Αγνοήθηκε ημιτελής ομάδα εγγραφών")
+        return
+    _apply_writes(pending.get('replace', []), pending.get('append', []))
+    os.remove(PENDING_WRITES)
+    logging.warning("Ολοκληρώθηκε ομάδα εγγραφών που είχε διακοπεί")
+
+METRICS_FILE = "optic_metrics.json"
+METRICS_EXPORT_MS = 5 * 60 * 1000
+METRICS_SAMPLES = 2048
+
+class _Timer(contextlib.ContextDecorator):
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def _recreate_cm(self):
+        # Κάθε κλήση της διακοσμημένης συνάρτησης χρειάζεται δικό της χρονόμετρο
+        return _Timer(self.metrics, self.name)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    # Χρόνοι εκτέλεσης ανά λειτουργία. Κρατιούνται μόνο τα τελευταία
+    # METRICS_SAMPLES δείγματα ανά λειτουργία, ώστε η μνήμη να μένει σταθερή,
+    # ενώ το πλήθος και ο μέγιστος χρόνος μετρούν από την έναρξη.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = {}
+        self.started = datetime.now()
+
+    def record(self, name, seconds):
+        with self._lock:
+            operation = self.operations.get(name)
+            if operation is None:
+                operation = self.operations[name] = {
+                    'samples': collections.deque(maxlen=METRICS_SAMPLES),
+                    'count': 0, 'total': 0.0, 'max': 0.0}
+            operation['samples'].append(seconds)
+            operation['count'] += 1
+            operation['total'] += seconds
+            operation['max'] = max(operation['max'], seconds)
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+            self.started = datetime.now()
+
+    def timer(self, name):
+        # Χρησιμοποιείται ως "with METRICS.timer(...)" ή ως @METRICS.timer(...)
+        return _Timer(self, name)
+
+    def summary(self):
+        with self._lock:
+            operations = [(name, sorted(operation['samples']), dict(operation))
+                          for name, operation in self.operations.items()]
+        result = {}
+        for name, samples, operation in sorted(operations):
+            def percentile(p):
+                return samples[min(int(len(samples) * p), len(samples) - 1)] * 1000
+            result[name] = {
+                'count': operation['count'],
+                'p50_ms': round(percentile(0.50), 3),
+                'p95_ms': round(percentile(0.95), 3),
+                'max_ms': round(operation['max'] * 1000, 3),
+                'mean_ms': round(operation['total'] / operation['count'] * 1000, 3),
+            }
+        return result
+
+    def export(self, path=METRICS_FILE):
+        report = {
+            'host': platform.node(),
+            'started': self.started.isoformat(timespec='seconds'),
+            'exported': datetime.now().isoformat(timespec='seconds'),
+            'operations': self.summary(),
+        }
+        with AtomicWriteGroup() as group:
+            json.dump(report, group.open(path), ensure_ascii=False, indent=2)
+
+METRICS = Metrics()
+
+BACKUP_CHUNK_TARGET = 64 * 1024
+BACKUP_CHUNK_MAX = 1024 * 1024
+BACKUP_KEEP = {'hourly': 24, 'daily': 14, 'weekly': 8}
+BACKUP_PRUNE_INTERVAL = 3600
+
+def fsync_dir(path):
+    # Μόνιμη καταγραφή των ονομάτων ενός φακέλου μετά από os.replace· στα
+    # Windows ο φάκελος δεν ανοίγει με os.open και το βήμα παραλείπεται
+    try:
+        fd = os.open(path or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class BackupStore:
+    # Αντίγραφα ασφαλείας με αποθήκευση κάθε κομματιού μία φορά (sha256,
+    # συμπιεσμένο με zlib) και ένα manifest ανά στιγμιότυπο. Τα αρχεία κόβονται
+    # σε αλλαγές γραμμής που επιλέγονται από το περιεχόμενο, οπότε μια αλλαγή
+    # στη μέση ενός CSV αλλάζει μόνο τα κομμάτια γύρω της.
+    def __init__(self, root=BACKUP_DIR):
+        self.root = root
+        self.chunks_dir = os.path.join(root, 'chunks')
+        self.snapshots_dir = os.path.join(root, 'snapshots')
+
+    @staticmethod
+    def backup_files():
+        files = [FILE_NAME, FILE_NAME + '.journal', INVENTORY_FILE, INVENTORY_FILE + '.journal',
+                 PRESCRIPTION_CSV, NOTES_CSV, SALES_CSV, STORAGE_DB]
+        return files
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def _chunks(self, file):
+        # Τομή μετά από μία στις ~1024 γραμμές (~64 bytes η καθεμία). Το crc32
+        # πολλαπλασιάζεται με σταθερά ώστε παρόμοιες γραμμές να σκορπίζονται.
+        chunk = bytearray()
+        lines = max(BACKUP_CHUNK_TARGET // 64, 1)
+        for line in file:
+            chunk += line
+            if ((zlib.crc32(line) * 0x9E3779B1) & 0xFFFFFFFF) < 0x100000000 // lines \
+                    or len(chunk) >= BACKUP_CHUNK_MAX:
+                yield bytes(chunk)
+                chunk = bytearray()
+        if chunk:
+            yield bytes(chunk)
+
+    def _store_file(self, path, dirs):
+        whole = hashlib.sha256()
+        digests = []
+        size = 0
+        written = 0
+        with open(path, mode='rb') as file:
+            for chunk in self._chunks(file):
+                whole.update(chunk)
+                size += len(chunk)
+                digest = hashlib.sha256(chunk).hexdigest()
+                digests.append(digest)
+                chunk_path = self._chunk_path(digest)
+                if not os.path.exists(chunk_path):
+                    chunk_dir = os.path.dirname(chunk_path)
+                    if not os.path.isdir(chunk_dir):
+                        os.makedirs(chunk_dir)
+                        dirs.add(self.chunks_dir)
+                    temp_path = chunk_path + '.tmp'
+                    with open(temp_path, mode='wb') as out:
+                        out.write(zlib.compress(chunk, 6))
+                        out.flush()
+                        os.fsync(out.fileno())
+                    os.replace(temp_path, chunk_path)
+                    dirs.add(chunk_dir)
+                    written += len(chunk)
+        return {'size': size, 'sha256': whole.hexdigest(), 'chunks': digests}, written
+
+    def snapshots(self):
+        # Τα ονόματα των manifest είναι χρονοσφραγίδες, άρα ταξινομούνται χρονολογικά
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith('.json'))
+
+    def manifest(self, name):
+        with open(os.path.join(self.snapshots_dir, name + '.json'), mode='r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def snapshot(self, reason=''):
+        names = self.snapshots()
+        previous = self.manifest(names[-1])['files'] if names else {}
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        files = {}
+        written = 0
+        dirs = set()
+        for path in self.backup_files():
+            if not os.path.exists(path):
+                continue
+            st = os.stat(path)
+            old = previous.get(path)
+            if path == STORAGE_DB:
+                # Με WAL οι αλλαγές μπορεί να βρίσκονται μόνο στο -wal, οπότε
+                # η βάση θεωρείται αμετάβλητη μόνο αν δεν άλλαξε κανένα από τα δύο
+                wal = os.stat(path + '-wal') if os.path.exists(path + '-wal') else None
+                stamp = [st.st_mtime_ns, st.st_size, wal.st_mtime_ns if wal else 0, wal.st_size if wal else 0]
+                if old and old.get('source') == stamp:
+                    entry, added = dict(old), 0
+                else:
+                    # Συνεπές αντίγραφο της βάσης ακόμα κι αν είναι ανοιχτή (WAL)
+                    temp_path = os.path.join(self.root, 'optic.db.tmp')
+                    source = sqlite3.connect(path)
+                    target = sqlite3.connect(temp_path)
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+                        source.close()
+                    entry, added = self._store_file(temp_path, dirs)
+                    os.remove(temp_path)
+                    entry['source'] = stamp
+            elif old and old.get('mtime_ns') == st.st_mtime_ns and old.get('size') == st.st_size:
+                # Αμετάβλητο αρχείο: δεν διαβάζεται ξανά
+                entry, added = dict(old), 0
+            else:
+                entry, added = self._store_file(path, dirs)
+            entry['mtime_ns'] = st.st_mtime_ns
+            files[path] = entry
+            written += added
+        # Τα κομμάτια πρέπει να είναι στον δίσκο πριν από το manifest που τα αναφέρει
+        for path in sorted(dirs, key=len, reverse=True):
+            fsync_dir(path)
+        now = datetime.now()
+        name = now.strftime("%Y%m%d_%H%M%S_%f")
+        with AtomicWriteGroup() as group:
+            json.dump({'created': now.isoformat(timespec='seconds'), 'reason': reason, 'files': files},
+                      group.open(os.path.join(self.snapshots_dir, name + '.json')), ensure_ascii=False)
+        logging.info(f"Δημιουργήθηκε αντίγραφο ασφαλείας {name} ({reason}), νέα δεδομένα: {written} bytes")
+        return name
+
+    def prune(self, keep=BACKUP_KEEP):
+        # Κρατιέται το νεότερο στιγμιότυπο κάθε ώρας/ημέρας/εβδομάδας για τις
+        # τελευταίες N περιόδους, και πάντα το πιο πρόσφατο
+        names = self.snapshots()
+        formats = {'hourly': "%Y%m%d%H", 'daily': "%Y%m%d", 'weekly': "%G%V"}
+        kept = set(names[-1:])
+        for period, count in keep.items():
+            buckets = set()
+            for name in reversed(names):
+                bucket = datetime.strptime(name, "%Y%m%d_%H%M%S_%f").strftime(formats[period])
+                if bucket not in buckets:
+                    if len(buckets) >= count:
+                        break
+                    buckets.add(bucket)
+                    kept.add(name)
+        for name in names:
+            if name not in kept:
+                os.remove(os.path.join(self.snapshots_dir, name + '.json'))
+        # Διαγραφή κομματιών που δεν αναφέρει κανένα στιγμιότυπο
+        referenced = set()
+        for name in kept:
+            for entry in self.manifest(name)['files'].values():
+                referenced.update(entry['chunks'])
+        removed = 0
+        if os.path.isdir(self.chunks_dir):
+            for prefix in os.listdir(self.chunks_dir):
+                for digest in os.listdir(os.path.join(self.chunks_dir, prefix)):
+                    if digest not in referenced:
+                        os.remove(os.path.join(self.chunks_dir, prefix, digest))
+                        removed += 1
+        with open(os.path.join(self.root, 'last_prune'), mode='w', encoding='utf-8') as file:
+            file.write(datetime.now().isoformat(timespec='seconds'))
+        logging.info(f"Καθαρισμός αντιγράφων: {len(names) - len(kept)} στιγμιότυπα, {removed} κομμάτια")
+        return len(names) - len(kept), removed
+
+    def prune_if_due(self, interval=BACKUP_PRUNE_INTERVAL):
+        # Ο καθαρισμός διαβάζει όλα τα manifest και τον κατάλογο των κομματιών,
+        # οπότε γίνεται το πολύ μία φορά ανά interval και όχι σε κάθε στιγμιότυπο
+        try:
+            if time.time() - os.path.getmtime(os.path.join(self.root, 'last_prune')) < interval:
+                return None
+        except OSError:
+            pass
+        return self.prune()
+
+    def find(self, when=None):
+        # Το τελευταίο στιγμιότυπο μέχρι τη χρονική στιγμή when
+        names = self.snapshots()
+        if when is not None:
+            limit = when.strftime("%Y%m%d_%H%M%S_999999")
+            names = [name for name in names if name <= limit]
+        return names[-1] if names else None
+
+    def _read_chunk(self, digest):
+        with open(self._chunk_path(digest), mode='rb') as file:
+            data = zlib.decompress(file.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Αλλοιωμένο κομμάτι {digest}")
+        return data
+
+    def restore(self, name, target_dir='.'):
+        manifest = self.manifest(name)
+        with AtomicWriteGroup() as group:
+            for path, entry in manifest['files'].items():
+                whole = hashlib.sha256()
+                file = group.open(os.path.join(target_dir, path), mode='wb')
+                for digest in entry['chunks']:
+                    data = self._read_chunk(digest)
+                    whole.update(data)
+                    file.write(data)
+                if whole.hexdigest() != entry['sha256']:
+                    raise ValueError(f"Το {path} του αντιγράφου {name} δεν επαληθεύτηκε")
+        # Αρχεία που δεν υπήρχαν τη στιγμή του αντιγράφου (π.χ. journal) αφαιρούνται,
+        # όπως και το WAL της βάσης που θα εφαρμοζόταν πάνω στην επαναφορά
+        stale = [path for path in self.backup_files() if path not in manifest['files']]
+        stale += [STORAGE_DB + '-wal', STORAGE_DB + '-shm']
+        for path in stale:
+            target = os.path.join(target_dir, path)
+            if os.path.exists(target):
+                os.remove(target)
+        logging.info(f"Επαναφορά από το αντίγραφο ασφαλείας {name}")
+
+    def verify(self):
+        problems = []
+        good = set()
+        verified = set()
+        for name in self.snapshots():
+            try:
+                manifest = self.manifest(name)
+            except (OSError, ValueError) as e:
+                problems.append(f"{name}: {str(e)}")
+                continue
+            for path, entry in manifest['files'].items():
+                # Τα ίδια αρχεία επαναλαμβάνονται σε πολλά στιγμιότυπα
+                key = (entry['sha256'], tuple(entry['chunks']))
+                if key in verified:
+                    continue
+                whole = hashlib.sha256()
+                for digest in entry['chunks']:
+                    try:
+                        data = self._read_chunk(digest)
+                    except (OSError, ValueError, zlib.error) as e:
+                        problems.append(f"{name}: {path}: {str(e)}")
+                        break
+                    whole.update(data)
+                    good.add(digest)
+                else:
+                    if whole.hexdigest() != entry['sha256']:
+                        problems.append(f"{name}: {path}: λάθος sha256")
+                    else:
+                        verified.add(key)
+        logging.info(f"Επαλήθευση αντιγράφων: {len(good)} κομμάτια, {len(problems)} προβλήματα")
+        return problems
+
+class CsvOffsetIndex:
+    # Ευρετήριο θέσεων (byte offsets) των γραμμών κάθε πελάτη σε ένα αρχείο
+    # που μόνο μεγαλώνει, με κλειδί τον κωδικό πελάτη της στήλης column.
+    # Αποθηκεύεται δίπλα στο αρχείο και ξαναχτίζεται όταν το mtime/μέγεθος του
+    # αρχείου δεν ταιριάζει με αυτό που καταγράφηκε. Οι προσθήκες ενημερώνουν
+    # μόνο τη μνήμη, και το αρχείο του ευρετηρίου γράφεται στο flush().
+    def __init__(self, path, column):
+        self.path = path
+        self.column = column
+        self.index_path = path + '.idx'
+        self.stamp = None
+        self.offsets = None
+        self.largest = None
+        self.dirty = False
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return [st.st_mtime_ns, st.st_size]
+        except OSError:
+            return None
+
+    def _scan(self, start=0):
+        # Επιστρέφει (offset, row) για κάθε εγγραφή. Τα πεδία με αλλαγές γραμμής
+        # καλύπτουν πολλές γραμμές του αρχείου, γι' αυτό η θέση μετράται από τις
+        # γραμμές που κατανάλωσε ο csv.reader.
+        with open(self.path, mode='rb') as file:
+            file.seek(start)
+            position = start
+
+            def lines():
+                nonlocal position
+                for line in file:
+                    position += len(line)
+                    yield line.decode('utf-8')
+
+            record_start = start
+            for row in csv.reader(lines()):
+                yield record_start, row
+                record_start = position
+
+    def _load(self):
+        try:
+            with open(self.index_path, mode='r', encoding='utf-8') as file:
+                data = json.load(file)
+            # Τα παλιά ευρετήρια είχαν κλειδί το ονοματεπώνυμο
+            if data.get('column') != self.column:
+                raise KeyError('column')
+            self.stamp = data['stamp']
+            self.offsets = data['offsets']
+        except (OSError, ValueError, KeyError, TypeError):
+            self.stamp = None
+            self.offsets = None
+        self.largest = None
+
+    def _save(self):
+        try:
+            with AtomicWriteGroup() as group:
+                json.dump({'stamp': self.stamp, 'column': self.column, 'offsets': self.offsets},
+                          group.open(self.index_path), ensure_ascii=False)
+            self.dirty = False
+        except OSError as e:
+            logging.error(f"Σφάλμα κατά την αποθήκευση του ευρετηρίου {self.index_path}: {str(e)}")
+
+    def flush(self):
+        # Ένα ευρετήριο που δεν αποθηκεύτηκε (π.χ. διακοπή ρεύματος) έχει παλιό
+        # stamp και απλώς ξαναχτίζεται στην επόμενη χρήση
+        if self.dirty:
+            self._save()
+
+    def rebuild(self):
+        offsets = {}
+        stamp = self._file_stamp()
+        if stamp is not None:
+            rows = self._scan()
+            next(rows, None)  # Επικεφαλίδες
+            for offset, row in rows:
+                customer_id = customer_id_of(row, self.column)
+                if customer_id is not None:
+                    offsets.setdefault(str(customer_id), []).append(offset)
+        self.stamp = stamp
+        self.offsets = offsets
+        self.largest = None
+        self._save()
+        logging.info(f"Ξαναχτίστηκε το ευρετήριο του {self.path}")
+
+    def _ensure(self):
+        if self.offsets is None:
+            self._load()
+        if self.offsets is None or self.stamp != self._file_stamp():
+            self.rebuild()
+
+    def offsets_for(self, customer_id):
+        self._ensure()
+        return self.offsets.get(str(customer_id), [])
+
+    def has(self, customer_id):
+        return bool(self.offsets_for(customer_id))
+
+    def max_id(self):
+        self._ensure()
+        if self.largest is None:
+            self.largest = max((int(key) for key in self.offsets), default=0)
+        return self.largest
+
+    def rows_for(self, customer_id):
+        offsets = self.offsets_for(customer_id)
+        if not offsets:
+            return []
+        rows = []
+        with open(self.path, mode='rb') as file:
+            for offset in offsets:
+                file.seek(offset)
+                row = next(csv.reader(line.decode('utf-8') for line in file), None)
+                if row:
+                    rows.append(row)
+        return rows
+
+    def append(self, row, write):
+        # Η νέα εγγραφή προστίθεται στο ευρετήριο μόνο αν ήταν ήδη ενημερωμένο,
+        # αλλιώς θα ξαναχτιστεί την επόμενη φορά που θα χρειαστεί.
+        if self.offsets is None:
+            self._load()
+        current = self._file_stamp()
+        fresh = self.offsets is not None and current is not None and self.stamp == current
+        write(row)
+        customer_id = customer_id_of(row, self.column)
+        if fresh:
+            if customer_id is not None:
+                self.offsets.setdefault(str(customer_id), []).append(current[1])
+                if self.largest is not None:
+                    self.largest = max(self.largest, customer_id)
+            self.stamp = self._file_stamp()
+            self.dirty = True
+
+class CsvStorage:
+    # Η αρχική αποθήκευση σε αρχεία CSV. Οι αλλαγές σε υπάρχουσες εγγραφές
+    # ξαναγράφουν ολόκληρο το αρχείο από την κατάσταση που κρατιέται στη μνήμη.
+    name = 'csv'
+    ID_COLUMNS = {
+        'customers': CUSTOMER_ID_COLUMN,
+        'prescriptions': PRESCRIPTION_CUSTOMER_COLUMN,
+        'notes': NOTE_CUSTOMER_COLUMN,
+    }
+
+    def __init__(self):
+        self.paths = {
+            'customers': (FILE_NAME, CUSTOMER_HEADERS),
+            'inventory': (INVENTORY_FILE, INVENTORY_HEADERS),
+            'prescriptions': (PRESCRIPTION_CSV, PRESCRIPTION_HEADERS),
+            'notes': (NOTES_CSV, NOTES_HEADERS),
+            'sales': (SALES_CSV, SALES_HEADERS),
+        }
+        self.headers = {}
+        self._next_ids = {}
+        self._group = None
+        self.aliases = {}
+        recover_pending_writes()
+        for table in self.paths:
+            self._ensure(table)
+        self.offset_indexes = {table: CsvOffsetIndex(self.paths[table][0], self.ID_COLUMNS[table])
+                               for table in ('prescriptions', 'notes')}
+        self.migrate_customer_ids()
+
+    def _ensure(self, table):
+        path, headers = self.paths[table]
+        if not os.path.exists(path):
+            with open(path, mode='w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(headers)
+            logging.info(f"Δημιουργήθηκε νέο αρχείο {path}")
+
+    def _header(self, table):
+        self._ensure(table)
+        with open(self.paths[table][0], mode='r', newline='', encoding='utf-8') as file:
+            return next(csv.reader(file), None) or []
+
+    def _read(self, table):
+        self._ensure(table)
+        path, headers = self.paths[table]
+        with open(path, mode='r', newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            header = next(reader, None) or list(headers)
+            # Αρχείο από παλαιότερη έκδοση, πριν προστεθούν στήλες στο τέλος:
+            # η επόμενη εγγραφή του γράφει την πλήρη επικεφαλίδα
+            if len(header) < len(headers) and header == headers[:len(header)]:
+                header = list(headers)
+            self.headers[table] = header
+            for row in reader:
+                if len(row) >= 2:
+                    yield row
+
+    @contextlib.contextmanager
+    def atomic(self):
+        # Όλες οι εγγραφές αρχείων μέσα στο block ολοκληρώνονται μαζί
+        if self._group is not None:
+            yield
+            return
+        self._group = AtomicWriteGroup()
+        next_ids = dict(self._next_ids)
+        try:
+            yield
+            before = {table: self.stamp(table) for table in self.paths}
+            self._group.commit()
+        except BaseException:
+            self._group.abort()
+            # Τα αρχεία δεν άλλαξαν, η μνήμη των αποθετηρίων όμως έχει ήδη τις
+            # αλλαγές: μια νέα σφραγίδα για κάθε πίνακα τα αναγκάζει να ξαναφορτώσουν
+            self._next_ids = next_ids
+            for table in self.paths:
+                self.aliases[table] = (self._file_stamp(table), object())
+            raise
+        finally:
+            self._group = None
+        for table, stamp in before.items():
+            current = self._file_stamp(table)
+            if current != stamp:
+                self.aliases[table] = (current, stamp)
+
+    @contextlib.contextmanager
+    def _writes(self):
+        if self._group is not None:
+            yield self._group
+        else:
+            with AtomicWriteGroup() as group:
+                yield group
+
+    def _rewrite(self, table, rows):
+        path, headers = self.paths[table]
+        with METRICS.timer('csv.rewrite.' + table), self._writes() as group:
+            writer = csv.writer(group.open(path))
+            writer.writerow(self.headers.get(table, headers))
+            writer.writerows(rows)
+
+    def _append(self, table, row):
+        self._ensure(table)
+        with open(self.paths[table][0], mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(row)
+
+    def _file_stamp(self, table):
+        try:
+            st = os.stat(self.paths[table][0])
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def stamp(self, table):
+        # Μετά από δικές μας αντικαταστάσεις αρχείων (ομάδα εγγραφών, συμπύκνωση)
+        # τα αρχεία άλλαξαν, όχι όμως και τα δεδομένα που ήδη υπάρχουν στη μνήμη
+        current = self._file_stamp(table)
+        alias = self.aliases.get(table)
+        if alias and alias[0] == current:
+            return alias[1]
+        return current
+
+    def iter_rows(self, table):
+        row_id = 0
+        for row in self._read(table):
+            yield row_id, row
+            row_id += 1
+        self._next_ids[table] = row_id
+
+    def load_rows(self, table):
+        return list(self.iter_rows(table))
+
+    def insert_row(self, table, row):
+        if self._group is not None:
+            self._append_rows(table, [row])
+        else:
+            self._append(table, row)
+        row_id = self._next_ids.get(table, 0)
+        self._next_ids[table] = row_id + 1
+        return row_id
+
+    def insert_rows(self, table, rows):
+        # Πολλές νέες γραμμές με μία προσθήκη στο αρχείο (π.χ. μαζική εισαγωγή)
+        self._append_rows(table, rows)
+        first = self._next_ids.get(table, 0)
+        self._next_ids[table] = first + len(rows)
+        return list(range(first, first + len(rows)))
+
+    def update_row(self, table, row_id, row, all_rows):
+        self._rewrite(table, all_rows)
+
+    def update_rows(self, table, items, all_rows):
+        self._rewrite(table, all_rows)
+
+    def delete_rows(self, table, row_ids, all_rows):
+        self._rewrite(table, all_rows)
+
+    def prescriptions_for(self, customer_id):
+        self._ensure('prescriptions')
+        return self.offset_indexes['prescriptions'].rows_for(customer_id)
+
+    def notes_for(self, customer_id):
+        self._ensure('notes')
+        return self.offset_indexes['notes'].rows_for(customer_id)
+
+    def has_prescriptions(self, customer_id):
+        self._ensure('prescriptions')
+        return self.offset_indexes['prescriptions'].has(customer_id)
+
+    def has_notes(self, customer_id):
+        self._ensure('notes')
+        return self.offset_indexes['notes'].has(customer_id)
+
+    def max_linked_id(self):
+        # Ο μεγαλύτερος κωδικός στις συνταγές/σημειώσεις, ώστε ένας νέος πελάτης
+        # να μην πάρει τον κωδικό κάποιου διαγραμμένου ή μη αποθηκευμένου
+        for table in ('prescriptions', 'notes'):
+            self._ensure(table)
+        return max(index.max_id() for index in self.offset_indexes.values())
+
+    def append_prescription(self, row):
+        self.offset_indexes['prescriptions'].append(row, lambda row: self._append('prescriptions', row))
+
+    def append_note(self, row):
+        self.offset_indexes['notes'].append(row, lambda row: self._append('notes', row))
+
+    def delete_customer_links(self, customer_id):
+        # Το αρχείο ξαναγράφεται μόνο αν το ευρετήριο δείχνει εγγραφές του πελάτη
+        for table in ('prescriptions', 'notes'):
+            self._ensure(table)
+            if not self.offset_indexes[table].has(customer_id):
+                continue
+            column = self.ID_COLUMNS[table]
+            rows = list(self._read(table))
+            kept = [row for row in rows if customer_id_of(row, column) != customer_id]
+            if len(kept) != len(rows):
+                self._rewrite(table, kept)
+                logging.info(f"Διαγράφηκαν οι εγγραφές του πελάτη {customer_id} από το {self.paths[table][0]}")
+
+    def append_sales(self, rows):
+        # Το βιβλίο πωλήσεων μόνο μεγαλώνει. Μέσα σε ομάδα εγγραφών η προσθήκη
+        # ολοκληρώνεται μαζί με την αλλαγή της αποθήκης.
+        self._append_rows('sales', rows)
+
+    def _append_rows(self, table, rows):
+        # Όλες οι γραμμές με ένα write και ένα fsync
+        self._ensure(table)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        path = self.paths[table][0]
+        if self._group is not None:
+            self._group.append(path, buffer.getvalue())
+            return
+        with open(path, mode='a', newline='', encoding='utf-8') as file:
+            file.write(buffer.getvalue())
+            file.flush()
+            os.fsync(file.fileno())
+
+    def read_sales(self, position=None):
+        # Επιστρέφει (γραμμές, νέα θέση, από την αρχή). Η θέση είναι τα bytes που
+        # έχουν ήδη διαβαστεί μαζί με το crc32 των τελευταίων, ώστε ένα αρχείο
+        # που αντικαταστάθηκε (π.χ. από επαναφορά) να διαβάζεται ξανά από την αρχή.
+        self._ensure('sales')
+        path = self.paths['sales'][0]
+        rows = []
+        with open(path, mode='rb') as file:
+            offset = 0
+            if position and position.get('offset'):
+                offset = position['offset']
+                file.seek(max(offset - SALES_TAIL_BYTES, 0))
+                tail = file.read(min(offset, SALES_TAIL_BYTES))
+                if len(tail) != min(offset, SALES_TAIL_BYTES) or zlib.crc32(tail) != position.get('tail'):
+                    offset = 0
+            from_start = offset == 0
+            file.seek(offset)
+            consumed = offset
+
+            def lines():
+                nonlocal consumed
+                for line in file:
+                    # Μια μισογραμμένη τελευταία γραμμή διαβάζεται την επόμενη φορά
+                    if not line.endswith(b'\n'):
+                        return
+                    consumed += len(line)
+                    yield line.decode('utf-8')
+
+            reader = csv.reader(lines())
+            if from_start:
+                next(reader, None)  # Επικεφαλίδες
+            rows.extend(reader)
+            file.seek(max(consumed - SALES_TAIL_BYTES, 0))
+            tail = zlib.crc32(file.read(min(consumed, SALES_TAIL_BYTES)))
+        return rows, {'offset': consumed, 'tail': tail}, from_start
+
+    def _replace_rows(self, table, rows):
+        self.headers[table] = list(self.paths[table][1])
+        self._rewrite(table, rows)
+
+    def migrate_customer_ids(self):
+        # Μία φορά, για αρχεία χωρίς στήλη κωδικού: κάθε πελάτης παίρνει κωδικό
+        # με τη σειρά του αρχείου και οι συνταγές/σημειώσεις συνδέονται με αυτόν
+        # βάσει του ονοματεπωνύμου τους. Όλα τα αρχεία γράφονται μαζί.
+        pending = [table for table, column in self.ID_COLUMNS.items() if len(self._header(table)) <= column]
+        if not pending:
+            return None
+        create_backup("Πριν από τους κωδικούς πελατών")
+        customers = [list(row) for _, row in self.iter_rows('customers')]
+        next_id = max((customer_id_of(row) or 0 for row in customers), default=0) + 1
+        by_name = {}
+        for row in customers:
+            row += [''] * (CUSTOMER_ID_COLUMN + 1 - len(row))
+            if customer_id_of(row) is None:
+                row[CUSTOMER_ID_COLUMN] = str(next_id)
+                next_id += 1
+            by_name.setdefault(full_name_key(row[0], row[1]), []).append(row[CUSTOMER_ID_COLUMN])
+        # Παλιές εγγραφές με διαφορετικά κενά ανάμεσα στα ονόματα
+        compact = {}
+        for key, ids in by_name.items():
+            compact.setdefault(key.replace(' ', ''), []).extend(ids)
+
+        counts = {'customers': len(customers), 'linked': 0, 'ambiguous': 0, 'unresolved': 0}
+        with self.atomic():
+            self._replace_rows('customers', customers)
+            for table in ('prescriptions', 'notes'):
+                column = self.ID_COLUMNS[table]
+                rows = list(self._read(table))
+                for row in rows:
+                    row += [''] * (column + 1 - len(row))
+                    if customer_id_of(row, column) is not None:
+                        continue
+                    key = normalize_text(row[1])
+                    ids = by_name.get(key) or compact.get(key.replace(' ', ''))
+                    if not ids:
+                        counts['unresolved'] += 1
+                        logging.warning(f"Δεν βρέθηκε πελάτης για την εγγραφή του {self.paths[table][0]}: "
+                                        f"{row[0]} {row[1]}")
+                        continue
+                    if len(ids) > 1:
+                        # Συνωνυμίες: η εγγραφή πάει στον πρώτο, όπως έδειχνε και πριν
+                        counts['ambiguous'] += 1
+                    row[column] = ids[0]
+                    counts['linked'] += 1
+                self._replace_rows(table, rows)
+        logging.info(f"Κωδικοί πελατών: {counts}")
+        return counts
+
+    def migrate_drawings(self):
+        rows = list(self._read('prescriptions'))
+        changed = 0
+        for row in rows:
+            for column in (16, 17):
+                if column < len(row):
+                    value = migrate_drawing(row[column])
+                    if value != row[column]:
+                        row[column] = value
+                        changed += 1
+        if changed:
+            self._rewrite('prescriptions', rows)
+            logging.info(f"Μετατράπηκαν {changed} σχέδια στο {self.paths['prescriptions'][0]}")
+        return changed
+
+    def close(self):
+        for index in self.offset_indexes.values():
+            index.flush()
+
+JOURNAL_COMPACT_RECORDS = 1000
+
+class JournalStorage(CsvStorage):
+    # Τα CSV πελατών/αποθήκης είναι το στιγμιότυπο και κάθε αλλαγή γράφεται ως
+    # μικρή εγγραφή στο <αρχείο>.journal με ένα fsync. Στη φόρτωση οι εγγραφές
+    # εφαρμόζονται πάνω στο στιγμιότυπο, και σε νήμα εργασίας ενσωματώνονται σε
+    # νέο στιγμιότυπο με os.replace. Η πρώτη γραμμή του journal κρατά το crc32
+    # του στιγμιότυπου στο οποίο αναφέρεται, ώστε ένα journal που έχει ήδη
+    # ενσωματωθεί (διακοπή ανάμεσα στις δύο μετονομασίες) να αγνοείται.
+    name = 'journal'
+    JOURNALED = ('customers', 'inventory')
+
+    def __init__(self):
+        # Πριν από το super(), γιατί εκεί μπορεί να τρέξει η μετάβαση σε κωδικούς
+        self._lock = threading.RLock()
+        self.state = {}
+        self.disk_ids = {}
+        self.next_disk = {}
+        self.records = {}
+        self.checksums = {}
+        self.compacting = set()
+        self._saved = None
+        super().__init__()
+
+    def _journal_path(self, table):
+        return self.paths[table][0] + '.journal'
+
+    def _file_stamp(self, table):
+        if table not in self.JOURNALED:
+            return super()._file_stamp(table)
+        stats = []
+        for path in (self.paths[table][0], self._journal_path(table)):
+            try:
+                st = os.stat(path)
+                stats.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+        return tuple(stats)
+
+    def _checksum(self, path):
+        crc = 0
+        with open(path, mode='rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                crc = zlib.crc32(chunk, crc)
+        return crc
+
+    def stamp(self, table):
+        with self._lock:
+            return super().stamp(table)
+
+    def _replay(self, table):
+        self._ensure(table)
+        path = self._journal_path(table)
+        rows = dict(enumerate(self._read(table)))
+        next_disk = len(rows)
+        checksum = self._checksum(self.paths[table][0])
+        records = 0
+        if os.path.exists(path):
+            good_end = 0
+            with open(path, mode='rb') as file:
+                lines = iter(file)
+                header = next(lines, b'')
+                try:
+                    base = json.loads(header.decode('utf-8'))['snapshot']
+                except (ValueError, KeyError, TypeError):
+                    base = None
+                if base != checksum:
+                    logging.warning(f"Το {path} δεν αντιστοιχεί στο {self.paths[table][0]} και αγνοείται")
+                    lines = iter(())
+                else:
+                    good_end = len(header)
+                for line in lines:
+                    # Μια μισογραμμένη τελευταία εγγραφή (διακοπή ρεύματος) απορρίπτεται
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line.decode('utf-8'))
+                        op = record['op']
+                        if op == 'insert':
+                            rows[next_disk] = record['row']
+                            next_disk += 1
+                        elif op == 'update':
+                            rows[record['id']] = record['row']
+                        elif op == 'delete':
+                            rows.pop(record['id'], None)
+                    except (ValueError, KeyError, TypeError):
+                        break
+                    good_end += len(line)
+                    records += 1
+            if base == checksum and good_end < os.path.getsize(path):
+                with open(path, mode='r+b') as file:
+                    file.truncate(good_end)
+                logging.warning(f"Αποκόπηκε ατελής εγγραφή στο τέλος του {path}")
+            if base != checksum:
+                self._start_journal(table, checksum)
+        self.state[table] = rows
+        self.disk_ids[table] = {disk_id: disk_id for disk_id in rows}
+        self.next_disk[table] = next_disk
+        self._next_ids[table] = next_disk
+        self.records[table] = records
+        self.checksums[table] = checksum
+        self.aliases.pop(table, None)
+        if records:
+            logging.info(f"Εφαρμόστηκαν {records} εγγραφές από το {path}")
+
+    def _start_journal(self, table, checksum):
+        with AtomicWriteGroup() as group:
+            group.open(self._journal_path(table)).write(json.dumps({'snapshot': checksum}) + '\n')
+
+    @contextlib.contextmanager
+    def atomic(self):
+        # Η συμπύκνωση περιμένει να ολοκληρωθεί η ομάδα. Η κατάσταση στη μνήμη
+        # αλλάζει πριν γραφτεί το journal, οπότε αν η ομάδα δεν ολοκληρωθεί
+        # επανέρχεται από το αντίγραφο που κράτησε το _ensure_loaded.
+        with self._lock:
+            if self._group is not None:
+                with super().atomic():
+                    yield
+                return
+            self._saved = {}
+            try:
+                with super().atomic():
+                    yield
+            except BaseException:
+                for table, saved in self._saved.items():
+                    (self.state[table], self.disk_ids[table], self.next_disk[table],
+                     self.records[table], self.checksums[table], self.headers[table]) = saved
+                raise
+            finally:
+                self._saved = None
+
+    def iter_rows(self, table):
+        if table not in self.JOURNALED:
+            yield from super().iter_rows(table)
+            return
+        with self._lock:
+            self._replay(table)
+            rows = sorted(self.state[table].items())
+        yield from rows
+
+    def _log(self, table, records):
+        path = self._journal_path(table)
+        if not os.path.exists(path):
+            self._start_journal(table, self.checksums[table])
+        text = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        if self._group is not None:
+            self._group.append(path, text)
+        else:
+            with METRICS.timer('journal.append'), open(path, mode='a', encoding='utf-8', newline='\n') as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+        self.records[table] += len(records)
+        self.aliases.pop(table, None)
+        if self.records[table] >= JOURNAL_COMPACT_RECORDS and table not in self.compacting:
+            self.compacting.add(table)
+            threading.Thread(target=self.compact, args=(table,), daemon=True).start()
+
+    def _ensure_loaded(self, table):
+        if table not in self.state:
+            for _ in self.iter_rows(table):
+                pass
+        if self._saved is not None and table not in self._saved:
+            self._saved[table] = (dict(self.state[table]), dict(self.disk_ids[table]), self.next_disk[table],
+                                  self.records[table], self.checksums[table], self.headers[table])
+
+    def insert_row(self, table, row):
+        if table not in self.JOURNALED:
+            return super().insert_row(table, row)
+        with self._lock:
+            self._ensure_loaded(table)
+            disk_id = self.next_disk[table]
+            self.next_disk[table] = disk_id + 1
+            row_id = self._next_ids[table]
+            self._next_ids[table] = row_id + 1
+            self.disk_ids[table][row_id] = disk_id
+            self.state[table][disk_id] = list(row)
+            self._log(table, [{'op': 'insert', 'row': list(row)}])
+            return row_id
+
+    def insert_rows(self, table, rows):
+        if table not in self.JOURNALED:
+            return super().insert_rows(table, rows)
+        with self._lock:
+            self._ensure_loaded(table)
+            row_ids = []
+            records = []
+            for row in rows:
+                disk_id = self.next_disk[table]
+                self.next_disk[table] = disk_id + 1
+                row_id = self._next_ids[table]
+                self._next_ids[table] = row_id + 1
+                self.disk_ids[table][row_id] = disk_id
+                self.state[table][disk_id] = list(row)
+                row_ids.append(row_id)
+                records.append({'op': 'insert', 'row': list(row)})
+            self._log(table, records)
+            return row_ids
+
+    def update_row(self, table, row_id, row, all_rows):
+        if table not in self.JOURNALED:
+            return super().update_row(table, row_id, row, all_rows)
+        with self._lock:
+            self._ensure_loaded(table)
+            disk_id = self.disk_ids[table][row_id]
+            self.state[table][disk_id] = list(row)
+            self._log(table, [{'op': 'update', 'id': disk_id, 'row': list(row)}])
+
+    def update_rows(self, table, items, all_rows):
+        # Όλες οι αλλαγές σε μία προσθήκη στο journal, με ένα fsync
+        if table not in self.JOURNALED:
+            return super().update_rows(table, items, all_rows)
+        with self._lock:
+            self._ensure_loaded(table)
+            records = []
+            for row_id, row in items:
+                disk_id = self.disk_ids[table][row_id]
+                self.state[table][disk_id] = list(row)
+                records.append({'op': 'update', 'id': disk_id, 'row': list(row)})
+            self._log(table, records)
+
+    def delete_rows(self, table, row_ids, all_rows):
+        if table not in self.JOURNALED:
+            return super().delete_rows(table, row_ids, all_rows)
+        with self._lock:
+            self._ensure_loaded(table)
+            records = []
+            for row_id in row_ids:
+                disk_id = self.disk_ids[table].pop(row_id)
+                self.state[table].pop(disk_id, None)
+                records.append({'op': 'delete', 'id': disk_id})
+            self._log(table, records)
+
+    def _write_snapshot(self, table):
+        # Νέο στιγμιότυπο και νέο άδειο journal, και τα δύο με os.replace (ή
+        # μαζί με την τρέχουσα ομάδα εγγραφών, αν υπάρχει)
+        path = self.paths[table][0]
+        ordered = sorted(self.state[table].items())
+        with self._writes() as group:
+            file = group.open(path)
+            writer = csv.writer(file)
+            writer.writerow(self.headers.get(table, self.paths[table][1]))
+            writer.writerows(row for _, row in ordered)
+            file.flush()
+            checksum = self._checksum(path + '.tmp')
+            group.open(self._journal_path(table)).write(json.dumps({'snapshot': checksum}) + '\n')
+        # Οι θέσεις στο νέο στιγμιότυπο είναι πλέον 0..n-1
+        positions = {disk_id: position for position, (disk_id, _) in enumerate(ordered)}
+        self.disk_ids[table] = {row_id: positions[disk_id]
+                                for row_id, disk_id in self.disk_ids[table].items()}
+        self.state[table] = {position: row for position, (_, row) in enumerate(ordered)}
+        self.next_disk[table] = len(ordered)
+        self.checksums[table] = checksum
+        self.records[table] = 0
+
+    def _replace_rows(self, table, rows):
+        if table not in self.JOURNALED:
+            return super()._replace_rows(table, rows)
+        with self._lock:
+            self._ensure_loaded(table)
+            self.headers[table] = list(self.paths[table][1])
+            self.state[table] = {disk_id: list(row) for disk_id, row in enumerate(rows)}
+            self.disk_ids[table] = {disk_id: disk_id for disk_id in self.state[table]}
+            self._next_ids[table] = len(rows)
+            self._write_snapshot(table)
+
+    def compact(self, table):
+        try:
+            with self._lock:
+                if not self.records.get(table):
+                    return
+                before = self.stamp(table)
+                records = self.records[table]
+                with METRICS.timer('journal.compact'):
+                    self._write_snapshot(table)
+                logging.info(f"Συμπυκνώθηκαν {records} εγγραφές στο {self.paths[table][0]}")
+                self.aliases[table] = (self._file_stamp(table), before)
+        except Exception as e:
+            logging.error(f"Σφάλμα κατά τη συμπύκνωση του {self.paths[table][0]}: {str(e)}")
+        finally:
+            self.compacting.discard(table)
+
+    def close(self):
+        for table in self.JOURNALED:
+            if self.records.get(table):
+                self.compact(table)
+        super().close()
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    surname TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT '',
+    address TEXT NOT NULL DEFAULT '',
+    documents TEXT NOT NULL DEFAULT '',
+    flags TEXT NOT NULL DEFAULT '',
+    name_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_customers_name_key ON customers(name_key);
+CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone);
+CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email);
+
+CREATE TABLE IF NOT EXISTS inventory (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    quantity INTEGER NOT NULL DEFAULT 0,
+    price REAL NOT NULL DEFAULT 0,
+    name_key TEXT NOT NULL,
+    sku TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_inventory_name_key ON inventory(name_key);
+
+CREATE TABLE IF NOT EXISTS prescriptions (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER REFERENCES customers(id) ON DELETE CASCADE,
+    customer_name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    date TEXT NOT NULL,
+    far_sph1 TEXT, far_cyl1 TEXT, far_axe1 TEXT, far_sph2 TEXT, far_cyl2 TEXT, far_axe2 TEXT, far_ecart TEXT,
+    near_sph1 TEXT, near_cyl1 TEXT, near_axe1 TEXT, near_sph2 TEXT, near_cyl2 TEXT, near_axe2 TEXT, near_ecart TEXT,
+    lines_d TEXT NOT NULL DEFAULT '[]',
+    lines_a TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_customer ON prescriptions(customer_id);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_name_key ON prescriptions(name_key);
+
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER REFERENCES customers(id) ON DELETE CASCADE,
+    customer_name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    date TEXT NOT NULL,
+    notes TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_notes_customer ON notes(customer_id);
+CREATE INDEX IF NOT EXISTS idx_notes_name_key ON notes(name_key);
+
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    receipt TEXT NOT NULL,
+    product TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    quantity INTEGER NOT NULL,
+    unit_price REAL NOT NULL,
+    total REAL NOT NULL
+);
+"""
+
+SALES_COLUMNS = ["date", "receipt", "product", "category", "quantity", "unit_price", "total"]
+
+PRESCRIPTION_COLUMNS = [
+    "far_sph1", "far_cyl1", "far_axe1", "far_sph2", "far_cyl2", "far_axe2", "far_ecart",
+    "near_sph1", "near_cyl1", "near_axe1", "near_sph2", "near_cyl2", "near_axe2", "near_ecart",
+    "lines_d", "lines_a",
+]
+
+class SqliteStorage:
+    # Αποθήκευση σε SQLite: κάθε αλλαγή είναι ένα UPDATE/DELETE μίας γραμμής,
+    # και οι συνταγές/σημειώσεις συνδέονται με τον πελάτη μέσω foreign key. Ο
+    # κωδικός πελάτη είναι το customers.id. Στις συνταγές/σημειώσεις το
+    # name_key κρατά τον κωδικό ως κείμενο, ώστε όσες γράφτηκαν πριν αποθηκευτεί
+    # ο πελάτης να συνδεθούν όταν αποθηκευτεί.
+    name = 'sqlite'
+    SCHEMA_VERSION = 2
+
+    TABLE_COLUMNS = {
+        'customers': ["name", "surname", "phone", "email", "address", "documents", "flags"],
+        'inventory': ["name", "category", "quantity", "price", "sku"],
+    }
+
+    def __init__(self, path=STORAGE_DB):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self.rollbacks = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.conn.commit()
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            self._migrate_customer_ids()
+        if version < 2:
+            self._migrate_inventory_sku()
+
+    def _migrate_customer_ids(self):
+        # Οι παλιές βάσεις είχαν ως name_key το ονοματεπώνυμο: όσες εγγραφές δεν
+        # είχαν ήδη customer_id συνδέονται με τον πρώτο πελάτη με αυτό το όνομα
+        with self._transaction():
+            for table in ('prescriptions', 'notes'):
+                self.conn.execute(
+                    f"UPDATE {table} SET customer_id = "
+                    f"(SELECT MIN(c.id) FROM customers c WHERE c.name_key = {table}.name_key) "
+                    f"WHERE customer_id IS NULL")
+                self.conn.execute(
+                    f"UPDATE {table} SET name_key = CAST(customer_id AS TEXT) WHERE customer_id IS NOT NULL")
+            self.conn.execute("PRAGMA user_version = 1")
+        logging.info(f"Κωδικοί πελατών στη βάση {self.path}")
+
+    def _migrate_inventory_sku(self):
+        # Οι βάσεις πριν από τους κωδικούς προϊόντων δεν έχουν τη στήλη sku
+        with self._transaction():
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(inventory)")]
+            if 'sku' not in columns:
+                self.conn.execute("ALTER TABLE inventory ADD COLUMN sku TEXT NOT NULL DEFAULT ''")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_sku ON inventory(sku)")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # Οι εσωτερικές συναλλαγές ενώνονται με την εξωτερική: commit ή
+        # rollback γίνεται μόνο όταν κλείσει η πρώτη
+        with self._lock:
+            self._depth += 1
+            try:
+                yield
+                if self._depth == 1:
+                    self.conn.commit()
+            except BaseException:
+                if self._depth == 1:
+                    self.conn.rollback()
+                    self.rollbacks += 1
+                raise
+            finally:
+                self._depth -= 1
+
+    def atomic(self):
+        # Όλες οι αλλαγές μέσα στο block είναι μία συναλλαγή
+        return self._transaction()
+
+    def _row_key(self, table, row):
+        if table == 'customers':
+            return full_name_key(row[0], row[1])
+        return normalize_text(row[0])
+
+    def _values(self, table, row):
+        values = list(row[:len(self.TABLE_COLUMNS[table])])
+        values += [''] * (len(self.TABLE_COLUMNS[table]) - len(values))
+        if table == 'inventory':
+            values[2] = int(values[2] or 0)
+            values[3] = float(values[3] or 0)
+            values[4] = normalize_sku(values[4])
+        return values
+
+    def stamp(self, table):
+        # Το data_version αλλάζει μόνο με commit άλλων συνδέσεων· μετά από
+        # rollback τα αποθετήρια έχουν αλλαγές που δεν γράφτηκαν και ξαναφορτώνουν
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0], self.rollbacks
+
+    def iter_rows(self, table, chunk_size=LOAD_BATCH_SIZE):
+        # Ανάγνωση σε κομμάτια ώστε το κλείδωμα να μην κρατιέται για όλο τον πίνακα
+        columns = ", ".join(self.TABLE_COLUMNS[table])
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT id, {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, chunk_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                values = [str(value) for value in row[1:]]
+                if table == 'customers':
+                    values.append(str(row[0]))
+                yield row[0], values
+            last_id = rows[-1][0]
+
+    def load_rows(self, table):
+        return list(self.iter_rows(table))
+
+    def _insert(self, table, row):
+        columns = list(self.TABLE_COLUMNS[table]) + ['name_key']
+        values = self._values(table, row) + [self._row_key(table, row)]
+        customer_id = customer_id_of(row) if table == 'customers' else None
+        if customer_id is not None:
+            columns.append('id')
+            values.append(customer_id)
+        placeholders = ", ".join("?" for _ in columns)
+        return self.conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", values).lastrowid
+
+    def insert_row(self, table, row):
+        with self._transaction():
+            row_id = self._insert(table, row)
+            if table == 'customers':
+                # Συνταγές/σημειώσεις που γράφτηκαν πριν αποθηκευτεί ο πελάτης
+                for linked in ('prescriptions', 'notes'):
+                    self.conn.execute(
+                        f"UPDATE {linked} SET customer_id = ? WHERE customer_id IS NULL AND name_key = ?",
+                        (row_id, str(row_id)))
+        return row_id
+
+    def insert_rows(self, table, rows):
+        # Όλες οι γραμμές σε μία συναλλαγή, και η σύνδεση των εκκρεμών
+        # συνταγών/σημειώσεων με μία ενημέρωση για όλους τους νέους πελάτες
+        with self._transaction():
+            row_ids = [self._insert(table, row) for row in rows]
+            if table == 'customers' and row_ids:
+                for linked in ('prescriptions', 'notes'):
+                    self.conn.execute(
+                        f"UPDATE {linked} SET customer_id = CAST(name_key AS INTEGER) "
+                        f"WHERE customer_id IS NULL AND name_key != '' AND name_key NOT GLOB '*[^0-9]*' "
+                        f"AND CAST(name_key AS INTEGER) IN (SELECT id FROM customers WHERE id >= ?)",
+                        (min(row_ids),))
+        return row_ids
+
+    def update_row(self, table, row_id, row, all_rows):
+        assignments = ", ".join(f"{column} = ?" for column in self.TABLE_COLUMNS[table])
+        with self._transaction():
+            self.conn.execute(
+                f"UPDATE {table} SET {assignments}, name_key = ? WHERE id = ?",
+                self._values(table, row) + [self._row_key(table, row), row_id])
+
+    def update_rows(self, table, items, all_rows):
+        assignments = ", ".join(f"{column} = ?" for column in self.TABLE_COLUMNS[table])
+        with self._transaction():
+            self.conn.executemany(
+                f"UPDATE {table} SET {assignments}, name_key = ? WHERE id = ?",
+                [self._values(table, row) + [self._row_key(table, row), row_id] for row_id, row in items])
+
+    def delete_rows(self, table, row_ids, all_rows):
+        with self._transaction():
+            self.conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id in row_ids])
+
+    def _link(self, row, column):
+        # (customer_id, name_key) μιας νέας συνταγής/σημείωσης. Εγγραφές χωρίς
+        # κωδικό (π.χ. από παλιό CSV που δεν αντιστοιχήθηκε) κρατούν το όνομα.
+        customer_id = customer_id_of(row, column)
+        if customer_id is None:
+            return None, normalize_text(row[1])
+        exists = self.conn.execute("SELECT 1 FROM customers WHERE id = ?", (customer_id,)).fetchone()
+        return (customer_id if exists else None), str(customer_id)
+
+    def _linked_query(self, table, columns, customer_id, limit=None):
+        query = (f"SELECT {columns} FROM {table} WHERE customer_id = ? "
+                 f"UNION ALL SELECT {columns} FROM {table} WHERE customer_id IS NULL AND name_key = ?")
+        if limit:
+            query += f" LIMIT {limit}"
+        with self._lock:
+            return self.conn.execute(query, (customer_id, str(customer_id))).fetchall()
+
+    def prescriptions_for(self, customer_id):
+        columns = "id, date, customer_name, " + ", ".join(PRESCRIPTION_COLUMNS)
+        rows = sorted(self._linked_query('prescriptions', columns, customer_id))
+        return [[value if value is not None else '' for value in row[1:]] + [str(customer_id)] for row in rows]
+
+    def notes_for(self, customer_id):
+        rows = sorted(self._linked_query('notes', "id, date, customer_name, notes", customer_id))
+        return [list(row[1:]) + [str(customer_id)] for row in rows]
+
+    def has_prescriptions(self, customer_id):
+        return bool(self._linked_query('prescriptions', "id", customer_id, limit=1))
+
+    def has_notes(self, customer_id):
+        return bool(self._linked_query('notes', "id", customer_id, limit=1))
+
+    def max_linked_id(self):
+        # Κωδικοί συνταγών/σημειώσεων πελατών που δεν έχουν αποθηκευτεί ακόμα
+        with self._lock:
+            return max(self.conn.execute(
+                f"SELECT MAX(CAST(name_key AS INTEGER)) FROM {table} "
+                f"WHERE customer_id IS NULL AND name_key != '' AND name_key NOT GLOB '*[^0-9]*'").fetchone()[0] or 0
+                for table in ('prescriptions', 'notes'))
+
+    def append_prescription(self, row):
+        values = list(row[2:2 + len(PRESCRIPTION_COLUMNS)])
+        values += [''] * (len(PRESCRIPTION_COLUMNS) - len(values))
+        columns = "customer_id, customer_name, name_key, date, " + ", ".join(PRESCRIPTION_COLUMNS)
+        placeholders = ", ".join("?" for _ in range(len(PRESCRIPTION_COLUMNS) + 4))
+        with self._transaction():
+            customer_id, key = self._link(row, PRESCRIPTION_CUSTOMER_COLUMN)
+            self.conn.execute(
+                f"INSERT INTO prescriptions ({columns}) VALUES ({placeholders})",
+                [customer_id, row[1], key, row[0]] + values)
+
+    def append_note(self, row):
+        with self._transaction():
+            customer_id, key = self._link(row, NOTE_CUSTOMER_COLUMN)
+            self.conn.execute(
+                "INSERT INTO notes (customer_id, customer_name, name_key, date, notes) VALUES (?, ?, ?, ?, ?)",
+                (customer_id, row[1], key, row[0], row[2]))
+
+    def append_sales(self, rows):
+        placeholders = ", ".join("?" for _ in SALES_COLUMNS)
+        with self._transaction():
+            self.conn.executemany(
+                f"INSERT INTO sales ({', '.join(SALES_COLUMNS)}) VALUES ({placeholders})",
+                [list(row[:4]) + [int(row[4]), float(row[5]), float(row[6])] for row in rows])
+
+    def read_sales(self, position=None):
+        # Όπως στο CsvStorage· εδώ η θέση είναι το id της τελευταίας πώλησης
+        last_id = position.get('id', 0) if position else 0
+        with self._lock:
+            top = self.conn.execute("SELECT MAX(id) FROM sales").fetchone()[0] or 0
+            if top < last_id:
+                last_id = 0
+            rows = self.conn.execute(
+                f"SELECT id, {', '.join(SALES_COLUMNS)} FROM sales WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+        new_id = rows[-1][0] if rows else last_id
+        return [[str(value) for value in row[1:]] for row in rows], {'id': new_id}, last_id == 0
+
+    def delete_customer_links(self, customer_id):
+        # Οι συνδεδεμένες εγγραφές διαγράφονται με ON DELETE CASCADE
+        with self._transaction():
+            for table in ('prescriptions', 'notes'):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE customer_id IS NULL AND name_key = ?",
+                    (str(customer_id),))
+
+    def migrate_drawings(self):
+        changed = 0
+        with self._transaction():
+            rows = self.conn.execute("SELECT id, lines_d, lines_a FROM prescriptions").fetchall()
+            for row_id, lines_d, lines_a in rows:
+                new_d, new_a = migrate_drawing(lines_d), migrate_drawing(lines_a)
+                if (new_d, new_a) != (lines_d, lines_a):
+                    self.conn.execute("UPDATE prescriptions SET lines_d = ?, lines_a = ? WHERE id = ?",
+                                      (new_d, new_a, row_id))
+                    changed += (new_d != lines_d) + (new_a != lines_a)
+        logging.info(f"Μετατράπηκαν {changed} σχέδια στη βάση {self.path}")
+        return changed
+
+    def export_csv(self, target_dir='.'):
+        with self._lock:
+            tables = [
+                (FILE_NAME, CUSTOMER_HEADERS,
+                 "SELECT " + ", ".join(self.TABLE_COLUMNS['customers']) + ", id FROM customers ORDER BY id"),
+                (INVENTORY_FILE, INVENTORY_HEADERS,
+                 "SELECT " + ", ".join(self.TABLE_COLUMNS['inventory']) + " FROM inventory ORDER BY id"),
+                (PRESCRIPTION_CSV, PRESCRIPTION_HEADERS,
+                 "SELECT p.date, COALESCE(TRIM(c.name || ' ' || c.surname), p.customer_name), "
+                 + ", ".join(f"p.{column}" for column in PRESCRIPTION_COLUMNS)
+                 + ", p.customer_id FROM prescriptions p LEFT JOIN customers c ON c.id = p.customer_id ORDER BY p.id"),
+                (NOTES_CSV, NOTES_HEADERS,
+                 "SELECT n.date, COALESCE(TRIM(c.name || ' ' || c.surname), n.customer_name), n.notes, n.customer_id"
+                 " FROM notes n LEFT JOIN customers c ON c.id = n.customer_id ORDER BY n.id"),
+                (SALES_CSV, SALES_HEADERS,
+                 "SELECT " + ", ".join(SALES_COLUMNS) + " FROM sales ORDER BY id"),
+            ]
+            with AtomicWriteGroup() as group:
+                for file_name, headers, query in tables:
+                    path = os.path.join(target_dir, file_name)
+                    writer = csv.writer(group.open(path))
+                    writer.writerow(headers)
+                    for row in self.conn.execute(query):
+                        writer.writerow(['' if value is None else value for value in row])
+                    logging.info(f"Εξαγωγή του {path} από τη βάση {self.path}")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+def migrate_csv_to_sqlite(db_path=STORAGE_DB):
+    if os.path.exists(db_path):
+        raise FileExistsError(f"Η βάση {db_path} υπάρχει ήδη!")
+    source = JournalStorage()
+    temp_path = db_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    target = SqliteStorage(temp_path)
+    try:
+        counts = {}
+        for table in ('customers', 'inventory'):
+            rows = [row for _, row in source.load_rows(table)]
+            for row in rows:
+                target.insert_row(table, row)
+            counts[table] = len(rows)
+        counts['prescriptions'] = counts['notes'] = 0
+        for row in source._read('prescriptions'):
+            target.append_prescription(row)
+            counts['prescriptions'] += 1
+        for row in source._read('notes'):
+            target.append_note(row)
+            counts['notes'] += 1
+        sales = list(source._read('sales'))
+        target.append_sales(sales)
+        counts['sales'] = len(sales)
+    finally:
+        target.close()
+    os.replace(temp_path, db_path)
+    logging.info(f"Μεταφορά των CSV στη βάση {db_path}: {counts}")
+    return counts
+
+def open_storage():
+    if os.path.exists(STORAGE_DB):
+        return SqliteStorage(STORAGE_DB)
+    return JournalStorage()
+
+class Repository:
+    # Κοινή βάση για τους πίνακες που κρατιούνται ολόκληροι στη μνήμη.
+    table = None
+
+    def __init__(self, storage, autoload=True):
+        self.storage = storage
+        self.rows = {}
+        self.listeners = []
+        self._stamp = None
+        self.loading = False
+        if autoload:
+            self.load()
+        else:
+            self.begin_load()
+
+    def subscribe(self, listener):
+        # listener(action, row_id, row) με action 'insert', 'update', 'delete' ή 'reload',
+        # ή 'insert_many'/'update_many' με row ένα dict {row_id: row} για αλλαγές
+        # που έγιναν μαζί
+        self.listeners.append(listener)
+
+    def _emit(self, action, row_id=None, row=None):
+        for listener in self.listeners:
+            listener(action, row_id, row)
+
+    def _clear_indexes(self):
+        pass
+
+    def _index_row(self, row_id, row):
+        pass
+
+    def _unindex_row(self, row_id, row):
+        pass
+
+    def _index_add(self, index, key, row_id):
+        if key:
+            index.setdefault(key, set()).add(row_id)
+
+    def _index_remove(self, index, key, row_id):
+        ids = index.get(key)
+        if ids:
+            ids.discard(row_id)
+            if not ids:
+                del index[key]
+
+    def load(self):
+        self.rows.clear()
+        self._clear_indexes()
+        with METRICS.timer('load.' + self.table):
+            for row_id, row in self.storage.load_rows(self.table):
+                self.rows[row_id] = row
+                self._index_row(row_id, row)
+        self._stamp = self.storage.stamp(self.table)
+        self._emit('reload')
+
+    def begin_load(self):
+        # Η φόρτωση γίνεται σε δόσεις από τον BackgroundLoader
+        self.loading = True
+        self.rows.clear()
+        self._clear_indexes()
+
+    def load_batch(self, batch):
+        for row_id, row in batch:
+            self.rows[row_id] = row
+            self._index_row(row_id, row)
+
+    def finish_load(self, stamp):
+        self._stamp = stamp
+        self.loading = False
+
+    def refresh(self):
+        # Επαναφόρτωση μόνο αν τα δεδομένα άλλαξαν εκτός εφαρμογής
+        if self.loading:
+            return
+        if self.storage.stamp(self.table) != self._stamp:
+            self.load()
+
+    def all(self):
+        self.refresh()
+        return list(self.rows.values())
+
+    def items(self):
+        self.refresh()
+        return list(self.rows.items())
+
+    def _persist(self, action):
+        try:
+            with METRICS.timer('write.' + self.table):
+                action()
+        except Exception:
+            # Η μνήμη ευθυγραμμίζεται ξανά με ό,τι γράφτηκε πραγματικά
+            self.load()
+            raise
+        self._stamp = self.storage.stamp(self.table)
+
+    def _add(self, row):
+        self.refresh()
+        with METRICS.timer('write.' + self.table):
+            row_id = self.storage.insert_row(self.table, row)
+        self.rows[row_id] = row
+        self._index_row(row_id, row)
+        self._stamp = self.storage.stamp(self.table)
+        self._emit('insert', row_id, row)
+        return row_id
+
+    def _add_many(self, rows):
+        # Πολλές νέες εγγραφές με μία προσθήκη στην αποθήκευση και ένα μόνο
+        # ειδοποιητικό για τους listeners
+        self.refresh()
+        with METRICS.timer('write.' + self.table):
+            row_ids = self.storage.insert_rows(self.table, rows)
+        added = {}
+        for row_id, row in zip(row_ids, rows):
+            self.rows[row_id] = row
+            self._index_row(row_id, row)
+            added[row_id] = row
+        self._stamp = self.storage.stamp(self.table)
+        self._emit('insert_many', None, added)
+        return row_ids
+
+    def _replace(self, row_ids, new_row):
+        # Η εγγραφή μένει στην ίδια θέση, αλλάζουν μόνο τα ευρετήρια
+        for row_id in row_ids:
+            self._unindex_row(row_id, self.rows[row_id])
+            self.rows[row_id] = list(new_row)
+            self._index_row(row_id, self.rows[row_id])
+        def action():
+            for row_id in row_ids:
+                self.storage.update_row(self.table, row_id, self.rows[row_id], self.rows.values())
+        self._persist(action)
+        for row_id in row_ids:
+            self._emit('update', row_id, self.rows[row_id])
+
+    def _replace_many(self, updates):
+        # Πολλές εγγραφές με διαφορετικές τιμές σε μία εγγραφή της αποθήκευσης
+        # και ένα μόνο ειδοποιητικό για τους listeners
+        for row_id, new_row in updates.items():
+            self._unindex_row(row_id, self.rows[row_id])
+            self.rows[row_id] = list(new_row)
+            self._index_row(row_id, self.rows[row_id])
+        self._persist(lambda: self.storage.update_rows(
+            self.table, [(row_id, self.rows[row_id]) for row_id in updates], self.rows.values()))
+        self._emit('update_many', None, {row_id: self.rows[row_id] for row_id in updates})
+
+    def _delete(self, row_ids):
+        for row_id in row_ids:
+            self._unindex_row(row_id, self.rows.pop(row_id))
+        self._persist(lambda: self.storage.delete_rows(self.table, row_ids, self.rows.values()))
+        for row_id in row_ids:
+            self._emit('delete', row_id)
+
+class CustomerRepository(Repository):
+    # Κρατάει τους πελάτες στη μνήμη με ευρετήρια για κωδικό, όνομα/επώνυμο, τηλέφωνο
+    # και email, ώστε οι αναζητήσεις και ο έλεγχος διπλοεγγραφών να μη διαβάζουν ξανά
+    # το αρχείο.
+    table = 'customers'
+
+    def _clear_indexes(self):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_phone = {}
+        self.by_email = {}
+        self.last_id = None
+
+    def _keys(self, row):
+        phone = normalize_phone(row[2]) if len(row) > 2 else ''
+        email_val = row[3].strip().lower() if len(row) > 3 else ''
+        return customer_key(row[0], row[1]), phone, email_val
+
+    def _index_row(self, row_id, row):
+        name_key, phone, email_val = self._keys(row)
+        customer_id = customer_id_of(row)
+        if customer_id is not None:
+            self.by_id[customer_id] = row_id
+        self._index_add(self.by_name, name_key, row_id)
+        self._index_add(self.by_phone, phone, row_id)
+        self._index_add(self.by_email, email_val, row_id)
+
+    def _unindex_row(self, row_id, row):
+        name_key, phone, email_val = self._keys(row)
+        if self.by_id.get(customer_id_of(row)) == row_id:
+            del self.by_id[customer_id_of(row)]
+        self._index_remove(self.by_name, name_key, row_id)
+        self._index_remove(self.by_phone, phone, row_id)
+        self._index_remove(self.by_email, email_val, row_id)
+
+    def _ids_for(self, name, surname):
+        return sorted(self.by_name.get(customer_key(name, surname), ()))
+
+    def find(self, name, surname):
+        self.refresh()
+        ids = self._ids_for(name, surname)
+        return self.rows[ids[0]] if ids else None
+
+    def get(self, customer_id):
+        self.refresh()
+        row_id = self.by_id.get(customer_id)
+        return self.rows[row_id] if row_id is not None else None
+
+    def next_id(self):
+        # Ο μετρητής ξεκινά από τον μεγαλύτερο κωδικό πελατών και συνδεδεμένων
+        # εγγραφών και μετά δεν χρειάζεται να ξαναδεί τα αρχεία
+        self.refresh()
+        if self.last_id is None:
+            self.last_id = max(max(self.by_id, default=0), self.storage.max_linked_id())
+        self.last_id += 1
+        return self.last_id
+
+    def next_ids(self, count):
+        # Συνεχόμενοι κωδικοί για μαζική εισαγωγή
+        first = self.next_id()
+        self.last_id += count - 1
+        return range(first, first + count)
+
+    def is_duplicate(self, name, surname, phone, email_val):
+        self.refresh()
+        return self.has_keys(name, surname, phone, email_val)
+
+    def has_keys(self, name, surname, phone, email_val):
+        # Όπως το is_duplicate, χωρίς refresh(), ώστε να καλείται και από νήμα εργασίας
+        if customer_key(name, surname) in self.by_name:
+            return True
+        if phone and normalize_phone(phone) in self.by_phone:
+            return True
+        if email_val and email_val.strip().lower() in self.by_email:
+            return True
+        return False
+
+    def add(self, row):
+        return self._add(row)
+
+    def add_many(self, rows):
+        return self._add_many(rows)
+
+    def update(self, customer_id, new_row):
+        # Μόνο η γραμμή του πελάτη· οι συνταγές/σημειώσεις δείχνουν στον κωδικό
+        self.refresh()
+        row_id = self.by_id.get(customer_id)
+        if row_id is None:
+            return False
+        self._replace([row_id], new_row)
+        return True
+
+    def delete(self, customer_id):
+        self.refresh()
+        row_id = self.by_id.get(customer_id)
+        if row_id is None:
+            return 0
+        self._delete([row_id])
+        return 1
+
+class InventoryRepository(Repository):
+    table = 'inventory'
+
+    def _clear_indexes(self):
+        self.by_name = {}
+        self.by_sku = {}
+
+    def _index_row(self, row_id, row):
+        self._index_add(self.by_name, normalize_text(row[0]), row_id)
+        self._index_add(self.by_sku, product_sku(row), row_id)
+
+    def _unindex_row(self, row_id, row):
+        self._index_remove(self.by_name, normalize_text(row[0]), row_id)
+        self._index_remove(self.by_sku, product_sku(row), row_id)
+
+    def _ids_for(self, product_name):
+        return sorted(self.by_name.get(normalize_text(product_name), ()))
+
+    def find(self, product_name):
+        self.refresh()
+        ids = self._ids_for(product_name)
+        return self.rows[ids[0]] if ids else None
+
+    def find_sku(self, sku):
+        # Μία αναζήτηση στο λεξικό ανά σάρωση barcode
+        self.refresh()
+        ids = self.by_sku.get(normalize_sku(sku))
+        return self.rows[min(ids)] if ids else None
+
+    def set_sku(self, product_name, sku):
+        self.refresh()
+        ids = self._ids_for(product_name)
+        if not ids:
+            return False
+        row = list(self.rows[ids[0]])
+        row += [''] * (INVENTORY_SKU_COLUMN + 1 - len(row))
+        row[INVENTORY_SKU_COLUMN] = normalize_sku(sku)
+        self._replace(ids[:1], row)
+        return True
+
+    def add(self, row):
+        return self._add([str(value) for value in row])
+
+    def add_many(self, rows):
+        return self._add_many([[str(value) for value in row] for row in rows])
+
+    # Χωρίς refresh(), ώστε να καλούνται και από νήμα εργασίας
+    def has_name(self, product_name):
+        return normalize_text(product_name) in self.by_name
+
+    def has_sku(self, sku):
+        return normalize_sku(sku) in self.by_sku
+
+    def set_quantity(self, product_name, quantity):
+        self.refresh()
+        ids = self._ids_for(product_name)
+        if not ids:
+            return False
+        row = list(self.rows[ids[0]])
+        row[2] = str(quantity)
+        self._replace(ids[:1], row)
+        return True
+
+    def set_quantities(self, quantities):
+        # quantities: {όνομα προϊόντος: νέα ποσότητα}, όλα σε μία εγγραφή
+        self.refresh()
+        updates = {}
+        for product_name, quantity in quantities.items():
+            ids = self._ids_for(product_name)
+            if ids:
+                row = list(self.rows[ids[0]])
+                row[2] = str(quantity)
+                updates[ids[0]] = row
+        if updates:
+            self._replace_many(updates)
+        return len(updates)
+
+    def delete(self, product_name):
+        self.refresh()
+        ids = self._ids_for(product_name)
+        if ids:
+            self._delete(ids)
+        return len(ids)
+
+DOCUMENT_CHUNK_SIZE = 1024 * 1024
+
+class DocumentStore:
+    # Αποθήκη εγγράφων με διεύθυνση περιεχομένου: κάθε αρχείο αποθηκεύεται μία
+    # φορά ως blobs/ab/cd/<sha256><κατάληξη>, όσοι πελάτες κι αν το έχουν. Η
+    # στήλη "Έγγραφα" του πελάτη κρατά αυτά τα ονόματα, και το documents.json
+    # το αρχικό όνομα και τους κωδικούς των πελατών που έχουν κάθε blob. Τα
+    # παλιά έγγραφα (ένα αρχείο ανά πελάτη στον φάκελο) εξακολουθούν να
+    # λειτουργούν.
+    BLOB_REF = re.compile(r'[0-9a-f]{64}(\.[^\\/.]{1,16})?')
+
+    def __init__(self, root=DOCUMENTS_DIR):
+        self.root = root
+        self.blobs_dir = os.path.join(root, 'blobs')
+        self.index_path = os.path.join(root, 'documents.json')
+        self._lock = threading.RLock()
+        try:
+            with open(self.index_path, mode='r', encoding='utf-8') as file:
+                self.index = json.load(file)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        with AtomicWriteGroup() as group:
+            json.dump(self.index, group.open(self.index_path), ensure_ascii=False)
+
+    def is_blob(self, ref):
+        return bool(self.BLOB_REF.fullmatch(ref))
+
+    def path(self, ref):
+        if self.is_blob(ref):
+            return os.path.join(self.blobs_dir, ref[:2], ref[2:4], ref)
+        return os.path.join(self.root, ref)
+
+    def exists(self, ref):
+        return os.path.exists(self.path(ref))
+
+    def display_name(self, ref):
+        entry = self.index.get(ref[:64]) if self.is_blob(ref) else None
+        return entry['name'] if entry else ref
+
+    def put(self, source_path, progress=None, cancelled=None):
+        # Ένα πέρασμα: το αρχείο αντιγράφεται σε προσωρινό ενώ υπολογίζεται το
+        # sha256, και μετακινείται στη θέση του μόνο αν δεν υπάρχει ήδη.
+        # progress(bytes) καλείται μετά από κάθε κομμάτι, και αν οριστεί το
+        # cancelled (threading.Event) η αντιγραφή σταματά στο επόμενο κομμάτι.
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        ext = os.path.splitext(source_path)[1].lower()
+        if not self.BLOB_REF.fullmatch('0' * 64 + ext):
+            ext = ''
+        digest = hashlib.sha256()
+        temp_path = os.path.join(self.blobs_dir, f"import_{threading.get_ident()}_{time.time_ns()}.tmp")
+        size = 0
+        try:
+            with open(source_path, mode='rb') as source, open(temp_path, mode='wb') as target:
+                for chunk in iter(lambda: source.read(DOCUMENT_CHUNK_SIZE), b''):
+                    if cancelled is not None and cancelled.is_set():
+                        raise DocumentImportCancelled(source_path)
+                    digest.update(chunk)
+                    target.write(chunk)
+                    size += len(chunk)
+                    if progress:
+                        progress(size)
+                target.flush()
+                os.fsync(target.fileno())
+            ref = digest.hexdigest() + ext
+            blob_path = self.path(ref)
+            with self._lock:
+                if os.path.exists(blob_path):
+                    os.remove(temp_path)
+                    logging.info(f"Το έγγραφο {os.path.basename(source_path)} υπάρχει ήδη ως {ref}")
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(temp_path, blob_path)
+                    logging.info(f"Αποθηκεύτηκε το έγγραφο {os.path.basename(source_path)} ως {ref}")
+                entry = self.index.setdefault(ref[:64], {'name': os.path.basename(source_path), 'owners': []})
+                entry['size'] = size
+                self._save()
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return ref
+
+    def acquire(self, refs, customer_id):
+        with self._lock:
+            for ref in refs:
+                if self.is_blob(ref):
+                    entry = self.index.setdefault(ref[:64], {'name': ref, 'owners': []})
+                    owners = entry.setdefault('owners', [])
+                    if customer_id not in owners:
+                        owners.append(customer_id)
+            self._save()
+
+    def release(self, refs, customer_id):
+        # Επιστρέφει όσα έγγραφα δεν βρέθηκαν. Ένα blob διαγράφεται μόνο όταν
+        # δεν το έχει πλέον κανένας πελάτης. Οι εγγραφές από πριν τους κωδικούς
+        # πελατών κρατούν μόνο πλήθος (refs) μέχρι το επόμενο collect().
+        missing = []
+        with self._lock:
+            for ref in refs:
+                path = self.path(ref)
+                if not os.path.exists(path):
+                    missing.append(ref)
+                    continue
+                if self.is_blob(ref):
+                    entry = self.index.get(ref[:64])
+                    if entry and 'owners' in entry:
+                        if customer_id in entry['owners']:
+                            entry['owners'].remove(customer_id)
+                        if entry['owners']:
+                            continue
+                    elif entry and entry.get('refs', 0) > 1:
+                        entry['refs'] -= 1
+                        continue
+                    self.index.pop(ref[:64], None)
+                os.remove(path)
+                logging.info(f"Διαγράφηκε το έγγραφο: {ref}")
+            self._save()
+        return missing
+
+    def collect(self, customer_rows):
+        # Σβήνει τα blobs που δεν αναφέρει κανένας πελάτης, π.χ. από ακυρωμένη
+        # καταχώρηση, και ξαναχτίζει τους κατόχους όσων αναφέρονται από τις
+        # στήλες "Έγγραφα". Όσα έχουν έστω και έναν κάτοχο μένουν, ακόμα κι αν
+        # οι πελάτες που φορτώθηκαν δεν τα αναφέρουν.
+        referenced = {}
+        for row in customer_rows:
+            if len(row) > 5 and row[5]:
+                customer_id = customer_id_of(row)
+                for ref in row[5].split(","):
+                    if self.is_blob(ref.strip()):
+                        owners = referenced.setdefault(ref.strip()[:64], [])
+                        if customer_id is not None and customer_id not in owners:
+                            owners.append(customer_id)
+        removed = 0
+        changed = False
+        with self._lock:
+            for digest, owners in referenced.items():
+                entry = self.index.get(digest)
+                if entry is not None and entry.get('owners') != owners:
+                    entry.pop('refs', None)
+                    entry['owners'] = owners
+                    changed = True
+            if os.path.isdir(self.blobs_dir):
+                for folder, _, files in os.walk(self.blobs_dir):
+                    for name in files:
+                        digest = name[:64]
+                        entry = self.index.get(digest) or {}
+                        if (self.is_blob(name) and digest not in referenced
+                                and not entry.get('owners') and entry.get('refs', 0) <= 0):
+                            os.remove(os.path.join(folder, name))
+                            self.index.pop(digest, None)
+                            removed += 1
+            if removed or changed:
+                self._save()
+        if removed:
+            logging.info(f"Διαγράφηκαν {removed} έγγραφα χωρίς πελάτη")
+        return removed
+
+    def migrate(self, customers):
+        # Μεταφορά των παλιών εγγράφων του φακέλου στην αποθήκη
+        moved = 0
+        for row_id, row in customers.items():
+            if len(row) <= 5 or not row[5]:
+                continue
+            refs = [ref.strip() for ref in row[5].split(",") if ref.strip()]
+            new_refs = []
+            for ref in refs:
+                if not self.is_blob(ref) and os.path.exists(self.path(ref)):
+                    legacy_path = self.path(ref)
+                    ref = self.put(legacy_path)
+                    self.acquire([ref], customer_id_of(row))
+                    os.remove(legacy_path)
+                    moved += 1
+                if ref not in new_refs:
+                    new_refs.append(ref)
+            if new_refs != refs:
+                new_row = list(row)
+                new_row[5] = ", ".join(new_refs)
+                customers.update(customer_id_of(row), new_row)
+        logging.info(f"Μεταφέρθηκαν {moved} έγγραφα στην αποθήκη εγγράφων")
+        return moved
+
+THUMBNAIL_DIR = os.path.join(DOCUMENTS_DIR, 'thumbnails')
+THUMBNAIL_SIZE = (360, 360)
+THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024
+THUMBNAIL_IMAGE_TYPES = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tif', '.tiff', '.webp')
+
+class ThumbnailCache:
+    # Μικρογραφίες εγγράφων στον δίσκο, μία ανά περιεχόμενο (sha256), που
+    # δημιουργούνται με Pillow σε νήμα εργασίας. Όταν το σύνολό τους ξεπεράσει
+    # το THUMBNAIL_CACHE_BYTES διαγράφονται όσες δεν χρησιμοποιήθηκαν πρόσφατα.
+    # Χωρίς Pillow, ή για αρχεία που δεν είναι εικόνες, δεν υπάρχει μικρογραφία.
+    def __init__(self, root, store, cache_dir=THUMBNAIL_DIR, max_bytes=THUMBNAIL_CACHE_BYTES):
+        self.root = root
+        self.store = store
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.callbacks = {}
+        self.thread = None
+        self.total = None
+
+    def request(self, ref, callback):
+        # callback(ref, path) καλείται στο νήμα του Tk, με path None αν δεν υπάρχει μικρογραφία
+        waiting = self.callbacks.setdefault(ref, [])
+        waiting.append(callback)
+        if len(waiting) > 1:
+            return
+        self.requests.put(ref)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._work, daemon=True)
+            self.thread.start()
+        if len(self.callbacks) == 1:
+            self.root.after(LOAD_POLL_MS, self._poll)
+
+    def _work(self):
+        while True:
+            ref = self.requests.get()
+            try:
+                path = self._thumbnail(ref)
+            except Exception as e:
+                logging.error(f"Σφάλμα κατά τη δημιουργία μικρογραφίας για {ref}: {str(e)}")
+                path = None
+            self.results.put((ref, path))
+
+    def _key(self, ref):
+        if self.store.is_blob(ref):
+            return ref[:64]
+        digest = hashlib.sha256()
+        with open(self.store.path(ref), mode='rb') as file:
+            for chunk in iter(lambda: file.read(DOCUMENT_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _thumbnail(self, ref):
+        source = self.store.path(ref)
+        if not source.lower().endswith(THUMBNAIL_IMAGE_TYPES) or not os.path.exists(source):
+            return None
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+        path = os.path.join(self.cache_dir, self._key(ref) + '.png')
+        if os.path.exists(path):
+            os.utime(path)  # πρόσφατη χρήση για το LRU
+            return path
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with Image.open(source) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGB')
+            temp_path = path + '.tmp'
+            image.save(temp_path, 'PNG')
+        os.replace(temp_path, path)
+        self._evict(os.path.getsize(path))
+        return path
+
+    def _evict(self, added):
+        if self.total is None:
+            self.total = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir)
+                             if entry.name.endswith('.png'))
+        else:
+            self.total += added
+        if self.total <= self.max_bytes:
+            return
+        entries = sorted((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                         for entry in os.scandir(self.cache_dir) if entry.name.endswith('.png'))
+        for _, size, path in entries:
+            if self.total <= self.max_bytes * 0.9:
+                break
+            os.remove(path)
+            self.total -= size
+        logging.info(f"Καθαρισμός μικρογραφιών: {self.total} bytes στον δίσκο")
+
+    def _poll(self):
+        while True:
+            try:
+                ref, path = self.results.get_nowait()
+            except queue.Empty:
+                break
+            for callback in self.callbacks.pop(ref, []):
+                callback(ref, path)
+        if self.callbacks:
+            self.root.after(LOAD_POLL_MS * 2, self._poll)
+
+DOCUMENT_IMPORT_WORKERS = 3
+
+class DocumentImportCancelled(Exception):
+    pass
+
+class DocumentImporter:
+    # Εισάγει έγγραφα στην DocumentStore από ομάδα νημάτων, ώστε η αντιγραφή
+    # μεγάλων αρχείων (π.χ. από κοινόχρηστο φάκελο δικτύου) να μην παγώνει το
+    # παράθυρο. Η πρόοδος περνά στο νήμα του Tk μέσω ουράς, όπως στον BackgroundLoader.
+    def __init__(self, root, store, paths, on_progress=None, on_file=None, on_done=None,
+                 workers=DOCUMENT_IMPORT_WORKERS):
+        self.root = root
+        self.store = store
+        self.paths = list(paths)
+        self.on_progress = on_progress
+        self.on_file = on_file
+        self.on_done = on_done
+        self.workers = workers
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+        self.running = False
+        self.done = {}
+        self.total = 0
+        self.remaining = 0
+        self.errors = []
+
+    def start(self):
+        for path in self.paths:
+            try:
+                self.total += os.path.getsize(path)
+            except OSError:
+                pass
+        self.running = True
+        self.remaining = len(self.paths)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        for path in self.paths:
+            self.executor.submit(self._import, path)
+        self.executor.shutdown(wait=False)
+        self.root.after(LOAD_POLL_MS, self._poll)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _import(self, path):
+        try:
+            ref = self.store.put(path, progress=lambda size: self.queue.put(('progress', path, size)),
+                                 cancelled=self.cancelled)
+            self.queue.put(('file', path, ref))
+        except DocumentImportCancelled:
+            self.queue.put(('cancelled', path, None))
+        except Exception as e:
+            logging.error(f"Σφάλμα κατά την εισαγωγή του εγγράφου {path}: {str(e)}")
+            self.queue.put(('error', path, e))
+
+    def _poll(self):
+        finished = 0
+        while True:
+            try:
+                kind, path, payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.done[path] = payload
+                continue
+            finished += 1
+            if kind == 'file' and self.on_file:
+                self.on_file(path, payload)
+            elif kind == 'error':
+                self.errors.append((path, payload))
+        self.remaining -= finished
+        if self.on_progress:
+            self.on_progress(sum(self.done.values()), self.total)
+        if self.remaining > 0:
+            self.root.after(LOAD_POLL_MS * 5, self._poll)
+            return
+        self.running = False
+        if self.on_done:
+            self.on_done(self.errors, self.cancelled.is_set())
+
+IMPORT_PROGRESS_ROWS = 2000
+IMPORT_SNIFF_BYTES = 64 * 1024
+
+class CsvImportCancelled(Exception):
+    pass
+
+def read_import_csv(path, headers, progress=None, cancelled=None):
+    # Διαβάζει εξωτερικό CSV γραμμή-γραμμή, χωρίς να το φορτώσει ολόκληρο.
+    # Δέχεται UTF-8 (και με BOM) ή Windows-1253 και διαχωριστικό , ; ή tab,
+    # όπως τα αποθηκεύει το Excel. Οι στήλες αντιστοιχίζονται με τα ονόματα της
+    # επικεφαλίδας, αλλιώς με τη σειρά των headers. Δίνει (γραμμή αρχείου, πεδία).
+    total = os.path.getsize(path)
+    with open(path, mode='rb') as file:
+        sample = file.read(IMPORT_SNIFF_BYTES)
+        file.seek(0)
+        encoding = 'utf-8'
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(sample)
+        except UnicodeDecodeError:
+            encoding = 'cp1253'
+        # Το διαχωριστικό βρίσκεται από την πρώτη γραμμή μόνο, ώστε τα δεδομένα
+        # (π.χ. κόμματα μέσα σε διευθύνσεις) να μην το μπερδεύουν. Αν ο Sniffer
+        # δεν καταλήξει, κρατιέται αυτό που τη χωρίζει σε περισσότερα πεδία.
+        # Αρχείο με μία μόνο στήλη δεν εισάγεται, γιατί κάθε γραμμή θα γινόταν
+        # ένα πεδίο.
+        header_line = (sample.decode(encoding, errors='ignore').lstrip('\ufeff').splitlines() or [''])[0]
+        try:
+            delimiter = csv.Sniffer().sniff(header_line, ';,\t').delimiter
+        except csv.Error:
+            delimiter = max(',;\t', key=lambda candidate: len(next(csv.reader([header_line], delimiter=candidate))))
+        columns = len(next(csv.reader([header_line], delimiter=delimiter)))
+        if columns < 2:
+            raise ValidationError("Το αρχείο πρέπει να έχει στήλες χωρισμένες με κόμμα, ερωτηματικό ή tab!")
+        consumed = 0
+
+        def lines():
+            nonlocal consumed
+            for raw in file:
+                text = raw.decode(encoding, errors='replace')
+                if not consumed:
+                    text = text.lstrip('\ufeff')
+                consumed += len(raw)
+                yield text
+
+        reader = csv.reader(lines(), delimiter=delimiter)
+        first = next(reader, None)
+        if first is None:
+            return
+        keys = [fold_text(name) for name in headers]
+        found = {fold_text(cell): index for index, cell in reversed(list(enumerate(first)))}
+        positions = [found.get(key) for key in keys]
+        pending = []
+        if all(position is None for position in positions):
+            positions = list(range(len(headers)))
+            pending.append(first)
+        count = 0
+        for row in itertools.chain(pending, reader):
+            if cancelled is not None and cancelled.is_set():
+                raise CsvImportCancelled()
+            count += 1
+            if progress and count % IMPORT_PROGRESS_ROWS == 0:
+                progress(consumed, total, count)
+            if not any(cell.strip() for cell in row):
+                continue
+            yield reader.line_num, [row[position].strip() if position is not None and position < len(row) else ''
+                                    for position in positions]
+        if progress:
+            progress(total, total, count)
+
+def finish_import(result, imported, what):
+    # Γράφει την αναφορά απορρίψεων δίπλα στο αρχείο που εισήχθη και
+    # επιστρέφει τα σύνολα της εισαγωγής
+    report = None
+    if result['rejected']:
+        base, _ = os.path.splitext(result['path'])
+        report = f"{base}.απορρίψεις.csv"
+        try:
+            with open(report, mode='w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(["Γραμμή", "Αιτία"] + list(result['headers']))
+                writer.writerows(result['rejected'])
+        except OSError as e:
+            logging.error(f"Σφάλμα κατά την εγγραφή της αναφοράς {report}: {str(e)}")
+            report = None
+    logging.info(f"Εισαγωγή {what} από {result['path']}: {imported} νέες εγγραφές, "
+                 f"{len(result['rejected'])} απορρίφθηκαν")
+    return {'imported': imported, 'rejected': len(result['rejected']), 'report': report}
+
+class CsvImporter:
+    # Μαζική εισαγωγή από CSV: η ανάγνωση και ο έλεγχος γίνονται σε νήμα
+    # εργασίας, και η εγγραφή (μία προσθήκη) στο νήμα του Tk, γιατί ενημερώνει
+    # τις λίστες μέσω των listeners. Όπως ο DocumentImporter.
+    def __init__(self, root, service, path, on_progress=None, on_read=None, on_done=None):
+        self.root = root
+        self.service = service
+        self.path = path
+        self.on_progress = on_progress
+        self.on_read = on_read
+        self.on_done = on_done
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._work, daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self._poll)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _work(self):
+        try:
+            result = self.service.read_import(
+                self.path, progress=lambda *values: self.queue.put(('progress', values)),
+                cancelled=self.cancelled)
+            self.queue.put(('read', result))
+        except CsvImportCancelled:
+            self.queue.put(('cancelled', None))
+        except Exception as e:
+            logging.error(f"Σφάλμα κατά την ανάγνωση του {self.path}: {str(e)}")
+            self.queue.put(('error', e))
+
+    def _poll(self):
+        progress = None
+        while True:
+            try:
+                kind, payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                progress = payload
+                continue
+            if kind == 'read':
+                if self.on_read:
+                    self.on_read(payload)
+                try:
+                    payload = self.service.save_import(payload)
+                except Exception as e:
+                    logging.error(f"Σφάλμα κατά την εισαγωγή του {self.path}: {str(e)}")
+                    kind, payload = 'error', e
+            if self.on_done:
+                self.on_done(kind, payload)
+            return
+        if progress and self.on_progress:
+            self.on_progress(*progress)
+        self.root.after(LOAD_POLL_MS * 5, self._poll)
+
+SEARCH_DEBOUNCE_MS = 200
+
+def fold_text(value):
+    # Αναζήτηση χωρίς τόνους/διαλυτικά και με το τελικό ς ίσο με σ
+    text = unicodedata.normalize('NFD', str(value).lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.replace('ς', 'σ').split())
+
+class CustomerSearchIndex:
+    # Ευρετήριο τριγράμμων ανά πεδίο. Οι υποψήφιοι προκύπτουν από το σπανιότερο
+    # τρίγραμμα της αναζήτησης και επιβεβαιώνονται στο κανονικοποιημένο κείμενο,
+    # οπότε οι παλιές αναφορές μετά από διόρθωση/διαγραφή απλώς φιλτράρονται.
+    # Με root το ευρετήριο χτίζεται σε νήμα εργασίας και ως τότε η αναζήτηση
+    # γίνεται σειριακά.
+    FIELDS = {'name': 0, 'phone': 1, 'email': 2, 'address': 3}
+
+    def __init__(self, repository, root=None):
+        self.repository = repository
+        self.root = root
+        self.grams = [{} for _ in self.FIELDS]
+        self.folded = {}
+        self.stale = 0
+        self.building = False
+        self.pending = []
+        repository.subscribe(self.on_change)
+
+    @staticmethod
+    def _fields(row):
+        row = list(row) + [''] * (5 - len(row))
+        return (fold_text(f"{row[0]} {row[1]}"), normalize_phone(row[2]),
+                fold_text(row[3]), fold_text(row[4]))
+
+    @classmethod
+    def _add(cls, grams, folded, rows):
+        stale = 0
+        for row_id, row in rows:
+            if row_id in folded:
+                stale += 1
+            fields = cls._fields(row)
+            folded[row_id] = fields
+            for field_grams, text in zip(grams, fields):
+                for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                    postings = field_grams.get(gram)
+                    if postings is None:
+                        postings = field_grams[gram] = array('I')
+                    postings.append(row_id)
+        return stale
+
+    def rebuild(self):
+        snapshot = list(self.repository.rows.items())
+        if self.root is None:
+            self.grams = [{} for _ in self.FIELDS]
+            self.folded = {}
+            self.stale = self._add(self.grams, self.folded, snapshot)
+            return
+        self.building = True
+        self.pending = []
+        result = {}
+
+        @METRICS.timer('search.index_build')
+        def work():
+            grams = [{} for _ in self.FIELDS]
+            folded = {}
+            self._add(grams, folded, snapshot)
+            result['index'] = (grams, folded)
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+
+        def finish():
+            if thread.is_alive():
+                self.root.after(100, finish)
+                return
+            if 'index' in result:
+                self.grams, self.folded = result['index']
+                self.stale = 0
+            self.building = False
+            pending, self.pending = self.pending, []
+            for event in pending:
+                self.on_change(*event)
+            logging.info(f"Ευρετήριο αναζήτησης: {len(self.folded)} πελάτες")
+
+        self.root.after(100, finish)
+
+    def on_change(self, action, row_id, row):
+        if self.building:
+            self.pending.append((action, row_id, row))
+            return
+        if action == 'reload':
+            self.rebuild()
+            return
+        if action in ('insert', 'update'):
+            self.stale += self._add(self.grams, self.folded, [(row_id, row)])
+        elif action == 'insert_many':
+            self.stale += self._add(self.grams, self.folded, list(row.items()))
+        elif action == 'delete':
+            if self.folded.pop(row_id, None) is not None:
+                self.stale += 1
+        if self.stale > max(len(self.folded), 1000):
+            self.rebuild()
+
+    @METRICS.timer('search.customers')
+    def search(self, field, text):
+        code = self.FIELDS[field]
+        query = normalize_phone(text) if field == 'phone' else fold_text(text)
+        words = query.split()
+        if not words:
+            return []
+        if self.building:
+            return [row_id for row_id, row in self.repository.rows.items()
+                    if all(word in self._fields(row)[code] for word in words)]
+        postings = [self.grams[code].get(word[i:i + 3], ())
+                    for word in words if len(word) >= 3
+                    for i in range(len(word) - 2)]
+        candidates = dict.fromkeys(min(postings, key=len)) if postings else self.folded
+        results = []
+        for row_id in candidates:
+            fields = self.folded.get(row_id)
+            if fields and all(word in fields[code] for word in words):
+                results.append(row_id)
+        results.sort()
+        return results
+
+class ValidationError(Exception):
+    # Το μήνυμα εμφανίζεται αυτούσιο στον χρήστη
+    pass
+
+PHONE_ERROR = ("Το τηλέφωνο πρέπει να είναι 10 ψηφία και να ξεκινάει:\n" +
+               "- με 69 για κινητό\n" +
+               "- με 2 για σταθερό")
+
+class CustomerService:
+    # Οι λειτουργίες πελατών χωρίς γραφικό περιβάλλον: έλεγχοι, εγγραφή και οι
+    # παρενέργειές της (σημαίες, έγγραφα, συνταγές/σημειώσεις). Τα παράθυρα
+    # διαλόγου απλώς εμφανίζουν τα ValidationError.
+    def __init__(self, customers, storage, documents, search_index=None):
+        self.customers = customers
+        self.storage = storage
+        self.documents = documents
+        self.search_index = search_index
+
+    @staticmethod
+    def documents_of(row):
+        if row and len(row) > 5 and row[5]:
+            return [doc.strip() for doc in row[5].split(",") if doc.strip()]
+        return []
+
+    def documents_for(self, customer_id):
+        return self.documents_of(self.customers.get(customer_id))
+
+    def get(self, customer_id):
+        return self.customers.get(customer_id)
+
+    def new_id(self):
+        # Για νέο πελάτη που μπορεί να αποκτήσει συνταγές/σημειώσεις πριν αποθηκευτεί
+        return self.customers.next_id()
+
+    @staticmethod
+    def field_error(name, phone, email_val):
+        # (μήνυμα, πρόβλημα, τιμή) για το πρώτο λάθος πεδίο ή None· κοινό για την
+        # καταχώρηση και τη μαζική εισαγωγή
+        if not name:
+            return "Το όνομα είναι υποχρεωτικό!", "χωρίς όνομα", None
+        if phone and not validate_phone(phone):
+            return PHONE_ERROR, "με μη έγκυρο τηλέφωνο", phone
+        if email_val and not validate_email(email_val):
+            return "Το email πρέπει να έχει τη μορφή: onoma@domain.com", "με μη έγκυρο email", email_val
+        return None
+
+    def validate(self, name, phone, email_val, context=''):
+        error = self.field_error(name, phone, email_val)
+        if error is not None:
+            message, problem, value = error
+            logging.warning(f"Προσπάθεια αποθήκευσης πελάτη {problem}{context}" +
+                            (f": {value}" if value is not None else ""))
+            raise ValidationError(message)
+
+    def _existing_documents(self, refs):
+        documents = []
+        for ref in refs:
+            if self.documents.exists(ref):
+                documents.append(ref)
+            else:
+                logging.warning(f"Το έγγραφο {ref} δεν βρέθηκε κατά την αποθήκευση")
+        return documents
+
+    def _flags(self, documents, customer_id):
+        flags = []
+        if documents:
+            flags.append("Έγγραφα")
+        if self.storage.has_prescriptions(customer_id):
+            flags.append("Συνταγές")
+        if self.storage.has_notes(customer_id):
+            flags.append("Σημειώσεις")
+        return ", ".join(flags)
+
+    def add(self, name, surname, phone='', email_val='', address='', documents=(), customer_id=None):
+        # Επιστρέφει τον κωδικό του νέου πελάτη
+        name, surname, phone, email_val, address = (str(value).strip() for value in
+                                                     (name, surname, phone, email_val, address))
+        self.validate(name, phone, email_val)
+        if self.customers.is_duplicate(name, surname, phone, email_val):
+            logging.warning(f"Προσπάθεια διπλής καταχώρισης πελάτη: {name} {surname}")
+            raise ValidationError("Υπάρχει ήδη πελάτης με τα ίδια στοιχεία!\n" +
+                                  "(έλεγχος για ίδιο όνομα/επώνυμο, τηλέφωνο ή email)")
+        if customer_id is None:
+            customer_id = self.new_id()
+        documents = self._existing_documents(documents)
+        flags = self._flags(documents, customer_id)
+        self.customers.add([name, surname, phone, email_val, address, ", ".join(documents), flags,
+                            str(customer_id)])
+        self.documents.acquire(documents, customer_id)
+        logging.info(f"Προστέθηκε νέος πελάτης: {name} {surname} ({customer_id})")
+        return customer_id
+
+    def read_import(self, path, progress=None, cancelled=None):
+        # Πρώτο μέρος της μαζικής εισαγωγής, χωρίς εγγραφές: κάθε γραμμή
+        # ελέγχεται όπως στην καταχώρηση, και οι διπλοεγγραφές βρίσκονται από τα
+        # ευρετήρια της μνήμης και από όσες γραμμές του αρχείου έγιναν ήδη δεκτές
+        headers = CUSTOMER_HEADERS[:5]
+        result = {'path': path, 'headers': headers, 'rows': [], 'rejected': []}
+        names, phones, emails = set(), set(), set()
+        for line, fields in read_import_csv(path, headers, progress, cancelled):
+            name, surname, phone, email_val, address = fields
+            keys = (customer_key(name, surname), normalize_phone(phone), email_val.lower())
+            error = self.field_error(name, phone, email_val)
+            if error is not None:
+                reason = error[0]
+            elif self.customers.has_keys(name, surname, phone, email_val):
+                reason = "Υπάρχει ήδη πελάτης με τα ίδια στοιχεία"
+            elif keys[0] in names or keys[1] in phones or keys[2] in emails:
+                reason = "Επαναλαμβάνεται στο αρχείο"
+            else:
+                reason = None
+            if reason is not None:
+                result['rejected'].append([line, ' '.join(reason.split())] + fields)
+                continue
+            names.add(keys[0])
+            if keys[1]:
+                phones.add(keys[1])
+            if keys[2]:
+                emails.add(keys[2])
+            result['rows'].append([name, surname, phone, email_val, address, '', ''])
+        return result
+
+    def save_import(self, result):
+        # Δεύτερο μέρος: κωδικοί και όλοι οι νέοι πελάτες με μία προσθήκη
+        ids = self.customers.next_ids(len(result['rows'])) if result['rows'] else ()
+        rows = [row + [str(customer_id)] for row, customer_id in zip(result['rows'], ids)]
+        if rows:
+            self.customers.add_many(rows)
+        return finish_import(result, len(rows), "πελατών")
+
+    def import_csv(self, path, progress=None):
+        return self.save_import(self.read_import(path, progress))
+
+    def update(self, customer_id, name, surname, phone='', email_val='', address='', documents=()):
+        # Αλλάζει μόνο η γραμμή του πελάτη, ακόμα και σε αλλαγή ονόματος
+        name, surname, phone, email_val, address = (str(value).strip() for value in
+                                                     (name, surname, phone, email_val, address))
+        self.validate(name, phone, email_val, context=' (διόρθωση)')
+        original_documents = self.documents_for(customer_id)
+        documents = self._existing_documents(documents)
+        flags = self._flags(documents, customer_id)
+
+        try:
+            with self.storage.atomic():
+                new_row = [name, surname, phone, email_val, address, ", ".join(documents), flags, str(customer_id)]
+                if not self.customers.update(customer_id, new_row):
+                    self.customers.add(new_row)
+                self.documents.acquire([ref for ref in documents if ref not in original_documents], customer_id)
+        except Exception:
+            # Τίποτα δεν γράφτηκε, οπότε η μνήμη ξαναδιαβάζεται από την αποθήκευση
+            self.customers.load()
+            raise
+        logging.info(f"Ενημερώθηκε ο πελάτης: {name} {surname} ({customer_id})")
+
+    def delete(self, customer_id):
+        # Επιστρέφει τα έγγραφα που δεν βρέθηκαν. Όσα μοιράζονται με άλλους
+        # πελάτες δεν διαγράφονται.
+        docs = self.documents_for(customer_id)
+        # Ο πελάτης και οι συνταγές/σημειώσεις του διαγράφονται μαζί
+        try:
+            with self.storage.atomic():
+                self.customers.delete(customer_id)
+                self.storage.delete_customer_links(customer_id)
+        except Exception:
+            self.customers.load()
+            raise
+        logging.info(f"Διαγράφηκε ο πελάτης: {customer_id}")
+        # Τα έγγραφα σβήνονται μόνο αφού γραφτεί η διαγραφή του πελάτη, ώστε
+        # ένας πελάτης που έμεινε να μη δείχνει σε αρχεία που δεν υπάρχουν
+        missing_docs = []
+        if docs:
+            try:
+                missing_docs = self.documents.release(docs, customer_id)
+            except Exception as e:
+                logging.error(f"Σφάλμα κατά τη διαγραφή εγγράφων: {str(e)}")
+                missing_docs = docs
+            for doc in missing_docs:
+                logging.warning(f"Το έγγραφο {doc} δεν βρέθηκε κατά τη διαγραφή του πελάτη {customer_id}")
+        return missing_docs
+
+    def search(self, field, text):
+        if self.search_index is None:
+            self.search_index = CustomerSearchIndex(self.customers)
+            self.search_index.rebuild()
+        rows = self.customers.rows
+        return [(row_id, rows[row_id]) for row_id in self.search_index.search(field, text) if row_id in rows]
+
+class InventoryService:
+    def __init__(self, inventory, ledger=None):
+        self.inventory = inventory
+        self.ledger = ledger
+
+    def add(self, name, category, quantity, price, sku=''):
+        if self.inventory.find(name):
+            raise ValidationError("Το προϊόν υπάρχει ήδη στην αποθήκη.\n"
+                                  "Χρησιμοποιήστε το κουμπί 'Παραγγελία' για να προσθέσετε ποσότητα.")
+        sku = normalize_sku(sku)
+        self._check_sku(sku)
+        return self.inventory.add(self._product_row(name, category, quantity, price, sku))
+
+    @staticmethod
+    def _product_row(name, category, quantity, price, sku):
+        if not all(str(value).strip() for value in (name, category, quantity, price)):
+            raise ValidationError("Όλα τα πεδία είναι υποχρεωτικά!")
+        try:
+            quantity = int(quantity)
+            price = float(price)
+        except ValueError:
+            raise ValidationError("Η ποσότητα πρέπει να είναι ακέραιος αριθμός και η τιμή δεκαδικός!")
+        return [name, category, quantity, price, sku]
+
+    def read_import(self, path, progress=None, cancelled=None):
+        # Όπως στους πελάτες: έλεγχος κάθε γραμμής όπως στην καταχώρηση, χωρίς
+        # εγγραφές. Προϊόν που υπάρχει ήδη απορρίπτεται (η ποσότητα αλλάζει με
+        # την παραγγελία).
+        headers = INVENTORY_HEADERS
+        result = {'path': path, 'headers': headers, 'rows': [], 'rejected': []}
+        names, skus = set(), set()
+        for line, fields in read_import_csv(path, headers, progress, cancelled):
+            name, sku = normalize_text(fields[0]), normalize_sku(fields[4])
+            try:
+                row = self._product_row(*fields[:4], sku)
+            except ValidationError as e:
+                result['rejected'].append([line, str(e)] + fields)
+                continue
+            if self.inventory.has_name(name) or name in names:
+                result['rejected'].append([line, "Το προϊόν υπάρχει ήδη"] + fields)
+                continue
+            if sku and (self.inventory.has_sku(sku) or sku in skus):
+                result['rejected'].append([line, f"Ο κωδικός {sku} ανήκει ήδη σε άλλο προϊόν"] + fields)
+                continue
+            names.add(name)
+            if sku:
+                skus.add(sku)
+            result['rows'].append(row)
+        return result
+
+    def save_import(self, result):
+        if result['rows']:
+            self.inventory.add_many(result['rows'])
+        return finish_import(result, len(result['rows']), "προϊόντων")
+
+    def import_csv(self, path, progress=None):
+        return self.save_import(self.read_import(path, progress))
+
+    def _check_sku(self, sku, name=None):
+        # Ένας κωδικός ανήκει σε ένα μόνο προϊόν
+        row = self.inventory.find_sku(sku) if sku else None
+        if row is not None and (name is None or normalize_text(row[0]) != normalize_text(name)):
+            raise ValidationError(f"Ο κωδικός {sku} ανήκει ήδη στο προϊόν '{row[0]}'!")
+
+    def assign_sku(self, name, sku):
+        # Κενός κωδικός αφαιρεί τον κωδικό του προϊόντος
+        row = self._find(name)
+        sku = normalize_sku(sku)
+        self._check_sku(sku, row[0])
+        self.inventory.set_sku(row[0], sku)
+        logging.info(f"Κωδικός προϊόντος: {row[0]} -> {sku or '-'}")
+        return sku
+
+    def lookup(self, code):
+        # Για τον σαρωτή: πρώτα ο κωδικός, και αν δεν υπάρχει το όνομα
+        code = str(code).strip()
+        if not code:
+            raise ValidationError("Δεν δόθηκε κωδικός προϊόντος!")
+        row = self.inventory.find_sku(code) or self.inventory.find(code)
+        if row is None:
+            raise ValidationError(f"Δεν βρέθηκε προϊόν με κωδικό {code}!")
+        return row
+
+    @staticmethod
+    def _quantity(quantity):
+        try:
+            quantity = int(quantity)
+        except ValueError:
+            raise ValidationError("Παρακαλώ εισάγετε έγκυρη ποσότητα!")
+        if quantity <= 0:
+            raise ValidationError("Η ποσότητα πρέπει να είναι θετικός αριθμός!")
+        return quantity
+
+    def _find(self, name):
+        row = self.inventory.find(str(name)) or self.inventory.find_sku(name)
+        if row is None:
+            raise ValidationError("Το προϊόν δεν υπάρχει στην αποθήκη!")
+        return row
+
+    def order(self, name, quantity):
+        quantity = self._quantity(quantity)
+        row = self._find(name)
+        new_quantity = int(row[2]) + quantity
+        self.inventory.set_quantity(row[0], new_quantity)
+        return new_quantity
+
+    def check_sale(self, row):
+        # Επιστρέφει τιμή και διαθέσιμη ποσότητα, αν το προϊόν μπορεί να πωληθεί
+        try:
+            price = float(row[3])
+        except ValueError:
+            logging.warning(f"Προσπάθεια πώλησης προϊόντος με μη έγκυρη τιμή: {row[3]}")
+            raise ValidationError("Η τιμή του προϊόντος δεν είναι έγκυρη!")
+        if price <= 0:
+            logging.warning(f"Προσπάθεια πώλησης προϊόντος με μη έγκυρη τιμή: {price}")
+            raise ValidationError("Η τιμή του προϊόντος πρέπει να είναι θετική!")
+        try:
+            stock = int(row[2])
+        except ValueError:
+            logging.warning(f"Προσπάθεια πώλησης προϊόντος με μη έγκυρη ποσότητα: {row[2]}")
+            raise ValidationError("Η ποσότητα του προϊόντος δεν είναι έγκυρη!")
+        if stock <= 0:
+            logging.warning(f"Προσπάθεια πώλησης προϊόντος με μη έγκυρη ποσότητα: {stock}")
+            raise ValidationError("Η ποσότητα του προϊόντος πρέπει να είναι θετική!")
+        return price, stock
+
+    def sell(self, name, quantity):
+        # Επιστρέφει το συνολικό ποσό και την ποσότητα που απέμεινε
+        total, remaining = self.checkout([(name, quantity)])
+        return total, remaining[0][1]
+
+    def validate_cart(self, items):
+        # items: (προϊόν, ποσότητα). Οι γραμμές του ίδιου προϊόντος ενώνονται και
+        # όλο το καλάθι ελέγχεται πάνω στην αποθήκη της μνήμης πριν γραφτεί
+        # οτιδήποτε. Επιστρέφει (γραμμή αποθήκης, ποσότητα, τιμή, απόθεμα).
+        lines = {}
+        for name, quantity in items:
+            quantity = self._quantity(quantity)
+            row = self._find(name)
+            line = lines.setdefault(normalize_text(row[0]), [row, 0])
+            line[1] += quantity
+        if not lines:
+            raise ValidationError("Το καλάθι είναι άδειο!")
+        result = []
+        shortages = []
+        for row, quantity in lines.values():
+            try:
+                price, stock = self.check_sale(row)
+            except ValidationError as e:
+                if len(lines) == 1:
+                    raise
+                raise ValidationError(f"{row[0]}: {e}")
+            if quantity > stock:
+                shortages.append(f"{row[0]}: ζητήθηκαν {quantity}, διαθέσιμα {stock}")
+            result.append((row, quantity, price, stock))
+        if shortages:
+            message = "Δεν υπάρχει αρκετή ποσότητα στην αποθήκη!"
+            if len(lines) > 1:
+                message += "\n" + "\n".join(shortages)
+            raise ValidationError(message)
+        return result
+
+    def checkout(self, items):
+        # Όλες οι γραμμές πωλούνται μαζί ή καμία. Επιστρέφει το συνολικό ποσό
+        # και (προϊόν, ποσότητα που απέμεινε) για κάθε γραμμή.
+        lines = self.validate_cart(items)
+        remaining = [(row[0], stock - quantity) for row, quantity, price, stock in lines]
+        # Η αποθήκη και το βιβλίο πωλήσεων ενημερώνονται μαζί
+        try:
+            with self.inventory.storage.atomic():
+                self.inventory.set_quantities(dict(remaining))
+                if self.ledger is not None:
+                    self.ledger.record([(row[0], row[1], quantity, price) for row, quantity, price, _ in lines])
+        except Exception:
+            # Τίποτα δεν γράφτηκε, οπότε η μνήμη ξαναδιαβάζεται από την αποθήκευση
+            self.inventory.load()
+            raise
+        if self.ledger is not None:
+            self.ledger.refresh()
+        total = sum(quantity * price for _, quantity, price, _ in lines)
+        for row, quantity, price, _ in lines:
+            logging.info(f"Πώληση προϊόντος: {row[0]}, ποσότητα: {quantity}, "
+                         f"συνολικό ποσό: {quantity * price:.2f}€")
+        if len(lines) > 1:
+            logging.info(f"Ολοκληρώθηκε πώληση {len(lines)} προϊόντων, συνολικό ποσό: {total:.2f}€")
+        return total, remaining
+
+    def delete(self, name):
+        count = self.inventory.delete(str(name))
+        logging.info(f"Διαγράφηκε το προϊόν: {name}")
+        return count
+
+class PrescriptionService:
+    VALUES = 14
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def add(self, customer_id, customer_name, values, lines_D=(), lines_A=()):
+        # values: οι 14 τιμές του πίνακα, πρώτα Μακριά και μετά Πλησίον
+        values = [str(value) for value in values]
+        if len(values) != self.VALUES:
+            raise ValueError(f"Η συνταγή χρειάζεται {self.VALUES} τιμές")
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        row = ([timestamp, customer_name] + values +
+               [encode_drawing(lines_D), encode_drawing(lines_A), str(customer_id)])
+        self.storage.append_prescription(row)
+        return row
+
+    def for_customer(self, customer_id):
+        return self.storage.prescriptions_for(customer_id)
+
+    @staticmethod
+    def drawings(row):
+        lines_D = decode_drawing(row[16]) if len(row) > 16 else []
+        lines_A = decode_drawing(row[17]) if len(row) > 17 else []
+        return lines_D, lines_A
+
+class NotesService:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def add(self, customer_id, customer_name, text):
+        text = text.strip()
+        if not text:
+            raise ValidationError("Οι σημειώσεις είναι κενές!")
+        row = [datetime.now().strftime("%Y-%m-%d %H:%M:%S"), customer_name, text, str(customer_id)]
+        self.storage.append_note(row)
+        return row
+
+    def for_customer(self, customer_id):
+        return self.storage.notes_for(customer_id)
+
+class SalesLedger:
+    # Κάθε πώληση γράφεται μόνο με προσθήκη στο βιβλίο πωλήσεων της αποθήκευσης,
+    # και τα σύνολα ανά ημέρα, μήνα, προϊόν (και προϊόν ανά μήνα) και κατηγορία
+    # ενημερώνονται στη μνήμη καθώς διαβάζονται οι νέες γραμμές. Τα ποσά
+    # κρατιούνται σε λεπτά. Τα σύνολα αποθηκεύονται στο SALES_ROLLUP_FILE μαζί με
+    # τη θέση του βιβλίου ως την οποία μετράνε, οπότε στο άνοιγμα διαβάζονται
+    # μόνο οι πωλήσεις που προστέθηκαν μετά.
+    def __init__(self, storage, path=SALES_ROLLUP_FILE):
+        self.storage = storage
+        self.path = path
+        self._lock = threading.RLock()
+        self.position = None
+        self.pending = 0
+        self._clear()
+        self._load()
+        self.refresh()
+
+    def _clear(self):
+        self.days = {}
+        self.months = {}
+        self.products = {}
+        self.categories = {}
+        self.month_products = {}
+        self.last_receipt = None
+
+    def _load(self):
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as file:
+                data = json.load(file)
+            if data['storage'] != self.storage.name:
+                return
+            self.days = data['days']
+            self.months = data['months']
+            self.products = data['products']
+            self.categories = data['categories']
+            self.month_products = data['month_products']
+            self.last_receipt = data['last_receipt']
+            self.position = data['position']
+        except (OSError, ValueError, KeyError, TypeError):
+            self._clear()
+            self.position = None
+
+    def save(self):
+        with self._lock:
+            data = {
+                'storage': self.storage.name,
+                'position': self.position,
+                'days': self.days,
+                'months': self.months,
+                'products': self.products,
+                'categories': self.categories,
+                'month_products': self.month_products,
+                'last_receipt': self.last_receipt,
+            }
+            try:
+                with AtomicWriteGroup() as group:
+                    json.dump(data, group.open(self.path), ensure_ascii=False)
+                self.pending = 0
+            except OSError as e:
+                logging.error(f"Σφάλμα κατά την αποθήκευση των συνόλων πωλήσεων: {str(e)}")
+
+    @staticmethod
+    def _add(totals, quantity, cents, receipts=0):
+        totals[0] += quantity
+        totals[1] += cents
+        if len(totals) > 2:
+            totals[2] += receipts
+
+    def _apply(self, row):
+        date, receipt, product, category = row[0], row[1], row[2], row[3]
+        quantity = int(row[4])
+        cents = round(float(row[6]) * 100)
+        # Οι γραμμές μιας απόδειξης γράφονται μαζί, άρα είναι διαδοχικές
+        new_receipt = int(receipt != self.last_receipt)
+        self.last_receipt = receipt
+        day, month = date[:10], date[:7]
+        key = normalize_text(product)
+        self._add(self.days.setdefault(day, [0, 0, 0]), quantity, cents, new_receipt)
+        self._add(self.months.setdefault(month, [0, 0, 0]), quantity, cents, new_receipt)
+        entry = self.products.setdefault(key, [product, category, 0, 0])
+        entry[0], entry[1] = product, category
+        entry[2] += quantity
+        entry[3] += cents
+        self._add(self.categories.setdefault(category, [0, 0]), quantity, cents)
+        self._add(self.month_products.setdefault(month, {}).setdefault(key, [0, 0]), quantity, cents)
+
+    def refresh(self):
+        # Διαβάζει ό,τι προστέθηκε στο βιβλίο από την τελευταία φορά
+        with self._lock, METRICS.timer('sales.rollup'):
+            rows, position, from_start = self.storage.read_sales(self.position)
+            if from_start:
+                self._clear()
+            skipped = 0
+            for row in rows:
+                try:
+                    self._apply(row)
+                except (ValueError, IndexError):
+                    skipped += 1
+            if skipped:
+                logging.warning(f"Αγνοήθηκαν {skipped} μη έγκυρες γραμμές του βιβλίου πωλήσεων")
+            self.position = position
+            self.pending += len(rows)
+            if (from_start and rows) or self.pending >= SALES_CHECKPOINT_LINES:
+                self.save()
+        return len(rows)
+
+    def record(self, items, receipt=None):
+        # items: (προϊόν, κατηγορία, ποσότητα, τιμή μονάδας). Τα σύνολα
+        # ενημερώνονται με το refresh(), αφού ολοκληρωθεί η εγγραφή.
+        timestamp = datetime.now()
+        receipt = receipt or timestamp.strftime("%Y%m%d%H%M%S%f")
+        rows = []
+        for product, category, quantity, price in items:
+            total = round(int(quantity) * float(price), 2)
+            rows.append([timestamp.strftime("%Y-%m-%d %H:%M:%S"), receipt, product, category,
+                         str(int(quantity)), f"{float(price):.2f}", f"{total:.2f}"])
+        self.storage.append_sales(rows)
+        return receipt
+
+    def close(self):
+        if self.pending:
+            self.save()
+
+    # Αναφορές: ποσότητα, έσοδα σε ευρώ και πλήθος αποδείξεων
+
+    @staticmethod
+    def _report(totals):
+        return {'quantity': totals[0], 'revenue': totals[1] / 100,
+                'receipts': totals[2] if len(totals) > 2 else None}
+
+    def totals(self, period=None):
+        # period: 'ΕΕΕΕ-ΜΜ-ΗΗ', 'ΕΕΕΕ-ΜΜ', 'ΕΕΕΕ' ή None για όλες τις πωλήσεις
+        with self._lock:
+            if period is None:
+                keys = self.months
+            elif len(period) == 10:
+                return self._report(self.days.get(period, [0, 0, 0]))
+            elif len(period) == 7:
+                return self._report(self.months.get(period, [0, 0, 0]))
+            else:
+                keys = [month for month in self.months if month.startswith(period)]
+            result = [0, 0, 0]
+            for month in keys:
+                self._add(result, *self.months[month])
+            return self._report(result)
+
+    def daily(self, start=None, end=None):
+        with self._lock:
+            return [dict(self._report(totals), day=day) for day, totals in sorted(self.days.items())
+                    if (start is None or day >= start) and (end is None or day <= end)]
+
+    def monthly(self, year=None):
+        with self._lock:
+            return [dict(self._report(totals), month=month) for month, totals in sorted(self.months.items())
+                    if year is None or month.startswith(str(year))]
+
+    def best_sellers(self, limit=10, month=None, by='quantity'):
+        with self._lock:
+            column = 0 if by == 'quantity' else 1
+            if month is None:
+                items = ((key, entry[2:]) for key, entry in self.products.items())
+            else:
+                items = self.month_products.get(month, {}).items()
+            top = heapq.nlargest(limit, items, key=lambda item: (item[1][column], item[1][1 - column]))
+            results = []
+            for key, totals in top:
+                product, category = self.products.get(key, (key, ''))[:2]
+                results.append({'product': product, 'category': category,
+                                'quantity': totals[0], 'revenue': totals[1] / 100})
+            return results
+
+    def by_category(self):
+        with self._lock:
+            return sorted(({'category': category, 'quantity': totals[0], 'revenue': totals[1] / 100}
+                           for category, totals in self.categories.items()),
+                          key=lambda item: item['revenue'], reverse=True)
+
+class BackgroundLoader:
+    # Διαβάζει τα δεδομένα σε νήμα εργασίας και τα περνάει σε δόσεις στο νήμα του Tk
+    # μέσω ουράς, την οποία αδειάζει περιοδικά με after() χωρίς να παγώνει το παράθυρο.
+    def __init__(self, root, repositories, on_batch=None, on_done=None, on_error=None,
+                 batch_size=LOAD_BATCH_SIZE):
+        self.root = root
+        self.repositories = repositories
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.counts = {repository.table: 0 for repository in repositories}
+        self.thread = None
+
+    def start(self):
+        for repository in self.repositories:
+            repository.begin_load()
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+        self.root.after(LOAD_POLL_MS, self._poll)
+
+    def _work(self):
+        try:
+            for repository in self.repositories:
+                stamp = repository.storage.stamp(repository.table)
+                batch = []
+                with METRICS.timer('load.' + repository.table):
+                    for item in repository.storage.iter_rows(repository.table):
+                        batch.append(item)
+                        if len(batch) >= self.batch_size:
+                            self.queue.put(('batch', repository, batch))
+                            batch = []
+                self.queue.put(('batch', repository, batch))
+                self.queue.put(('done', repository, stamp))
+        except Exception as e:
+            logging.error(f"Σφάλμα κατά τη φόρτωση δεδομένων: {str(e)}")
+            self.queue.put(('error', None, e))
+            return
+        self.queue.put(('finished', None, None))
+
+    def _poll(self):
+        # Μικρό χρονικό όριο ανά κύκλο ώστε το UI να παραμένει αποκρίσιμο
+        deadline = time.perf_counter() + 0.03
+        while time.perf_counter() < deadline:
+            try:
+                kind, repository, payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'batch':
+                repository.load_batch(payload)
+                self.counts[repository.table] += len(payload)
+                if self.on_batch:
+                    self.on_batch(repository, payload)
+            elif kind == 'done':
+                repository.finish_load(payload)
+            elif kind == 'error':
+                if self.on_error:
+                    self.on_error(payload)
+                return
+            elif kind == 'finished':
+                if self.on_done:
+                    self.on_done()
+                return
+        self.root.after(LOAD_POLL_MS, self._poll)
+
+class PrescriptionRenderer:
+    # Κοινή σχεδίαση του φόντου της συνταγής (λογότυπο, όνομα, μοιρογνωμόνια)
+    # για τη φόρμα και την προβολή. Η γεωμετρία των 181 γραμμών κάθε
+    # μοιρογνωμονίου υπολογίζεται μία φορά, σχετικά με το κέντρο του.
+    RADIUS = 120
+    PROTRACTORS = ((350, 260, "Δ"), (800, 260, "A"))
+    _geometry = None
+
+    @classmethod
+    def geometry(cls):
+        if cls._geometry is None:
+            ticks = []
+            labels = []
+            for angle in range(0, 181):
+                rad = math.radians(angle)
+                dx = math.cos(rad)
+                dy = -math.sin(rad)
+                major = angle % 10 == 0
+                line_len = 25 if major else 12
+                x1 = cls.RADIUS * dx
+                y1 = cls.RADIUS * dy
+                ticks.append((x1, y1, x1 + line_len * dx, y1 + line_len * dy, 2 if major else 1))
+                if major:
+                    label_dist = cls.RADIUS + 40
+                    labels.append((label_dist * dx, label_dist * dy, str(angle)))
+            cls._geometry = (ticks, labels)
+        return cls._geometry
+
+    @classmethod
+    def draw_protractor(cls, canvas, cx, cy, letter):
+        radius = cls.RADIUS
+        ticks, labels = cls.geometry()
+        canvas.create_arc(cx-radius, cy-radius, cx+radius, cy+radius, start=0, extent=180, style='arc',
+                          width=2, tags='template')
+        canvas.create_line(cx-radius, cy, cx+radius, cy, width=2, tags='template')
+        for x1, y1, x2, y2, width in ticks:
+            canvas.create_line(cx + x1, cy + y1, cx + x2, cy + y2, width=width, tags='template')
+        for x, y, text in labels:
+            canvas.create_text(cx + x, cy + y, text=text, font=('Arial', 9), tags='template')
+        canvas.create_text(cx, cy+30, text=letter, font=('Arial', 32, 'bold'), tags='template')
+
+    @classmethod
+    @METRICS.timer('canvas.template')
+    def draw_template(cls, canvas, customer_name, logo=None):
+        if logo:
+            canvas.create_image(50, 30, image=logo, anchor='nw', tags='template')
+        canvas.create_text(300, 50, text="Ονοματεπώνυμο:", anchor='w', font=('Arial', 12), tags='template')
+        canvas.create_line(420, 55, 1000, 55, dash=(4, 2), tags='template')
+        canvas.create_text(430, 50, text=customer_name, anchor='w', font=('Arial', 12), tags='template')
+        for cx, cy, letter in cls.PROTRACTORS:
+            cls.draw_protractor(canvas, cx, cy, letter)
+
+    @staticmethod
+    @METRICS.timer('canvas.strokes')
+    def draw_strokes(canvas, polylines):
+        for points in polylines:
+            canvas.create_line(*[value for point in points for value in point], fill='red', width=2, tags='stroke')
+
+VIRTUAL_TREE_BUFFER = 50
+
+class VirtualTreeview:
+    # Treeview που δημιουργεί μόνο τις γραμμές του ορατού παραθύρου (συν ένα περιθώριο
+    # κύλισης) και τραβάει τις υπόλοιπες από τη λίστα στη μνήμη όσο κυλάει ο χρήστης.
+    # Το selection()/item() δουλεύουν με τα κλειδιά των γραμμών όπως σε απλό Treeview.
+    # Μια διαγραφή αφήνει None στη θέση της γραμμής (η θέση κάθε κλειδιού είναι
+    # στο positions), και οι κενές θέσεις αφαιρούνται όλες μαζί στο _compact().
+    def __init__(self, parent, columns, buffer=VIRTUAL_TREE_BUFFER, **kwargs):
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, **kwargs)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self._on_scrollbar)
+        self.tree.pack(side='left', expand=True, fill='both')
+        self.scrollbar.pack(side='right', fill='y')
+        self.buffer = buffer
+        self.keys = []
+        self.positions = {}
+        self.deleted = 0
+        self.values = {}
+        self.first = 0
+        self.visible = 20
+        self.window = (0, 0)
+        self.selected_key = None
+        # Οι εσωτερικές συνδέσεις μπαίνουν σε δικό τους bindtag πριν από αυτό του
+        # widget, ώστε το bind() των καλούντων να μπορεί να αντικαθιστά τις δικές του
+        tag = f'VirtualTreeview{id(self)}'
+        self.tree.bindtags((tag,) + self.tree.bindtags())
+        self.tree.bind_class(tag, '<Configure>', self._on_configure)
+        self.tree.bind_class(tag, '<<TreeviewSelect>>', self._on_select)
+        self.tree.bind_class(tag, '<MouseWheel>', self._on_mousewheel)
+        self.tree.bind_class(tag, '<Button-4>', lambda e: self._scroll_by(-3))
+        self.tree.bind_class(tag, '<Button-5>', lambda e: self._scroll_by(3))
+        self.tree.bind_class(tag, '<Up>', lambda e: self._move_selection(-1))
+        self.tree.bind_class(tag, '<Down>', lambda e: self._move_selection(1))
+        self.tree.bind_class(tag, '<Prior>', lambda e: self._move_selection(-self.visible))
+        self.tree.bind_class(tag, '<Next>', lambda e: self._move_selection(self.visible))
+        self.tree.bind_class(tag, '<Home>', lambda e: self._move_selection(-len(self.keys)))
+        self.tree.bind_class(tag, '<End>', lambda e: self._move_selection(len(self.keys)))
+
+    def __getattr__(self, name):
+        return getattr(self.tree, name)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def bind(self, sequence=None, func=None, add=None):
+        return self.tree.bind(sequence, func, add)
+
+    @METRICS.timer('tree.set_rows')
+    def set_rows(self, rows):
+        self.keys = []
+        self.positions = {}
+        self.deleted = 0
+        self.values = {}
+        for key, values in rows:
+            key = str(key)
+            if key not in self.values:
+                self.positions[key] = len(self.keys)
+                self.keys.append(key)
+            self.values[key] = list(values)
+        if self.selected_key not in self.values:
+            self.selected_key = None
+        self.first = 0
+        self.window = (0, 0)
+        self._render(force=True)
+
+    def apply_change(self, action, key, values=None):
+        # Ενημέρωση μόνο της γραμμής που άλλαξε, χωρίς επαναφόρτωση της λίστας
+        key = str(key)
+        start, end = self.window
+        if action == 'insert':
+            if key in self.values:
+                return self.apply_change('update', key, values)
+            self.positions[key] = len(self.keys)
+            self.keys.append(key)
+            self.values[key] = list(values)
+            if end == len(self.keys) - 1:
+                self.tree.insert('', 'end', iid=key, values=self.values[key])
+                self.window = (start, end + 1)
+        elif action == 'update':
+            if key not in self.values:
+                return
+            self.values[key] = list(values)
+            if self.tree.exists(key):
+                self.tree.item(key, values=self.values[key])
+            return
+        elif action == 'delete':
+            if key not in self.values:
+                return
+            index = self.positions.pop(key)
+            self.keys[index] = None
+            self.deleted += 1
+            del self.values[key]
+            if self.selected_key == key:
+                self.selected_key = None
+            if start <= index < end:
+                self.tree.delete(key)
+            # Συμπύκνωση όταν οι κενές θέσεις γίνουν πολλές συνολικά ή αρκετές
+            # ώστε να αδειάζει το ορατό παράθυρο
+            if self.deleted > len(self.keys) // 8 or self.keys[start:end].count(None) > self.buffer:
+                self._compact()
+                self._render(force=True)
+                return
+        self._render()
+
+    def _compact(self):
+        # Η πρώτη ορατή γραμμή μένει η ίδια μετά την αφαίρεση των κενών θέσεων
+        self.first -= self.keys[:self.first].count(None)
+        self.keys = [key for key in self.keys if key is not None]
+        self.positions = {key: index for index, key in enumerate(self.keys)}
+        self.deleted = 0
+
+    def update_rows(self, rows):
+        # Πολλές αλλαγμένες γραμμές με ένα πέρασμα· αλλάζουν μόνο όσες φαίνονται
+        for key, values in rows:
+            key = str(key)
+            if key in self.values:
+                self.values[key] = list(values)
+                if self.tree.exists(key):
+                    self.tree.item(key, values=self.values[key])
+
+    def append_rows(self, rows):
+        for key, values in rows:
+            key = str(key)
+            if key not in self.values:
+                self.positions[key] = len(self.keys)
+                self.keys.append(key)
+            self.values[key] = list(values)
+        self._render()
+
+    def get_children(self, item=''):
+        return tuple(key for key in self.keys if key is not None)
+
+    def selection(self):
+        return (self.selected_key,) if self.selected_key is not None else ()
+
+    def item(self, key, option=None, **kwargs):
+        values = self.values.get(str(key), [])
+        return values if option == 'values' else {'values': list(values)}
+
+    def _row_height(self):
+        try:
+            return int(ttk.Style(self.tree).lookup('Treeview', 'rowheight') or 20)
+        except (tk.TclError, ValueError):
+            return 20
+
+    def _on_configure(self, event):
+        visible = max(1, (event.height - self._row_height()) // self._row_height())
+        if visible != self.visible:
+            self.visible = visible
+            self._render()
+
+    def _on_select(self, event):
+        selected = self.tree.selection()
+        if selected:
+            self.selected_key = selected[0]
+
+    def _on_mousewheel(self, event):
+        self._scroll_by(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * len(self.keys))
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            self.first += int(args[1]) * step
+        self._render()
+
+    def _scroll_by(self, rows):
+        self.first += rows
+        self._render()
+        return 'break'
+
+    def _move_selection(self, offset):
+        if not self.values:
+            return 'break'
+        index = self.positions.get(self.selected_key, -1)
+        index = min(max(index + offset, 0), len(self.keys) - 1)
+        # Οι κενές θέσεις παραλείπονται, πρώτα προς την κατεύθυνση της κίνησης
+        step = 1 if offset > 0 else -1
+        live = index
+        while 0 <= live < len(self.keys) and self.keys[live] is None:
+            live += step
+        if not 0 <= live < len(self.keys):
+            live = index
+            while self.keys[live] is None:
+                live -= step
+        index = live
+        self.selected_key = self.keys[index]
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible:
+            self.first = index - self.visible + 1
+        self._render()
+        self.tree.focus(self.selected_key)
+        self.tree.selection_set(self.selected_key)
+        return 'break'
+
+    def _render(self, force=False):
+        total = len(self.keys)
+        self.first = min(max(self.first, 0), max(total - self.visible, 0))
+        last = min(self.first + self.visible, total)
+        start, end = self.window
+        if force or self.first < start or last > end:
+            start = max(self.first - self.buffer, 0)
+            end = min(last + self.buffer, total)
+            with METRICS.timer('tree.render'):
+                self.tree.delete(*self.tree.get_children())
+                for key in self.keys[start:end]:
+                    if key is not None:
+                        self.tree.insert('', 'end', iid=key, values=self.values[key])
+            self.window = (start, end)
+            if self.selected_key is not None and self.tree.exists(self.selected_key):
+                self.tree.selection_set(self.selected_key)
+        rendered = end - start - self.keys[start:end].count(None)
+        if rendered:
+            above = self.first - start - self.keys[start:self.first].count(None)
+            self.tree.yview_moveto(above / rendered)
+        if total:
+            self.scrollbar.set(self.first / total, last / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+def customer_display_row(row):
+    # Get the documents from column 5 (index 5)
+    documents = row[5] if len(row) > 5 and row[5] else ""
+
+    # Get or create flags from column 6 (index 6)
+    flags = []
+    if len(row) > 6 and row[6]:
+        flags = row[6].split(", ")
+    else:
+        # If no flags column, create flags based on available items
+        if documents:
+            flags.append("Έγγραφα")
+
+    row = list(row) + [""] * (5 - len(row))
+    return [row[0], row[1], row[2], row[3], row[4], ", ".join(flags)]
+
+UI_CACHE_DIR = "cache"
+
+def cached_gradient(root, width, height, color1, color2):
+    # Το gradient της κεφαλίδας ως μία εικόνα αντί για μία γραμμή ανά pixel.
+    # Αποθηκεύεται στο UI_CACHE_DIR ανά διάσταση ώστε να μην ξαναϋπολογίζεται.
+    path = os.path.join(UI_CACHE_DIR, f"header_{width}x{height}_{color1[1:]}_{color2[1:]}.png")
+    if os.path.exists(path):
+        try:
+            return tk.PhotoImage(master=root, file=path)
+        except tk.TclError:
+            pass
+    r1, g1, b1 = root.winfo_rgb(color1)
+    r2, g2, b2 = root.winfo_rgb(color2)
+    colors = []
+    for i in range(width):
+        nr = int(r1 + (r2 - r1) * i / width) // 256
+        ng = int(g1 + (g2 - g1) * i / width) // 256
+        nb = int(b1 + (b2 - b1) * i / width) // 256
+        colors.append(f'#{nr:02x}{ng:02x}{nb:02x}')
+    image = tk.PhotoImage(master=root, width=width, height=height)
+    # Μία γραμμή χρωμάτων επαναλαμβάνεται σε όλο το ύψος
+    image.put('{' + ' '.join(colors) + '}', to=(0, 0, width, height))
+    try:
+        os.makedirs(UI_CACHE_DIR, exist_ok=True)
+        image.write(path, format='png')
+    except (OSError, tk.TclError) as e:
+        logging.warning(f"Δεν αποθηκεύτηκε το gradient στην cache: {str(e)}")
+    return image
+
+def cached_logo(root, source, size):
+    # Το λογότυπο σε μέγεθος size×size. Το Pillow φορτώνεται μόνο την πρώτη
+    # φορά (ή όταν αλλάξει το αρχικό αρχείο), μετά διαβάζεται το PNG της cache.
+    path = os.path.join(UI_CACHE_DIR, f"{os.path.splitext(os.path.basename(source))[0]}_{size}.png")
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source):
+        from PIL import Image
+        os.makedirs(UI_CACHE_DIR, exist_ok=True)
+        with Image.open(source) as image:
+            image.resize((size, size), Image.LANCZOS).save(path, 'PNG')
+    return tk.PhotoImage(master=root, file=path)
+
 class OpticalSystem:
     def __init__(self):
+        self.startup_timings = {}
         try:
             if not os.path.exists(DOCUMENTS_DIR):
                 os.makedirs(DOCUMENTS_DIR)
@@ -108,6 +3845,13 @@ class OpticalSystem:
                     writer.writerow(INVENTORY_HEADERS)
                 logging.info(f"Δημιουργήθηκε το αρχείο {INVENTORY_FILE}")
 
+            self.storage = open_storage()
+            self.documents = DocumentStore()
+            self.customers = CustomerRepository(self.storage, autoload=False)
+            self.inventory = InventoryRepository(self.storage, autoload=False)
+            logging.info(f"Χρήση αποθήκευσης: {self.storage.name}")
+            self.startup_timings['storage'] = time.perf_counter() - APP_START
+
             logging.info("Εκκίνηση του συστήματος")
         except Exception as e:
             logging.error(f"Σφάλμα κατά την αρχικοποίηση: {str(e)}")
@@ -135,27 +3879,13 @@ class OpticalSystem:
         header_canvas = tk.Canvas(header_frame, height=header_height, width=self.root.winfo_screenwidth(), highlightthickness=0, bd=0)
         header_canvas.pack(fill='both', expand=True)
         # Gradient από γκρι σε πορτοκαλί
-        def draw_gradient(canvas, width, height, color1, color2):
-            r1, g1, b1 = self.root.winfo_rgb(color1)
-            r2, g2, b2 = self.root.winfo_rgb(color2)
-            r_ratio = (r2 - r1) / width
-            g_ratio = (g2 - g1) / width
-            b_ratio = (b2 - b1) / width
-            for i in range(width):
-                nr = int(r1 + (r_ratio * i)) // 256
-                ng = int(g1 + (g_ratio * i)) // 256
-                nb = int(b1 + (b_ratio * i)) // 256
-                color = f'#{nr:02x}{ng:02x}{nb:02x}'
-                canvas.create_line(i, 0, i, height, fill=color)
         self.root.update_idletasks()
         width = self.root.winfo_width() or 1200
-        draw_gradient(header_canvas, width, header_height, '#f0f0f0', '#ff9800')
+        self.header_gradient = cached_gradient(self.root, width, header_height, '#f0f0f0', '#ff9800')
+        header_canvas.create_image(0, 0, image=self.header_gradient, anchor='nw')
         # Τοποθέτηση λογότυπου και τίτλου πάνω από το gradient
         try:
-            from PIL import Image, ImageTk
-            logo_img = Image.open('optic_logo_white_bg_128x128.png')
-            logo_img = logo_img.resize((48, 48), Image.LANCZOS)
-            logo = ImageTk.PhotoImage(logo_img)
+            logo = cached_logo(self.root, 'optic_logo_white_bg_128x128.png', 48)
             header_canvas.create_image(30, header_height//2, image=logo, anchor='w')
             self.header_logo = logo  # κρατάμε reference
         except Exception:
@@ -165,33 +3895,72 @@ class OpticalSystem:
         help_btn = tk.Button(header_frame, text='Βοήθεια', command=self.toggle_help_drawer, bg='#ff9800', fg='black', font=('Segoe UI', 11, 'bold'))
         help_btn.place(x=width-120, y=header_height//2-18, width=100, height=36)
         
+        self.startup_timings['header'] = time.perf_counter() - APP_START
+        
         self.create_customer_section()
         self.create_inventory_section()
+        self.create_status_bar()
+        self.startup_timings['sections'] = time.perf_counter() - APP_START
         
-        self.fortose_kai_emfanise()
-        self.fortose_apothiki()
-
-        # Φόρτωση του λογότυπου για χρήση στο συνταγολόγιο
-        try:
-            from PIL import Image, ImageTk
-            self.prescription_logo = Image.open('optic_logo_white_bg.png')
-            self.prescription_logo = self.prescription_logo.resize((100, 100), Image.LANCZOS)
-            self.prescription_logo = ImageTk.PhotoImage(self.prescription_logo)
-        except Exception as e:
-            logging.error(f"Σφάλμα κατά τη φόρτωση του λογότυπου: {str(e)}")
-            self.prescription_logo = None
+        # Τα δεδομένα φορτώνονται στο παρασκήνιο ενώ το παράθυρο είναι ήδη διαθέσιμο
+        self.set_data_actions_state('disabled')
+        self.loader = BackgroundLoader(self.root, [self.customers, self.inventory],
+                                       on_batch=self.on_load_batch, on_done=self.on_load_done,
+                                       on_error=self.on_load_error)
+        self.loader.start()
+        self.customers.subscribe(self.on_customers_changed)
+        self.inventory.subscribe(self.on_inventory_changed)
+        self.search_index = CustomerSearchIndex(self.customers, root=self.root)
+        self.customer_service = CustomerService(self.customers, self.storage, self.documents, self.search_index)
+        self.sales = SalesLedger(self.storage)
+        self.inventory_service = InventoryService(self.inventory, self.sales)
+        self.prescription_service = PrescriptionService(self.storage)
+        self.notes_service = NotesService(self.storage)
+        self.thumbnails = ThumbnailCache(self.root, self.documents)
+        self.root.after(METRICS_EXPORT_MS, self.export_metrics)
+        # Το πρώτο καρέ έχει σχεδιαστεί όταν αδειάσουν οι εργασίες idle του mainloop
+        self.root.after_idle(lambda: self.root.after(0, self.on_first_frame))
+
+        # Το λογότυπο του συνταγολογίου φορτώνεται την πρώτη φορά που χρειαστεί
+        self._prescription_logo = None
 
         # Επαναφορά help drawer στο κάτω μέρος
         self.help_drawer = tk.Frame(self.root, bg='#e8eaf6', height=0)
         self.help_drawer.pack(fill='x', side='bottom', anchor='s')
         self.help_drawer_visible = False
 
+    @property
+    def prescription_logo(self):
+        if self._prescription_logo is None:
+            try:
+                self._prescription_logo = cached_logo(self.root, 'optic_logo_white_bg.png', 100)
+            except Exception as e:
+                logging.error(f"Σφάλμα κατά τη φόρτωση του λογότυπου: {str(e)}")
+                self._prescription_logo = False
+        return self._prescription_logo or None
+
+    def on_first_frame(self):
+        self.startup_timings['first_frame'] = time.perf_counter() - APP_START
+        for name, seconds in self.startup_timings.items():
+            METRICS.record('startup.' + name, seconds)
+        logging.info("Χρόνοι εκκίνησης: " + ", ".join(
+            f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.startup_timings.items()))
+
+    def export_metrics(self, reschedule=True):
+        try:
+            METRICS.export()
+        except Exception as e:
+            logging.error(f"Σφάλμα κατά την εξαγωγή των μετρήσεων: {str(e)}")
+        if reschedule:
+            self.root.after(METRICS_EXPORT_MS, self.export_metrics)
+
     def create_customer_section(self):
         label_pelates = tk.Label(self.root, text="\n--- Διαχείριση Πελατών ---", font=("Arial", 14, "bold"))
         label_pelates.pack()
 
         frame_pelates = tk.Frame(self.root)
         frame_pelates.pack(pady=10)
+        self.frame_pelates = frame_pelates
 
         tk.Button(frame_pelates, text="Καταχώρηση Πελάτη", command=self.kataxwrisi_pelati).grid(row=0, column=0, padx=5)
         tk.Button(frame_pelates, text="Αναζήτηση Πελάτη", command=self.anazitisi_pelati).grid(row=0, column=1, padx=5)
@@ -208,8 +3977,12 @@ class OpticalSystem:
         self.btn_view_notes = tk.Button(frame_pelates, text="Προβολή Σημειώσεων", command=self.provoli_seimeioseon, state='disabled')
         self.btn_view_notes.grid(row=0, column=7, padx=5)
 
+        tk.Button(frame_pelates, text="Εισαγωγή Πελατών",
+                  command=lambda: self.eisagogi_csv("Εισαγωγή Πελατών", self.customers, self.customer_service)
+                  ).grid(row=0, column=8, padx=5)
+
         cols = ("Όνομα", "Επώνυμο", "Τηλέφωνο", "Email", "Διεύθυνση", "Διαθέσιμα")
-        self.tree_pelates = ttk.Treeview(self.root, columns=cols, show='headings')
+        self.tree_pelates = VirtualTreeview(self.root, cols, show='headings')
         
         col_widths = {
             "Όνομα": 120,
@@ -234,20 +4007,105 @@ class OpticalSystem:
 
         frame_apothiki = tk.Frame(self.root)
         frame_apothiki.pack(pady=10)
+        self.frame_apothiki = frame_apothiki
 
         tk.Button(frame_apothiki, text="Καταχώρηση Προϊόντος", command=self.prosthiki_proiontos).grid(row=0, column=0, padx=5)
         tk.Button(frame_apothiki, text="Πώληση Προϊόντος", command=self.pwlisi_proiontos).grid(row=0, column=1, padx=5)
-        tk.Button(frame_apothiki, text="Διαγραφή Προϊόντος", command=self.diagrafi_proiontos).grid(row=0, column=2, padx=5)
-        tk.Button(frame_apothiki, text="Ανανέωση Αποθήκης", command=self.fortose_apothiki).grid(row=0, column=3, padx=5)
-
-        cols_apothiki = ("Όνομα Προϊόντος", "Κατηγορία", "Ποσότητα", "Τιμή")
-        self.tree_apothiki = ttk.Treeview(self.root, columns=cols_apothiki, show='headings')
+        tk.Button(frame_apothiki, text="Καλάθι Πώλησης", command=self.kalathi_pwlisis).grid(row=0, column=2, padx=5)
+        tk.Button(frame_apothiki, text="Διαγραφή Προϊόντος", command=self.diagrafi_proiontos).grid(row=0, column=3, padx=5)
+        tk.Button(frame_apothiki, text="Ανανέωση Αποθήκης", command=self.fortose_apothiki).grid(row=0, column=4, padx=5)
+        tk.Button(frame_apothiki, text="Αναφορές Πωλήσεων", command=self.anafores_pwliseon).grid(row=0, column=5, padx=5)
+        tk.Button(frame_apothiki, text="Κωδικός Προϊόντος", command=self.kwdikos_proiontos).grid(row=0, column=6, padx=5)
+        tk.Button(frame_apothiki, text="Εισαγωγή Προϊόντων",
+                  command=lambda: self.eisagogi_csv("Εισαγωγή Προϊόντων", self.inventory, self.inventory_service)
+                  ).grid(row=0, column=7, padx=5)
+
+        # Γρήγορη πώληση με σαρωτή barcode που γράφει σαν πληκτρολόγιο: κάθε
+        # σάρωση τελειώνει με Enter και προσθέτει ένα τεμάχιο στην τρέχουσα
+        # πώληση, χωρίς επιλογή στη λίστα και χωρίς παράθυρα
+        frame_sarwsi = tk.Frame(self.root)
+        frame_sarwsi.pack(pady=(0, 5))
+        self.frame_sarwsi = frame_sarwsi
+        tk.Label(frame_sarwsi, text="Σάρωση (F2):").grid(row=0, column=0, padx=5)
+        self.scan_entry = tk.Entry(frame_sarwsi, width=25)
+        self.scan_entry.grid(row=0, column=1, padx=5)
+        self.scan_entry.bind('<Return>', self.on_scan)
+        self.scan_entry.bind('<KP_Enter>', self.on_scan)
+        tk.Button(frame_sarwsi, text="Ολοκλήρωση (F12)", command=self.scan_checkout,
+                  bg='green', fg='white').grid(row=0, column=2, padx=5)
+        tk.Button(frame_sarwsi, text="Αφαίρεση Τελευταίας (Esc)", command=self.scan_undo).grid(row=0, column=3, padx=5)
+        tk.Button(frame_sarwsi, text="Αφαίρεση Μη Διαθέσιμων", command=self.scan_drop_invalid).grid(row=0, column=4, padx=5)
+        tk.Button(frame_sarwsi, text="Ακύρωση Πώλησης", command=self.scan_cancel).grid(row=0, column=5, padx=5)
+        self.scan_entry.bind('<Escape>', lambda event: self.scan_undo())
+        self.scan_label = tk.Label(frame_sarwsi, text="", width=70, anchor='w')
+        self.scan_label.grid(row=0, column=6, padx=5)
+        self.scan_cart = []
+        self.root.bind('<F2>', lambda event: self.scan_entry.focus_set())
+        self.root.bind('<F12>', lambda event: self.scan_checkout())
+
+        cols_apothiki = ("Όνομα Προϊόντος", "Κατηγορία", "Ποσότητα", "Τιμή", "Κωδικός")
+        self.tree_apothiki = VirtualTreeview(self.root, cols_apothiki, show='headings')
         for col in cols_apothiki:
             self.tree_apothiki.heading(col, text=col)
             self.tree_apothiki.column(col, width=200)
         self.tree_apothiki.pack(expand=True, fill='both', padx=10)
 
+    def create_status_bar(self):
+        self.status_frame = tk.Frame(self.root, bg='#f0f0f0')
+        self.status_frame.pack(fill='x', side='bottom', padx=10, pady=2)
+        self.status_label = tk.Label(self.status_frame, text="Φόρτωση δεδομένων...", bg='#f0f0f0', anchor='w')
+        self.status_label.pack(side='left')
+        self.status_progress = ttk.Progressbar(self.status_frame, length=200, mode='indeterminate')
+        self.status_progress.pack(side='right')
+        self.status_progress.start(15)
+
+    def set_data_actions_state(self, state):
+        # Τα κουμπιά προβολής ενεργοποιούνται μόνο με την επιλογή πελάτη
+        selection_buttons = (self.btn_open_doc, self.btn_view_prescriptions, self.btn_view_notes)
+        for frame in (self.frame_pelates, self.frame_apothiki, self.frame_sarwsi):
+            for widget in frame.winfo_children():
+                if widget not in selection_buttons:
+                    widget.config(state=state)
+
+    def on_load_batch(self, repository, batch):
+        if repository is self.customers:
+            self.tree_pelates.append_rows((row_id, customer_display_row(row)) for row_id, row in batch)
+        else:
+            self.tree_apothiki.append_rows(batch)
+        counts = self.loader.counts
+        self.status_label.config(
+            text=f"Φόρτωση δεδομένων... {counts['customers']} πελάτες, {counts['inventory']} προϊόντα")
+
+    def on_load_done(self):
+        self.status_progress.stop()
+        self.status_frame.pack_forget()
+        self.set_data_actions_state('normal')
+        self.search_index.rebuild()
+        try:
+            self.documents.collect(self.customers.rows.values())
+        except Exception as e:
+            logging.error(f"Σφάλμα κατά τον καθαρισμό εγγράφων: {str(e)}")
+        counts = self.loader.counts
+        logging.info(f"Φορτώθηκαν {counts['customers']} πελάτες και {counts['inventory']} προϊόντα")
+
+    def on_load_error(self, error):
+        self.status_progress.stop()
+        self.status_label.config(text="Σφάλμα κατά τη φόρτωση δεδομένων")
+        messagebox.showerror("Σφάλμα", f"Σφάλμα κατά τη φόρτωση των δεδομένων: {str(error)}")
+
+    def selected_customer(self):
+        # Ο κωδικός του επιλεγμένου πελάτη· τα κλειδιά της λίστας είναι οι θέσεις
+        # των πελατών στο αποθετήριο
+        selected = self.tree_pelates.selection()
+        if not selected:
+            return None
+        row = self.customers.rows.get(int(selected[0]))
+        return customer_id_of(row) if row else None
+
     def kataxwrisi_pelati(self):
+        # Ο κωδικός δεσμεύεται από την αρχή, γιατί μπορούν να προστεθούν
+        # συνταγές/σημειώσεις πριν από την αποθήκευση
+        customer_id = self.customer_service.new_id()
         dialog = tk.Toplevel(self.root)
         dialog.title("Καταχώρηση Πελάτη")
         dialog.geometry("600x500")  # Wider and shorter window
@@ -286,55 +4144,38 @@ class OpticalSystem:
         tk.Label(docs_frame, text="Έγγραφα:", bg='#f0f0f0', fg='#ff9800').pack(pady=5)
         docs_listbox = tk.Listbox(docs_frame, height=5, width=70)  # Wider listbox
         docs_listbox.pack()
+        doc_refs = []
 
         action_buttons_frame = tk.Frame(dialog, bg='#f0f0f0')
         action_buttons_frame.pack(pady=5)
 
+        doc_import = {'importer': None}
+
+        def add_document_ref(path, ref):
+            # Το ίδιο αρχείο αποθηκεύεται μία φορά, όσες φορές κι αν επισυναφθεί
+            if ref not in doc_refs:
+                doc_refs.append(ref)
+                docs_listbox.insert(tk.END, self.documents.display_name(ref))
+
         def add_document():
-            file_path = filedialog.askopenfilename(
-                title="Επιλέξτε έγγραφο",
-                filetypes=[("PDF files", "*.pdf"), ("Image files", "*.png *.jpg *.jpeg"), ("All files", "*.*")]
-            )
-            if file_path:
-                try:
-                    # Create documents directory if it doesn't exist
-                    if not os.path.exists(DOCUMENTS_DIR):
-                        os.makedirs(DOCUMENTS_DIR)
-
-                    # Generate unique filename with customer name and timestamp
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    base_name = os.path.basename(file_path)
-                    customer_name = f"{onoma.get()}_{eponimo.get()}".strip().replace(" ", "_")
-                    if not customer_name:
-                        customer_name = "unnamed"
-                    filename = f"{customer_name}_{timestamp}_{base_name}"
-                    target_path = os.path.join(DOCUMENTS_DIR, filename)
-                    
-                    # Copy the file
-                    shutil.copy2(file_path, target_path)
-                    
-                    # Verify the file was copied successfully
-                    if os.path.exists(target_path):
-                        docs_listbox.insert(tk.END, filename)
-                        messagebox.showinfo("Επιτυχία", f"Το έγγραφο {os.path.basename(file_path)} προστέθηκε επιτυχώς!")
-                    else:
-                        messagebox.showerror("Σφάλμα", "Δεν ήταν δυνατή η αντιγραφή του εγγράφου!")
-                except Exception as e:
-                    messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την προσθήκη του εγγράφου: {str(e)}")
+            if doc_import['importer'] and doc_import['importer'].running:
+                messagebox.showwarning("Προειδοποίηση", "Η εισαγωγή εγγράφων βρίσκεται σε εξέλιξη")
+                return
+            doc_import['importer'] = self.import_documents(dialog, docs_frame, add_document_ref)
 
         def open_prescription():
             customer_name = f"{onoma.get()} {eponimo.get()}".strip()
             if not customer_name:
                 messagebox.showwarning("Προειδοποίηση", "Παρακαλώ συμπληρώστε το όνομα και το επώνυμο πρώτα!")
                 return
-            self.create_prescription_form(dialog, customer_name)
+            self.create_prescription_form(dialog, customer_name, customer_id)
 
         def open_notes():
             customer_name = f"{onoma.get()} {eponimo.get()}".strip()
             if not customer_name:
                 messagebox.showwarning("Προειδοποίηση", "Παρακαλώ συμπληρώστε το όνομα και το επώνυμο πρώτα!")
                 return
-            self.create_notes_form(dialog, customer_name)
+            self.create_notes_form(dialog, customer_name, customer_id)
 
         tk.Button(action_buttons_frame, text="Προσθήκη Εγγράφου", command=add_document, 
                  bg='#ff9800', fg='black', width=20).pack(side=tk.LEFT, padx=5)
@@ -344,88 +4185,21 @@ class OpticalSystem:
                  bg='#ff9800', fg='black', width=20).pack(side=tk.LEFT, padx=5)
 
         def save():
+            if doc_import['importer'] and doc_import['importer'].running:
+                messagebox.showwarning("Προειδοποίηση", "Περιμένετε να ολοκληρωθεί η εισαγωγή εγγράφων")
+                return
             try:
-                name = onoma.get().strip()
-                surname = eponimo.get().strip()
-                phone = tilefono.get().strip()
-                email_val = email.get().strip()
-                address = dieuthinsi.get().strip()
-
-                if not name:
-                    logging.warning("Προσπάθεια αποθήκευσης πελάτη χωρίς όνομα")
-                    messagebox.showerror("Σφάλμα", "Το όνομα είναι υποχρεωτικό!")
-                    return
-
-                if phone and not validate_phone(phone):
-                    logging.warning(f"Προσπάθεια αποθήκευσης πελάτη με μη έγκυρο τηλέφωνο: {phone}")
-                    messagebox.showerror("Σφάλμα", 
-                        "Το τηλέφωνο πρέπει να είναι 10 ψηφία και να ξεκινάει:\n" + 
-                        "- με 69 για κινητό\n" + 
-                        "- με 2 για σταθερό")
-                    return
-
-                if email_val and not validate_email(email_val):
-                    logging.warning(f"Προσπάθεια αποθήκευσης πελάτη με μη έγκυρο email: {email_val}")
-                    messagebox.showerror("Σφάλμα", "Το email πρέπει να έχει τη μορφή: onoma@domain.com")
-                    return
-
-                if check_duplicate_customer(name, surname, phone, email_val):
-                    logging.warning(f"Προσπάθεια διπλής καταχώρισης πελάτη: {name} {surname}")
-                    messagebox.showerror("Σφάλμα", 
-                        "Υπάρχει ήδη πελάτης με τα ίδια στοιχεία!\n" +
-                        "(έλεγχος για ίδιο όνομα/επώνυμο, τηλέφωνο ή email)")
-                    return
-
-                # Get documents from listbox
-                documents = []
-                for i in range(docs_listbox.size()):
-                    doc_name = docs_listbox.get(i)
-                    doc_path = os.path.join(DOCUMENTS_DIR, doc_name)
-                    if os.path.exists(doc_path):
-                        documents.append(doc_name)
-                    else:
-                        logging.warning(f"Το έγγραφο {doc_name} δεν βρέθηκε κατά την αποθήκευση")
-                documents_str = ", ".join(documents)
-
-                # Add flags based on what was added
-                flags = []
-                if documents:  # Changed from documents_str to documents
-                    flags.append("Έγγραφα")
-
-                # Check for prescriptions
-                customer_name = f"{name} {surname}".strip()
-                if os.path.exists("συνταγολόγια.csv"):
-                    with open("συνταγολόγια.csv", mode='r', newline='', encoding='utf-8') as f:
-                        reader = csv.reader(f)
-                        next(reader)
-                        for row in reader:
-                            if row[1].strip().lower() == customer_name.lower():
-                                flags.append("Συνταγές")
-                                break
-
-                # Check for notes
-                if os.path.exists(NOTES_CSV):
-                    with open(NOTES_CSV, mode='r', newline='', encoding='utf-8') as f:
-                        reader = csv.reader(f)
-                        next(reader)
-                        for row in reader:
-                            if row[1].strip().lower() == customer_name.lower():
-                                flags.append("Σημειώσεις")
-                                break
-
-                flags_str = ", ".join(flags)
-
-                with open(FILE_NAME, mode='a', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    writer.writerow([name, surname, phone, email_val, address, documents_str, flags_str])
-
-                logging.info(f"Προστέθηκε νέος πελάτης: {name} {surname}")
-                messagebox.showinfo("Επιτυχία", "Ο πελάτης καταχωρήθηκε επιτυχώς!")
-                dialog.destroy()
-                self.fortose_kai_emfanise()
+                self.customer_service.add(onoma.get(), eponimo.get(), tilefono.get(),
+                                          email.get(), dieuthinsi.get(), doc_refs, customer_id)
+            except ValidationError as e:
+                messagebox.showerror("Σφάλμα", str(e))
+                return
             except Exception as e:
                 logging.error(f"Σφάλμα κατά την αποθήκευση πελάτη: {str(e)}")
                 messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την αποθήκευση: {str(e)}")
+                return
+            messagebox.showinfo("Επιτυχία", "Ο πελάτης καταχωρήθηκε επιτυχώς!")
+            dialog.destroy()
 
         save_cancel_frame = tk.Frame(dialog)
         save_cancel_frame.pack(pady=10, padx=10)
@@ -441,67 +4215,20 @@ class OpticalSystem:
 
         item = self.tree_pelates.item(selected[0])
         values = item['values']
+        customer_id = self.selected_customer()
 
         if messagebox.askyesno("Επιβεβαίωση", f"Είστε σίγουροι ότι θέλετε να διαγράψετε τον πελάτη {values[0]} {values[1]}?"):
             try:
-                if not create_backup(FILE_NAME):
+                if not create_backup("Διαγραφή πελάτη"):
                     if not messagebox.askyesno("Προειδοποίηση", 
                         "Δεν ήταν δυνατή η δημιουργία αντιγράφου ασφαλείας.\nΘέλετε να συνεχίσετε με τη διαγραφή;"):
                         return
-                if len(values) > 5 and values[5]:
-                    docs = values[5].split(", ")
-                    missing_docs = []
-                    for doc in docs:
-                        try:
-                            doc_path = os.path.join(DOCUMENTS_DIR, doc)
-                            if os.path.exists(doc_path):
-                                os.remove(doc_path)
-                                logging.info(f"Διαγράφηκε το έγγραφο: {doc}")
-                            else:
-                                missing_docs.append(doc)
-                                logging.warning(f"Το έγγραφο {doc} δεν βρέθηκε κατά τη διαγραφή του πελάτη {values[0]} {values[1]}")
-                        except Exception as e:
-                            logging.error(f"Σφάλμα κατά τη διαγραφή εγγράφου {doc}: {str(e)}")
-                            missing_docs.append(doc)
-                    if missing_docs:
-                        messagebox.showwarning("Προειδοποίηση", 
-                            f"Τα παρακάτω έγγραφα δεν βρέθηκαν ή δεν μπόρεσαν να διαγραφούν:\n" + 
-                            "\n".join(missing_docs))
-                # Διαγραφή πελάτη από το πελάτες.csv
-                rows = []
-                with open(FILE_NAME, mode='r', newline='', encoding='utf-8') as file:
-                    reader = csv.reader(file)
-                    header = next(reader)
-                    for row in reader:
-                        # Σύγκριση με strip και lower για σωστή διαγραφή
-                        if str(row[0]).strip().lower() != str(values[0]).strip().lower() or str(row[1]).strip().lower() != str(values[1]).strip().lower():
-                            rows.append(row)
-                with open(FILE_NAME, mode='w', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(header)
-                    writer.writerows(rows)
-                # Διαγραφή συνταγών από το συνταγολόγια.csv
-                PRESCRIPTION_CSV = "συνταγολόγια.csv"
-                if os.path.exists(PRESCRIPTION_CSV):
-                    try:
-                        rows = []
-                        with open(PRESCRIPTION_CSV, mode='r', newline='', encoding='utf-8') as f:
-                            reader = csv.reader(f)
-                            header = next(reader)
-                            for row in reader:
-                                # row[1] = Ονοματεπώνυμο
-                                if len(row) > 1 and row[1].strip().replace(' ', '').lower() != f"{values[0]}{values[1]}".strip().replace(' ', '').lower():
-                                    rows.append(row)
-                        with open(PRESCRIPTION_CSV, mode='w', newline='', encoding='utf-8') as f:
-                            writer = csv.writer(f)
-                            writer.writerow(header)
-                            writer.writerows(rows)
-                        logging.info(f"Διαγράφηκαν οι συνταγές του πελάτη {values[0]} {values[1]} από το συνταγολόγια.csv")
-                    except Exception as e:
-                        logging.error(f"Σφάλμα κατά τη διαγραφή συνταγών πελάτη: {str(e)}")
-                logging.info(f"Διαγράφηκε ο πελάτης: {values[0]} {values[1]}")
+                missing_docs = self.customer_service.delete(customer_id)
+                if missing_docs:
+                    messagebox.showwarning("Προειδοποίηση", 
+                        f"Τα παρακάτω έγγραφα δεν βρέθηκαν ή δεν μπόρεσαν να διαγραφούν:\n" + 
+                        "\n".join(self.documents.display_name(doc) for doc in missing_docs))
                 messagebox.showinfo("Επιτυχία", "Ο πελάτης διαγράφηκε επιτυχώς!")
-                self.fortose_kai_emfanise()
             except Exception as e:
                 logging.error(f"Σφάλμα κατά τη διαγραφή πελάτη: {str(e)}")
                 messagebox.showerror("Σφάλμα", f"Σφάλμα κατά τη διαγραφή: {str(e)}")
@@ -514,29 +4241,15 @@ class OpticalSystem:
 
         item = self.tree_pelates.item(selected[0])
         values = item['values']
+        customer_id = self.selected_customer()
         
         # Convert all values to strings and handle None values
         values = [str(val) if val is not None else "" for val in values]
-        
-        # Now we can safely use string operations since all values are strings
-        old_name = values[0].strip()
-        old_surname = values[1].strip()
-        old_phone = values[2].strip()
-        old_email = values[3].strip()
-        old_address = values[4].strip()
-        old_customer_name = f"{old_name} {old_surname}".strip().lower()
-
-        # Get the original documents from the CSV file
+
+        # Get the original documents from the repository
         original_documents = []
         try:
-            with open(FILE_NAME, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                for row in reader:
-                    if row[0].strip().lower() == old_name.lower() and row[1].strip().lower() == old_surname.lower():
-                        if len(row) > 5 and row[5]:
-                            original_documents = [doc.strip() for doc in row[5].split(",") if doc.strip()]
-                        break
+            original_documents = self.customer_service.documents_for(customer_id)
         except Exception as e:
             logging.error(f"Σφάλμα κατά την ανάγνωση εγγράφων: {str(e)}")
 
@@ -585,55 +4298,39 @@ class OpticalSystem:
         docs_listbox.pack(fill='x', padx=5)
 
         # Load existing documents
+        doc_refs = []
         for doc in original_documents:
-            if os.path.exists(os.path.join(DOCUMENTS_DIR, doc)):
-                docs_listbox.insert(tk.END, doc)
+            if self.documents.exists(doc):
+                doc_refs.append(doc)
+                docs_listbox.insert(tk.END, self.documents.display_name(doc))
+
+        doc_import = {'importer': None}
+
+        def add_document_ref(path, ref):
+            # Το ίδιο αρχείο αποθηκεύεται μία φορά, όσες φορές κι αν επισυναφθεί
+            if ref not in doc_refs:
+                doc_refs.append(ref)
+                docs_listbox.insert(tk.END, self.documents.display_name(ref))
 
         def add_document():
-            file_path = filedialog.askopenfilename(
-                title="Επιλέξτε έγγραφο",
-                filetypes=[("PDF files", "*.pdf"), ("Image files", "*.png *.jpg *.jpeg"), ("All files", "*.*")]
-            )
-            if file_path:
-                try:
-                    # Create documents directory if it doesn't exist
-                    if not os.path.exists(DOCUMENTS_DIR):
-                        os.makedirs(DOCUMENTS_DIR)
-
-                    # Generate unique filename with customer name and timestamp
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    base_name = os.path.basename(file_path)
-                    customer_name = f"{onoma.get()}_{eponimo.get()}".strip().replace(" ", "_")
-                    if not customer_name:
-                        customer_name = "unnamed"
-                    filename = f"{customer_name}_{timestamp}_{base_name}"
-                    target_path = os.path.join(DOCUMENTS_DIR, filename)
-                    
-                    # Copy the file
-                    shutil.copy2(file_path, target_path)
-                    
-                    # Verify the file was copied successfully
-                    if os.path.exists(target_path):
-                        docs_listbox.insert(tk.END, filename)
-                        messagebox.showinfo("Επιτυχία", f"Το έγγραφο {os.path.basename(file_path)} προστέθηκε επιτυχώς!")
-                    else:
-                        messagebox.showerror("Σφάλμα", "Δεν ήταν δυνατή η αντιγραφή του εγγράφου!")
-                except Exception as e:
-                    messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την προσθήκη του εγγράφου: {str(e)}")
+            if doc_import['importer'] and doc_import['importer'].running:
+                messagebox.showwarning("Προειδοποίηση", "Η εισαγωγή εγγράφων βρίσκεται σε εξέλιξη")
+                return
+            doc_import['importer'] = self.import_documents(dialog, docs_frame, add_document_ref)
 
         def open_prescription():
             customer_name = f"{onoma.get()} {eponimo.get()}".strip()
             if not customer_name:
                 messagebox.showwarning("Προειδοποίηση", "Παρακαλώ συμπληρώστε το όνομα και το επώνυμο πρώτα!")
                 return
-            self.create_prescription_form(dialog, customer_name)
+            self.create_prescription_form(dialog, customer_name, customer_id)
 
         def open_notes():
             customer_name = f"{onoma.get()} {eponimo.get()}".strip()
             if not customer_name:
                 messagebox.showwarning("Προειδοποίηση", "Παρακαλώ συμπληρώστε το όνομα και το επώνυμο πρώτα!")
                 return
-            self.create_notes_form(dialog, customer_name)
+            self.create_notes_form(dialog, customer_name, customer_id)
 
         action_buttons_frame = tk.Frame(dialog, bg='#f0f0f0')
         action_buttons_frame.pack(pady=5)
@@ -646,134 +4343,21 @@ class OpticalSystem:
                  bg='#ff9800', fg='black', width=20).pack(side=tk.LEFT, padx=5)
 
         def save():
+            if doc_import['importer'] and doc_import['importer'].running:
+                messagebox.showwarning("Προειδοποίηση", "Περιμένετε να ολοκληρωθεί η εισαγωγή εγγράφων")
+                return
             try:
-                name = onoma.get().strip()
-                surname = eponimo.get().strip()
-                phone = tilefono.get().strip()
-                email_val = email.get().strip()
-                address = dieuthinsi.get().strip()
-                new_customer_name = f"{name} {surname}".strip().lower()
-
-                if not name:
-                    logging.warning("Προσπάθεια αποθήκευσης πελάτη χωρίς όνομα (διόρθωση)")
-                    messagebox.showerror("Σφάλμα", "Το όνομα είναι υποχρεωτικό!")
-                    return
-
-                if phone and not validate_phone(phone):
-                    logging.warning(f"Προσπάθεια αποθήκευσης πελάτη με μη έγκυρο τηλέφωνο (διόρθωση): {phone}")
-                    messagebox.showerror("Σφάλμα",
-                        "Το τηλέφωνο πρέπει να είναι 10 ψηφία και να ξεκινάει:\n" +
-                        "- με 69 για κινητό\n" +
-                        "- με 2 για σταθερό")
-                    return
-
-                if email_val and not validate_email(email_val):
-                    logging.warning(f"Προσπάθεια αποθήκευσης πελάτη με μη έγκυρο email (διόρθωση): {email_val}")
-                    messagebox.showerror("Σφάλμα", "Το email πρέπει να έχει τη μορφή: onoma@domain.com")
-                    return
-
-                # Get documents from listbox
-                documents = []
-                for i in range(docs_listbox.size()):
-                    doc_name = docs_listbox.get(i)
-                    doc_path = os.path.join(DOCUMENTS_DIR, doc_name)
-                    if os.path.exists(doc_path):
-                        documents.append(doc_name)
-                    else:
-                        logging.warning(f"Το έγγραφο {doc_name} δεν βρέθηκε κατά την αποθήκευση")
-                documents_str = ", ".join(documents)
-
-                # Add flags based on what was added
-                flags = []
-                if documents:
-                    flags.append("Έγγραφα")
-
-                # Update prescriptions if name changed
-                if os.path.exists("συνταγολόγια.csv"):
-                    prescriptions_updated = False
-                    temp_rows = []
-                    try:
-                        with open("συνταγολόγια.csv", mode='r', newline='', encoding='utf-8') as f:
-                            reader = csv.reader(f)
-                            header = next(reader)
-                            has_prescriptions = False
-                            for row in reader:
-                                if row[1].strip().lower() == old_customer_name:
-                                    has_prescriptions = True
-                                    if old_customer_name != new_customer_name:
-                                        row[1] = f"{name} {surname}"
-                                temp_rows.append(row)
-                            if has_prescriptions:
-                                flags.append("Συνταγές")
-                                
-                        if old_customer_name != new_customer_name and temp_rows:
-                            with open("συνταγολόγια.csv", mode='w', newline='', encoding='utf-8') as f:
-                                writer = csv.writer(f)
-                                writer.writerow(header)
-                                writer.writerows(temp_rows)
-                                prescriptions_updated = True
-                                logging.info(f"Ενημερώθηκαν οι συνταγές του πελάτη από {old_customer_name} σε {new_customer_name}")
-                    except Exception as e:
-                        logging.error(f"Σφάλμα κατά την ενημέρωση συνταγών: {str(e)}")
-
-                # Update notes if name changed
-                if os.path.exists(NOTES_CSV):
-                    notes_updated = False
-                    temp_rows = []
-                    try:
-                        with open(NOTES_CSV, mode='r', newline='', encoding='utf-8') as f:
-                            reader = csv.reader(f)
-                            header = next(reader)
-                            has_notes = False
-                            for row in reader:
-                                if row[1].strip().lower() == old_customer_name:
-                                    has_notes = True
-                                    if old_customer_name != new_customer_name:
-                                        row[1] = f"{name} {surname}"
-                                temp_rows.append(row)
-                            if has_notes:
-                                flags.append("Σημειώσεις")
-
-                        if old_customer_name != new_customer_name and temp_rows:
-                            with open(NOTES_CSV, mode='w', newline='', encoding='utf-8') as f:
-                                writer = csv.writer(f)
-                                writer.writerow(header)
-                                writer.writerows(temp_rows)
-                                notes_updated = True
-                                logging.info(f"Ενημερώθηκαν οι σημειώσεις του πελάτη από {old_customer_name} σε {new_customer_name}")
-                    except Exception as e:
-                        logging.error(f"Σφάλμα κατά την ενημέρωση σημειώσεων: {str(e)}")
-
-                flags_str = ", ".join(flags)
-
-                # Update the customer's record
-                rows = []
-                updated = False
-                with open(FILE_NAME, mode='r', newline='', encoding='utf-8') as file:
-                    reader = csv.reader(file)
-                    header = next(reader)
-                    for row in reader:
-                        if row[0].strip().lower() == old_name.lower() and row[1].strip().lower() == old_surname.lower():
-                            rows.append([name, surname, phone, email_val, address, documents_str, flags_str])
-                            updated = True
-                        else:
-                            rows.append(row)
-
-                if not updated:
-                    rows.append([name, surname, phone, email_val, address, documents_str, flags_str])
-
-                with open(FILE_NAME, mode='w', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(header)
-                    writer.writerows(rows)
-
-                logging.info(f"Ενημερώθηκε ο πελάτης: {name} {surname}")
-                messagebox.showinfo("Επιτυχία", "Τα στοιχεία του πελάτη ενημερώθηκαν επιτυχώς!")
-                dialog.destroy()
-                self.fortose_kai_emfanise()
+                self.customer_service.update(customer_id, onoma.get(), eponimo.get(), tilefono.get(),
+                                             email.get(), dieuthinsi.get(), doc_refs)
+            except ValidationError as e:
+                messagebox.showerror("Σφάλμα", str(e))
+                return
             except Exception as e:
                 logging.error(f"Σφάλμα κατά την αποθήκευση πελάτη (διόρθωση): {str(e)}")
                 messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την αποθήκευση: {str(e)}")
+                return
+            messagebox.showinfo("Επιτυχία", "Τα στοιχεία του πελάτη ενημερώθηκαν επιτυχώς!")
+            dialog.destroy()
 
         save_cancel_frame = tk.Frame(dialog)
         save_cancel_frame.pack(pady=10, padx=10)
@@ -783,7 +4367,7 @@ class OpticalSystem:
     def anazitisi_pelati(self):
         search_dialog = tk.Toplevel(self.root)
         search_dialog.title("Αναζήτηση Πελάτη")
-        search_dialog.geometry("400x200")
+        search_dialog.geometry("400x230")
         search_dialog.transient(self.root)
         search_dialog.grab_set()
         center_window(search_dialog)
@@ -800,52 +4384,71 @@ class OpticalSystem:
         tk.Radiobutton(search_frame, text="Διεύθυνση", variable=search_type, value="address").pack(side=tk.LEFT)
 
         tk.Label(search_dialog, text="Κείμενο αναζήτησης:").pack(pady=5)
-        search_entry = tk.Entry(search_dialog, width=40)
+        search_text = tk.StringVar()
+        search_entry = tk.Entry(search_dialog, width=40, textvariable=search_text)
         search_entry.pack()
+        search_entry.focus_set()
+
+        result_label = tk.Label(search_dialog, text="", fg='gray')
+        result_label.pack()
+
+        # Τα αποτελέσματα ανανεώνονται καθώς πληκτρολογεί ο χρήστης,
+        # αφού σταματήσει για SEARCH_DEBOUNCE_MS
+        pending = {'job': None}
+
+        def run_search():
+            pending['job'] = None
+            if not search_text.get().strip():
+                self.fortose_kai_emfanise()
+                result_label.config(text="")
+                return []
+            results = [(row_id, customer_display_row(row))
+                       for row_id, row in self.customer_service.search(search_type.get(), search_text.get())]
+            self.tree_pelates.set_rows(results)
+            result_label.config(text=f"Βρέθηκαν {len(results)} πελάτες")
+            return results
+
+        def schedule_search(*args):
+            if pending['job'] is not None:
+                search_dialog.after_cancel(pending['job'])
+            pending['job'] = search_dialog.after(SEARCH_DEBOUNCE_MS, run_search)
+
+        def cancel_pending():
+            if pending['job'] is not None:
+                search_dialog.after_cancel(pending['job'])
+                pending['job'] = None
+
+        search_text.trace_add('write', schedule_search)
+        search_type.trace_add('write', schedule_search)
 
         def do_search():
-            search_text = search_entry.get().strip().lower()
-            if not search_text:
+            cancel_pending()
+            if not search_text.get().strip():
                 messagebox.showwarning("Προειδοποίηση", "Παρακαλώ εισάγετε κείμενο για αναζήτηση")
                 return
-
-            for item in self.tree_pelates.get_children():
-                self.tree_pelates.delete(item)
-            
-            column_map = {
-                "name": [0, 1],
-                "phone": [2],
-                "email": [3],
-                "address": [4]
-            }
-            
-            search_columns = column_map[search_type.get()]
-            found = False
-            
-            with open(FILE_NAME, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)
-                for row in reader:
-                    for col in search_columns:
-                        if search_text in row[col].lower():
-                            self.tree_pelates.insert('', 'end', values=row)
-                            found = True
-                            break
-            
-            if not found:
+            results = run_search()
+            if not results:
                 messagebox.showinfo("Πληροφορία", "Δεν βρέθηκαν αποτελέσματα")
             search_dialog.destroy()
 
+        def cancel_search():
+            cancel_pending()
+            self.fortose_kai_emfanise()
+            search_dialog.destroy()
+
+        search_entry.bind('<Return>', lambda e: do_search())
+        search_dialog.protocol("WM_DELETE_WINDOW", cancel_search)
+
         button_frame = tk.Frame(search_dialog)
         button_frame.pack(pady=10)
         
         tk.Button(button_frame, text="Αναζήτηση", command=do_search, bg='green', fg='white', width=15).pack(side=tk.LEFT, padx=5)
-        tk.Button(button_frame, text="Ακύρωση", command=search_dialog.destroy, bg='red', fg='white', width=15).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Ακύρωση", command=cancel_search, bg='red', fg='white', width=15).pack(side=tk.LEFT, padx=5)
 
     def prosthiki_proiontos(self):
         dialog = tk.Toplevel(self.root)
         dialog.title("Καταχώρηση Νέου Προϊόντος")
-        dialog.geometry("400x300")
+        dialog.geometry("400x360")
         dialog.transient(self.root)
         dialog.grab_set()
         dialog.focus_set()
@@ -870,6 +4473,10 @@ class OpticalSystem:
         timi = tk.Entry(input_frame, width=40)
         timi.pack()
 
+        tk.Label(input_frame, text="Κωδικός / Barcode (προαιρετικό):").pack(pady=5)
+        kwdikos = tk.Entry(input_frame, width=40)
+        kwdikos.pack()
+
         buttons_frame = tk.Frame(dialog)
         buttons_frame.pack(pady=10, padx=10)
 
@@ -879,47 +4486,29 @@ class OpticalSystem:
                 messagebox.showerror("Σφάλμα", "Παρακαλώ εισάγετε όνομα προϊόντος!")
                 return
 
-            with open(INVENTORY_FILE, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)
-                for row in reader:
-                    if row[0].lower() == product_name.lower():
-                        messagebox.showinfo("Πληροφορίες", 
-                            f"Το προϊόν '{row[0]}' υπάρχει ήδη στην αποθήκη.\n"
-                            f"Διαθέσιμη ποσότητα: {row[2]}\n"
-                            f"Τιμή: {row[3]}€")
-                        return True
+            row = self.inventory.find(product_name)
+            if row:
+                messagebox.showinfo("Πληροφορίες", 
+                    f"Το προϊόν '{row[0]}' υπάρχει ήδη στην αποθήκη.\n"
+                    f"Διαθέσιμη ποσότητα: {row[2]}\n"
+                    f"Τιμή: {row[3]}€")
+                return True
             return False
 
         def save():
             try:
-                if not onoma.get() or not katigoria.get() or not posotita.get() or not timi.get():
-                    messagebox.showerror("Σφάλμα", "Όλα τα πεδία είναι υποχρεωτικά!")
-                    return
-
-                if check_product():
+                if onoma.get().strip() and check_product():
                     messagebox.showwarning("Προειδοποίηση", 
                         "Το προϊόν υπάρχει ήδη στην αποθήκη.\n"
                         "Χρησιμοποιήστε το κουμπί 'Παραγγελία' για να προσθέσετε ποσότητα.")
                     return
 
-                posotita_val = int(posotita.get())
-                timi_val = float(timi.get())
-
-                with open(INVENTORY_FILE, mode='a', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    writer.writerow([
-                        onoma.get(),
-                        katigoria.get(),
-                        posotita_val,
-                        timi_val
-                    ])
+                self.inventory_service.add(onoma.get(), katigoria.get(), posotita.get(), timi.get(), kwdikos.get())
                 
                 messagebox.showinfo("Επιτυχία", "Το προϊόν καταχωρήθηκε επιτυχώς!")
                 dialog.destroy()
-                self.fortose_apothiki()
-            except ValueError:
-                messagebox.showerror("Σφάλμα", "Η ποσότητα πρέπει να είναι ακέραιος αριθμός και η τιμή δεκαδικός!")
+            except ValidationError as e:
+                messagebox.showerror("Σφάλμα", str(e))
 
         def order_product():
             product_name = onoma.get().strip()
@@ -927,14 +4516,7 @@ class OpticalSystem:
                 messagebox.showerror("Σφάλμα", "Παρακαλώ εισάγετε όνομα προϊόντος!")
                 return
 
-            existing_product = None
-            with open(INVENTORY_FILE, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)
-                for row in reader:
-                    if row[0].lower() == product_name.lower():
-                        existing_product = row
-                        break
+            existing_product = self.inventory.find(product_name)
 
             if not existing_product:
                 messagebox.showerror("Σφάλμα", "Το προϊόν δεν υπάρχει στην αποθήκη!")
@@ -961,31 +4543,13 @@ class OpticalSystem:
 
             def save_order():
                 try:
-                    quantity = int(order_quantity.get())
-                    if quantity <= 0:
-                        messagebox.showerror("Σφάλμα", "Η ποσότητα πρέπει να είναι θετικός αριθμός!")
-                        return
+                    self.inventory_service.order(product_name, order_quantity.get())
 
-                    rows = []
-                    with open(INVENTORY_FILE, mode='r', newline='', encoding='utf-8') as file:
-                        reader = csv.reader(file)
-                        header = next(reader)
-                        for row in reader:
-                            if row[0].lower() == product_name.lower():
-                                row[2] = str(int(row[2]) + quantity)
-                            rows.append(row)
-
-                    with open(INVENTORY_FILE, mode='w', newline='', encoding='utf-8') as file:
-                        writer = csv.writer(file)
-                        writer.writerow(header)
-                        writer.writerows(rows)
-
-                    messagebox.showinfo("Επιτυχία", f"Προστέθηκαν {quantity} τεμάχια στο προϊόν {existing_product[0]}")
+                    messagebox.showinfo("Επιτυχία", f"Προστέθηκαν {order_quantity.get().strip()} τεμάχια στο προϊόν {existing_product[0]}")
                     order_dialog.destroy()
                     dialog.destroy()
-                    self.fortose_apothiki()
-                except ValueError:
-                    messagebox.showerror("Σφάλμα", "Παρακαλώ εισάγετε έγκυρη ποσότητα!")
+                except ValidationError as e:
+                    messagebox.showerror("Σφάλμα", str(e))
 
             tk.Button(order_dialog, text="Αποθήκευση", command=save_order, bg='green', fg='white', width=15).pack(pady=10)
             tk.Button(order_dialog, text="Ακύρωση", command=order_dialog.destroy, bg='red', fg='white', width=15).pack(pady=5)
@@ -1006,25 +4570,9 @@ class OpticalSystem:
             values = item['values']
 
             try:
-                price = float(values[3])
-                if price <= 0:
-                    logging.warning(f"Προσπάθεια πώλησης προϊόντος με μη έγκυρη τιμή: {price}")
-                    messagebox.showerror("Σφάλμα", "Η τιμή του προϊόντος πρέπει να είναι θετική!")
-                    return
-            except ValueError:
-                logging.warning(f"Προσπάθεια πώλησης προϊόντος με μη έγκυρη τιμή: {values[3]}")
-                messagebox.showerror("Σφάλμα", "Η τιμή του προϊόντος δεν είναι έγκυρη!")
-                return
-
-            try:
-                quantity = int(values[2])
-                if quantity <= 0:
-                    logging.warning(f"Προσπάθεια πώλησης προϊόντος με μη έγκυρη ποσότητα: {quantity}")
-                    messagebox.showerror("Σφάλμα", "Η ποσότητα του προϊόντος πρέπει να είναι θετική!")
-                    return
-            except ValueError:
-                logging.warning(f"Προσπάθεια πώλησης προϊόντος με μη έγκυρη ποσότητα: {values[2]}")
-                messagebox.showerror("Σφάλμα", "Η ποσότητα του προϊόντος δεν είναι έγκυρη!")
+                self.inventory_service.check_sale([str(value) for value in values])
+            except ValidationError as e:
+                messagebox.showerror("Σφάλμα", str(e))
                 return
 
             dialog = tk.Toplevel(self.root)
@@ -1057,47 +4605,20 @@ class OpticalSystem:
 
             def save():
                 try:
-                    posotita_val = int(posotita.get())
-                    if posotita_val <= 0:
-                        messagebox.showerror("Σφάλμα", "Η ποσότητα πρέπει να είναι θετικός αριθμός!")
-                        return
-                    if posotita_val > quantity:
-                        messagebox.showerror("Σφάλμα", "Δεν υπάρχει αρκετή ποσότητα στην αποθήκη!")
-                        return
-
-                    rows = []
-                    try:
-                        with open(INVENTORY_FILE, mode='r', newline='', encoding='utf-8') as file:
-                            reader = csv.reader(file)
-                            header = next(reader)
-                            for row in reader:
-                                if row[0] == values[0]:
-                                    new_quantity = int(row[2]) - posotita_val
-                                    if new_quantity < 0:
-                                        messagebox.showerror("Σφάλμα", "Η ποσότητα δεν μπορεί να γίνει αρνητική!")
-                                        return
-                                    row[2] = str(new_quantity)
-                                    if new_quantity == 0:
-                                        messagebox.showwarning("Προειδοποίηση", 
-                                            f"Το προϊόν '{values[0]}' έχει τελειώσει!\nΠαρακαλώ κάντε παραγγελία.")
-                                rows.append(row)
-
-                        with open(INVENTORY_FILE, mode='w', newline='', encoding='utf-8') as file:
-                            writer = csv.writer(file)
-                            writer.writerow(header)
-                            writer.writerows(rows)
-
-                        total = posotita_val * price
-                        logging.info(f"Πώληση προϊόντος: {values[0]}, ποσότητα: {posotita_val}, συνολικό ποσό: {total:.2f}€")
-                        messagebox.showinfo("Επιτυχία", 
-                            f"Η πώληση ολοκληρώθηκε επιτυχώς!\nΣυνολικό ποσό: {total:.2f}€")
-                        dialog.destroy()
-                        self.fortose_apothiki()
-                    except Exception as e:
-                        logging.error(f"Σφάλμα κατά την ενημέρωση της αποθήκης: {str(e)}")
-                        messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την ενημέρωση της αποθήκης: {str(e)}")
-                except ValueError:
-                    messagebox.showerror("Σφάλμα", "Παρακαλώ εισάγετε έγκυρη ποσότητα!")
+                    total, new_quantity = self.inventory_service.sell(values[0], posotita.get())
+                except ValidationError as e:
+                    messagebox.showerror("Σφάλμα", str(e))
+                    return
+                except Exception as e:
+                    logging.error(f"Σφάλμα κατά την ενημέρωση της αποθήκης: {str(e)}")
+                    messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την ενημέρωση της αποθήκης: {str(e)}")
+                    return
+                if new_quantity == 0:
+                    messagebox.showwarning("Προειδοποίηση", 
+                        f"Το προϊόν '{values[0]}' έχει τελειώσει!\nΠαρακαλώ κάντε παραγγελία.")
+                messagebox.showinfo("Επιτυχία", 
+                    f"Η πώληση ολοκληρώθηκε επιτυχώς!\nΣυνολικό ποσό: {total:.2f}€")
+                dialog.destroy()
 
             tk.Button(buttons_frame, text="Ολοκλήρωση Πώλησης", command=save, bg='green', fg='white', width=20).pack(side=tk.LEFT, padx=5)
             tk.Button(buttons_frame, text="Ακύρωση", command=dialog.destroy, bg='red', fg='white', width=15).pack(side=tk.LEFT, padx=5)
@@ -1105,66 +4626,312 @@ class OpticalSystem:
             logging.error(f"Σφάλμα κατά την πώληση προϊόντος: {str(e)}")
             messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την πώληση: {str(e)}")
 
-    def fortose_kai_emfanise(self):
-        for item in self.tree_pelates.get_children():
-            self.tree_pelates.delete(item)
-        
+    def show_scan_cart(self, message, lines=None, error=False):
+        if lines is None:
+            try:
+                lines = self.inventory_service.validate_cart(self.scan_cart) if self.scan_cart else []
+            except ValidationError:
+                # Το καλάθι δεν ισχύει πια (π.χ. άλλαξε το απόθεμα ή διαγράφηκε
+                # προϊόν): φαίνεται μόνο το πλήθος των σαρώσεων
+                lines = []
+                message = f"{len(self.scan_cart)} σαρώσεις | {message}"
+        if lines:
+            quantity = sum(line[1] for line in lines)
+            total = sum(line[1] * line[2] for line in lines)
+            message = f"{quantity} τεμ. | Σύνολο: {total:.2f}€ | {message}"
+        self.scan_label.config(text=message, fg='red' if error else 'black')
+
+    def on_scan(self, event=None):
+        code = self.scan_entry.get()
+        self.scan_entry.delete(0, tk.END)
         try:
-            if not os.path.exists(FILE_NAME):
-                with open(FILE_NAME, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(CUSTOMER_HEADERS)
-                logging.info(f"Δημιουργήθηκε νέο αρχείο {FILE_NAME}")
+            row = self.inventory_service.lookup(code)
+            lines = self.inventory_service.validate_cart(self.scan_cart + [(row[0], 1)])
+        except ValidationError as e:
+            self.root.bell()
+            self.show_scan_cart(str(e).replace('\n', ' '), error=True)
+            return 'break'
+        self.scan_cart.append((row[0], 1))
+        self.show_scan_cart(f"{row[0]} {float(row[3]):.2f}€", lines)
+        return 'break'
+
+    def scan_checkout(self):
+        if not self.scan_cart:
+            return
+        try:
+            total, remaining = self.inventory_service.checkout(self.scan_cart)
+        except ValidationError as e:
+            self.root.bell()
+            self.show_scan_cart(str(e).replace('\n', ' '), error=True)
+            return
+        except Exception as e:
+            logging.error(f"Σφάλμα κατά την ενημέρωση της αποθήκης: {str(e)}")
+            messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την ενημέρωση της αποθήκης: {str(e)}")
+            return
+        self.scan_cart = []
+        message = f"Η πώληση ολοκληρώθηκε: {total:.2f}€"
+        finished = [name for name, quantity in remaining if quantity == 0]
+        if finished:
+            message += " | Τελείωσαν: " + ", ".join(finished)
+        self.show_scan_cart(message, error=bool(finished))
+        self.scan_entry.focus_set()
+
+    def scan_undo(self):
+        if self.scan_cart:
+            name, _ = self.scan_cart.pop()
+            self.show_scan_cart(f"Αφαιρέθηκε: {name}")
+        self.scan_entry.focus_set()
+        return 'break'
+
+    def scan_drop_invalid(self):
+        # Κρατά τις σαρώσεις που χωρούν ακόμα στο απόθεμα, με τη σειρά τους
+        kept = []
+        for line in self.scan_cart:
+            try:
+                self.inventory_service.validate_cart(kept + [line])
+            except ValidationError:
+                continue
+            kept.append(line)
+        dropped = len(self.scan_cart) - len(kept)
+        self.scan_cart = kept
+        self.show_scan_cart(f"Αφαιρέθηκαν {dropped} σαρώσεις")
+        self.scan_entry.focus_set()
+
+    def scan_cancel(self):
+        self.scan_cart = []
+        self.show_scan_cart("Η πώληση ακυρώθηκε")
+        self.scan_entry.focus_set()
+
+    def kwdikos_proiontos(self):
+        selected = self.tree_apothiki.selection()
+        if not selected:
+            messagebox.showwarning("Προειδοποίηση", "Παρακαλώ επιλέξτε ένα προϊόν")
+            return
+        row = self.inventory.rows.get(int(selected[0]))
+        if row is None:
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Κωδικός Προϊόντος")
+        dialog.geometry("400x180")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        dialog.focus_set()
+        center_window(dialog)
+
+        tk.Label(dialog, text=row[0], font=("Arial", 12, "bold")).pack(pady=5)
+        tk.Label(dialog, text="Κωδικός / Barcode (σάρωση ή πληκτρολόγηση):").pack(pady=5)
+        kwdikos = tk.Entry(dialog, width=40)
+        kwdikos.insert(0, product_sku(row))
+        kwdikos.pack()
+        kwdikos.select_range(0, tk.END)
+        kwdikos.focus_set()
+
+        def save(event=None):
+            try:
+                self.inventory_service.assign_sku(row[0], kwdikos.get())
+            except ValidationError as e:
+                messagebox.showerror("Σφάλμα", str(e), parent=dialog)
                 return
-            
-            with open(FILE_NAME, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)
-                for row in reader:
-                    # Get the documents from column 5 (index 5)
-                    documents = row[5] if len(row) > 5 and row[5] else ""
-                    
-                    # Get or create flags from column 6 (index 6)
-                    flags = []
-                    if len(row) > 6 and row[6]:
-                        flags = row[6].split(", ")
-                    else:
-                        # If no flags column, create flags based on available items
-                        if documents:
-                            flags.append("Έγγραφα")
-                    
-                    # Create display row
-                    display_row = [row[0], row[1], row[2], row[3], row[4], ", ".join(flags)]
-                    
-                    # Insert into tree view
-                    self.tree_pelates.insert('', 'end', values=display_row)
-                
+            dialog.destroy()
+
+        kwdikos.bind('<Return>', save)
+        buttons_frame = tk.Frame(dialog)
+        buttons_frame.pack(pady=10)
+        tk.Button(buttons_frame, text="Αποθήκευση", command=save, bg='green', fg='white', width=15).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="Ακύρωση", command=dialog.destroy, bg='red', fg='white', width=15).pack(side=tk.LEFT, padx=5)
+
+    def kalathi_pwlisis(self):
+        # Πώληση πολλών προϊόντων μαζί: οι γραμμές ελέγχονται καθώς προστίθενται
+        # και ξανά όλες μαζί στην ολοκλήρωση, που γράφεται με μία εγγραφή
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Καλάθι Πώλησης")
+        dialog.geometry("700x500")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        dialog.focus_set()
+        center_window(dialog)
+
+        cart = []  # [όνομα προϊόντος, ποσότητα]
+
+        input_frame = tk.Frame(dialog)
+        input_frame.pack(pady=10, padx=10, fill='x')
+        tk.Label(input_frame, text="Προϊόν:").grid(row=0, column=0, padx=5)
+        proion = tk.Entry(input_frame, width=40)
+        proion.grid(row=0, column=1, padx=5)
+        tk.Label(input_frame, text="Ποσότητα:").grid(row=0, column=2, padx=5)
+        posotita = tk.Entry(input_frame, width=8)
+        posotita.insert(0, "1")
+        posotita.grid(row=0, column=3, padx=5)
+
+        columns = ("Προϊόν", "Ποσότητα", "Τιμή Μονάδας", "Σύνολο")
+        tree = ttk.Treeview(dialog, columns=columns, show='headings', height=12)
+        for column in columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=300 if column == "Προϊόν" else 110, anchor='w' if column == "Προϊόν" else 'e')
+        tree.pack(expand=True, fill='both', padx=10)
+        total_label = tk.Label(dialog, text="Σύνολο: 0.00€", font=("Arial", 12, "bold"))
+        total_label.pack(pady=5)
+
+        def show_cart():
+            tree.delete(*tree.get_children())
+            total = 0
+            if cart:
+                for row, quantity, price, _ in self.inventory_service.validate_cart(cart):
+                    tree.insert('', 'end', values=(row[0], quantity, f"{price:.2f}", f"{quantity * price:.2f}"))
+                    total += quantity * price
+            total_label.config(text=f"Σύνολο: {total:.2f}€")
+
+        def add_line(event=None):
+            line = [proion.get().strip(), posotita.get().strip()]
+            try:
+                self.inventory_service.validate_cart(cart + [line])
+            except ValidationError as e:
+                messagebox.showerror("Σφάλμα", str(e), parent=dialog)
+                return
+            cart.append(line)
+            show_cart()
+            proion.delete(0, tk.END)
+            posotita.delete(0, tk.END)
+            posotita.insert(0, "1")
+            proion.focus_set()
+
+        def remove_line():
+            selected = tree.selection()
+            if not selected:
+                return
+            name = normalize_text(tree.item(selected[0])['values'][0])
+            cart[:] = [line for line in cart if normalize_text(line[0]) != name]
+            show_cart()
+
+        def checkout():
+            if not cart:
+                messagebox.showwarning("Προειδοποίηση", "Το καλάθι είναι άδειο!", parent=dialog)
+                return
+            try:
+                total, remaining = self.inventory_service.checkout(cart)
+            except ValidationError as e:
+                messagebox.showerror("Σφάλμα", str(e), parent=dialog)
+                return
+            except Exception as e:
+                logging.error(f"Σφάλμα κατά την ενημέρωση της αποθήκης: {str(e)}")
+                messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την ενημέρωση της αποθήκης: {str(e)}", parent=dialog)
+                return
+            finished = [name for name, quantity in remaining if quantity == 0]
+            if finished:
+                messagebox.showwarning("Προειδοποίηση",
+                    "Τελείωσαν τα προϊόντα:\n" + "\n".join(finished) + "\nΠαρακαλώ κάντε παραγγελία.", parent=dialog)
+            messagebox.showinfo("Επιτυχία", f"Η πώληση ολοκληρώθηκε επιτυχώς!\nΣυνολικό ποσό: {total:.2f}€")
+            dialog.destroy()
+
+        tk.Button(input_frame, text="Προσθήκη", command=add_line, bg='#ff9800', fg='black', width=12).grid(row=0, column=4, padx=5)
+        proion.bind('<Return>', add_line)
+        posotita.bind('<Return>', add_line)
+
+        # Το επιλεγμένο προϊόν της αποθήκης μπαίνει ως πρώτη πρόταση
+        selected = self.tree_apothiki.selection()
+        if selected:
+            proion.insert(0, str(self.tree_apothiki.item(selected[0])['values'][0]))
+        proion.focus_set()
+
+        buttons_frame = tk.Frame(dialog)
+        buttons_frame.pack(pady=10)
+        tk.Button(buttons_frame, text="Αφαίρεση Γραμμής", command=remove_line, width=18).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="Ολοκλήρωση Πώλησης", command=checkout, bg='green', fg='white', width=20).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="Ακύρωση", command=dialog.destroy, bg='red', fg='white', width=15).pack(side=tk.LEFT, padx=5)
+
+    def anafores_pwliseon(self):
+        # Οι αναφορές διαβάζονται από τα έτοιμα σύνολα του βιβλίου πωλήσεων
+        try:
+            self.sales.refresh()
+        except Exception as e:
+            logging.error(f"Σφάλμα κατά την ανάγνωση των πωλήσεων: {str(e)}")
+            messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την ανάγνωση των πωλήσεων: {str(e)}")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Αναφορές Πωλήσεων")
+        window.geometry("800x550")
+        window.transient(self.root)
+
+        now = datetime.now()
+        today, month, year = now.strftime("%Y-%m-%d"), now.strftime("%Y-%m"), now.strftime("%Y")
+        summary = tk.Frame(window)
+        summary.pack(fill='x', padx=10, pady=10)
+        for column, (title, period) in enumerate((("Σήμερα", today), ("Αυτόν τον μήνα", month),
+                                                  ("Φέτος", year), ("Σύνολο", None))):
+            totals = self.sales.totals(period)
+            tk.Label(summary, text=title, font=("Arial", 10, "bold")).grid(row=0, column=column, padx=20)
+            tk.Label(summary, text=f"{totals['revenue']:.2f}€", font=("Arial", 14)).grid(row=1, column=column, padx=20)
+            tk.Label(summary, text=f"{totals['receipts']} πωλήσεις, {totals['quantity']} τεμάχια",
+                     font=("Arial", 9)).grid(row=2, column=column, padx=20)
+
+        notebook = ttk.Notebook(window)
+        notebook.pack(expand=True, fill='both', padx=10)
+
+        def table(title, columns, rows):
+            frame = tk.Frame(notebook)
+            notebook.add(frame, text=title)
+            tree = ttk.Treeview(frame, columns=[name for name, _ in columns], show='headings')
+            for name, width in columns:
+                tree.heading(name, text=name)
+                tree.column(name, width=width, anchor='w' if width > 150 else 'e')
+            scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            tree.pack(side='left', expand=True, fill='both')
+            scrollbar.pack(side='right', fill='y')
+            for values in rows:
+                tree.insert('', 'end', values=values)
+
+        table("Ημέρες", [("Ημέρα", 120), ("Πωλήσεις", 100), ("Τεμάχια", 100), ("Έσοδα (€)", 120)],
+              [(item['day'], item['receipts'], item['quantity'], f"{item['revenue']:.2f}")
+               for item in reversed(self.sales.daily(start=f"{year}-01-01"))])
+        table("Μήνες", [("Μήνας", 120), ("Πωλήσεις", 100), ("Τεμάχια", 100), ("Έσοδα (€)", 120)],
+              [(item['month'], item['receipts'], item['quantity'], f"{item['revenue']:.2f}")
+               for item in reversed(self.sales.monthly())])
+        for title, period in (("Δημοφιλή του μήνα", month), ("Δημοφιλή", None)):
+            table(title, [("Προϊόν", 260), ("Κατηγορία", 160), ("Τεμάχια", 100), ("Έσοδα (€)", 120)],
+                  [(item['product'], item['category'], item['quantity'], f"{item['revenue']:.2f}")
+                   for item in self.sales.best_sellers(limit=20, month=period)])
+        table("Κατηγορίες", [("Κατηγορία", 260), ("Τεμάχια", 100), ("Έσοδα (€)", 120)],
+              [(item['category'], item['quantity'], f"{item['revenue']:.2f}") for item in self.sales.by_category()])
+
+        tk.Button(window, text="Κλείσιμο", command=window.destroy, bg='red', fg='white', width=15).pack(pady=10)
+
+    def fortose_kai_emfanise(self):
+        try:
+            self.tree_pelates.set_rows(
+                (row_id, customer_display_row(row)) for row_id, row in self.customers.items())
         except Exception as e:
             logging.error(f"Σφάλμα κατά τη φόρτωση των πελατών: {str(e)}")
             messagebox.showerror("Σφάλμα", f"Σφάλμα κατά τη φόρτωση των πελατών: {str(e)}")
 
     def fortose_apothiki(self):
-        for item in self.tree_apothiki.get_children():
-            self.tree_apothiki.delete(item)
-        
         try:
-            if not os.path.exists(INVENTORY_FILE):
-                with open(INVENTORY_FILE, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(INVENTORY_HEADERS)
-                logging.info(f"Δημιουργήθηκε νέο αρχείο {INVENTORY_FILE}")
-                return
-            
-            with open(INVENTORY_FILE, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)
-                for row in reader:
-                    self.tree_apothiki.insert('', 'end', values=row)
-                
+            self.tree_apothiki.set_rows(self.inventory.items())
         except Exception as e:
             logging.error(f"Σφάλμα κατά τη φόρτωση της αποθήκης: {str(e)}")
             messagebox.showerror("Σφάλμα", f"Σφάλμα κατά τη φόρτωση της αποθήκης: {str(e)}")
 
+    def on_customers_changed(self, action, row_id, row):
+        if action == 'reload':
+            self.tree_pelates.set_rows(
+                (key, customer_display_row(values)) for key, values in self.customers.rows.items())
+        elif action == 'insert_many':
+            self.tree_pelates.append_rows((key, customer_display_row(values)) for key, values in row.items())
+        else:
+            self.tree_pelates.apply_change(action, row_id, customer_display_row(row) if row else None)
+
+    def on_inventory_changed(self, action, row_id, row):
+        if action == 'reload':
+            self.tree_apothiki.set_rows(self.inventory.rows.items())
+        elif action == 'update_many':
+            self.tree_apothiki.update_rows(row.items())
+        elif action == 'insert_many':
+            self.tree_apothiki.append_rows(row.items())
+        else:
+            self.tree_apothiki.apply_change(action, row_id, row)
+
     def on_select_customer(self, event):
         selected = self.tree_pelates.selection()
         if selected:
@@ -1194,6 +4961,110 @@ class OpticalSystem:
             self.btn_view_prescriptions.config(state='disabled')
             self.btn_view_notes.config(state='disabled')
 
+    def eisagogi_csv(self, title, repository, service):
+        # Μαζική εισαγωγή από εξωτερικό CSV (π.χ. από άλλο κατάστημα)
+        path = filedialog.askopenfilename(
+            parent=self.root,
+            title=title,
+            filetypes=[("CSV files", "*.csv *.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return None
+        # Ο έλεγχος διπλοεγγραφών στο νήμα εργασίας διαβάζει τα ευρετήρια χωρίς refresh()
+        repository.refresh()
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title)
+        dialog.geometry("500x150")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        center_window(dialog)
+
+        progress_label = tk.Label(dialog, text=f"Ανάγνωση του {os.path.basename(path)}...", anchor='w')
+        progress_label.pack(fill='x', padx=10, pady=10)
+        progress_bar = ttk.Progressbar(dialog, mode='determinate')
+        progress_bar.pack(fill='x', padx=10)
+
+        def on_progress(done, total, rows):
+            if dialog.winfo_exists():
+                progress_bar.config(maximum=max(total, 1), value=done)
+                progress_label.config(text=f"Ανάγνωση του {os.path.basename(path)}... "
+                                           f"{rows} γραμμές, {done * 100 // max(total, 1)}%")
+
+        def on_read(result):
+            # Η καταχώρηση γίνεται στο νήμα του Tk, οπότε το μήνυμα εμφανίζεται πριν ξεκινήσει
+            if dialog.winfo_exists():
+                progress_label.config(text=f"Καταχώρηση {len(result['rows'])} εγγραφών...")
+                dialog.update_idletasks()
+
+        def on_done(kind, payload):
+            if dialog.winfo_exists():
+                dialog.destroy()
+            if kind == 'error':
+                messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την εισαγωγή: {str(payload)}")
+            elif kind == 'cancelled':
+                messagebox.showinfo("Πληροφορία", "Η εισαγωγή ακυρώθηκε. Δεν καταχωρήθηκε τίποτα.")
+            else:
+                message = f"Καταχωρήθηκαν {payload['imported']} εγγραφές."
+                if payload['rejected']:
+                    message += f"\nΑπορρίφθηκαν {payload['rejected']} γραμμές."
+                    if payload['report']:
+                        message += f"\nΑναφορά απορρίψεων: {payload['report']}"
+                messagebox.showinfo("Εισαγωγή", message)
+
+        importer = CsvImporter(self.root, service, path, on_progress=on_progress, on_read=on_read, on_done=on_done)
+        tk.Button(dialog, text="Ακύρωση", command=importer.cancel, width=10).pack(pady=10)
+        dialog.protocol("WM_DELETE_WINDOW", importer.cancel)
+        importer.start()
+        return importer
+
+    def import_documents(self, dialog, parent, on_file):
+        # Επιλογή πολλών αρχείων και εισαγωγή τους στο παρασκήνιο με μπάρα προόδου
+        paths = filedialog.askopenfilenames(
+            parent=dialog,
+            title="Επιλέξτε έγγραφα",
+            filetypes=[("PDF files", "*.pdf"), ("Image files", "*.png *.jpg *.jpeg"), ("All files", "*.*")]
+        )
+        if not paths:
+            return None
+
+        progress_frame = tk.Frame(parent, bg='#f0f0f0')
+        progress_frame.pack(fill='x', padx=5, pady=5)
+        progress_label = tk.Label(progress_frame, text="Εισαγωγή εγγράφων...", bg='#f0f0f0', anchor='w')
+        progress_label.pack(fill='x')
+        progress_bar = ttk.Progressbar(progress_frame, mode='determinate')
+        progress_bar.pack(side=tk.LEFT, fill='x', expand=True)
+
+        def on_progress(done, total):
+            if progress_frame.winfo_exists():
+                progress_bar.config(maximum=max(total, 1), value=done)
+                progress_label.config(text=f"Εισαγωγή {len(paths)} εγγράφων... {done * 100 // max(total, 1)}%")
+
+        def on_imported(path, ref):
+            if progress_frame.winfo_exists():
+                on_file(path, ref)
+
+        def on_done(errors, cancelled):
+            if not progress_frame.winfo_exists():
+                return
+            progress_frame.destroy()
+            if errors:
+                messagebox.showerror("Σφάλμα", "Σφάλμα κατά την προσθήκη των εγγράφων:\n" +
+                                     "\n".join(f"{os.path.basename(path)}: {str(e)}" for path, e in errors),
+                                     parent=dialog)
+            elif cancelled:
+                messagebox.showinfo("Πληροφορία", "Η εισαγωγή των εγγράφων ακυρώθηκε.", parent=dialog)
+            else:
+                messagebox.showinfo("Επιτυχία", f"Προστέθηκαν {len(paths)} έγγραφα επιτυχώς!", parent=dialog)
+
+        importer = DocumentImporter(self.root, self.documents, paths, on_progress=on_progress,
+                                    on_file=on_imported, on_done=on_done)
+        tk.Button(progress_frame, text="Ακύρωση", command=importer.cancel, width=10).pack(side=tk.LEFT, padx=5)
+        # Αν κλείσει το παράθυρο, η αντιγραφή σταματά
+        progress_frame.bind('<Destroy>', lambda e: importer.cancel())
+        importer.start()
+        return importer
+
     def anigma_egrafou(self):
         selected = self.tree_pelates.selection()
         if not selected:
@@ -1204,24 +5075,17 @@ class OpticalSystem:
         values = item['values']
         customer_name = f"{values[0]} {values[1]}".strip()
         
-        # Read the original file to get the documents
+        # Get the documents from the repository
         documents = []
         try:
-            with open(FILE_NAME, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                for row in reader:
-                    if row[0].strip() == values[0].strip() and row[1].strip() == values[1].strip():
-                        if len(row) > 5 and row[5]:  # Check if documents exist
-                            documents = [doc.strip() for doc in row[5].split(",") if doc.strip()]
-                        break
+            documents = self.customer_service.documents_for(self.selected_customer())
 
             if not documents:
                 messagebox.showinfo("Πληροφορίες", "Ο πελάτης δεν έχει έγγραφα.")
                 return
 
             if len(documents) == 1:
-                doc_path = os.path.join(DOCUMENTS_DIR, documents[0])
+                doc_path = self.documents.path(documents[0])
                 if not os.path.exists(doc_path):
                     messagebox.showerror("Σφάλμα", "Το αρχείο δεν βρέθηκε!")
                     return
@@ -1232,7 +5096,7 @@ class OpticalSystem:
             else:
                 dialog = tk.Toplevel(self.root)
                 dialog.title("Επιλογή Εγγράφου")
-                dialog.geometry("500x400")
+                dialog.geometry("900x500")
                 dialog.transient(self.root)
                 dialog.grab_set()
                 dialog.focus_set()
@@ -1240,15 +5104,25 @@ class OpticalSystem:
 
                 tk.Label(dialog, text="Επιλέξτε έγγραφο για προβολή:", font=("Arial", 10, "bold")).pack(pady=10)
 
-                docs_listbox = tk.Listbox(dialog, height=15, width=60)
-                docs_listbox.pack(padx=10, pady=5)
+                content_frame = tk.Frame(dialog)
+                content_frame.pack(fill='both', expand=True, padx=10, pady=5)
+
+                docs_listbox = tk.Listbox(content_frame, height=15, width=50, exportselection=False)
+                docs_listbox.pack(side=tk.LEFT, fill='y')
+
+                # Προεπισκόπηση του επιλεγμένου εγγράφου
+                preview_frame = tk.Frame(content_frame, bg='white', width=THUMBNAIL_SIZE[0] + 20,
+                                         height=THUMBNAIL_SIZE[1] + 20, relief='sunken', bd=1)
+                preview_frame.pack(side=tk.LEFT, fill='both', expand=True, padx=(10, 0))
+                preview_frame.pack_propagate(False)
+                preview_label = tk.Label(preview_frame, bg='white', text="Επιλέξτε έγγραφο", compound='top')
+                preview_label.pack(expand=True)
                 
                 existing_docs = []
                 for doc in documents:
-                    doc_path = os.path.join(DOCUMENTS_DIR, doc.strip())
-                    if os.path.exists(doc_path):
-                        docs_listbox.insert(tk.END, doc.strip())
-                        existing_docs.append(doc.strip())
+                    if self.documents.exists(doc):
+                        docs_listbox.insert(tk.END, self.documents.display_name(doc))
+                        existing_docs.append(doc)
                     else:
                         logging.warning(f"Το έγγραφο {doc} δεν βρέθηκε για τον πελάτη {customer_name}")
 
@@ -1257,12 +5131,56 @@ class OpticalSystem:
                     dialog.destroy()
                     return
 
+                thumbnails = {}
+
+                def selected_ref():
+                    selection = docs_listbox.curselection()
+                    return existing_docs[selection[0]] if selection else None
+
+                def show_preview(ref):
+                    name = self.documents.display_name(ref)
+                    path = thumbnails.get(ref)
+                    if path is None:
+                        preview_label.config(image='', text=f"{name}\n\n(Δεν υπάρχει προεπισκόπηση)")
+                        preview_label.image = None
+                        return
+                    try:
+                        from PIL import Image, ImageTk
+                        with Image.open(path) as image:
+                            photo = ImageTk.PhotoImage(image)
+                    except Exception as e:
+                        logging.error(f"Σφάλμα κατά την προβολή της μικρογραφίας {path}: {str(e)}")
+                        preview_label.config(image='', text=name)
+                        return
+                    preview_label.config(image=photo, text=name)
+                    preview_label.image = photo  # κρατάμε reference
+
+                def on_thumbnail(ref, path):
+                    thumbnails[ref] = path
+                    if dialog.winfo_exists() and selected_ref() == ref:
+                        show_preview(ref)
+
+                def on_select(event=None):
+                    ref = selected_ref()
+                    if ref is None:
+                        return
+                    if ref in thumbnails:
+                        show_preview(ref)
+                    else:
+                        preview_label.config(image='', text="Φόρτωση προεπισκόπησης...")
+                        preview_label.image = None
+
+                # Οι μικρογραφίες όλων των εγγράφων ετοιμάζονται στο παρασκήνιο
+                for doc in existing_docs:
+                    self.thumbnails.request(doc, on_thumbnail)
+                docs_listbox.bind('<<ListboxSelect>>', on_select)
+
                 def open_selected():
                     selection = docs_listbox.curselection()
                     if selection:
-                        doc_name = docs_listbox.get(selection[0])
+                        doc_ref = existing_docs[selection[0]]
                         try:
-                            doc_path = os.path.join(DOCUMENTS_DIR, doc_name)
+                            doc_path = self.documents.path(doc_ref)
                             if not os.path.exists(doc_path):
                                 messagebox.showerror("Σφάλμα", "Το αρχείο δεν βρέθηκε!")
                                 return
@@ -1271,8 +5189,14 @@ class OpticalSystem:
                         except Exception as e:
                             messagebox.showerror("Σφάλμα", f"Δεν ήταν δυνατό το άνοιγμα του εγγράφου: {str(e)}")
 
-                tk.Button(dialog, text="Άνοιγμα", command=open_selected, bg='green', fg='white', width=15).pack(pady=10)
-                tk.Button(dialog, text="Ακύρωση", command=dialog.destroy, bg='red', fg='white', width=15).pack(pady=5)
+                docs_listbox.bind('<Double-Button-1>', lambda e: open_selected())
+                docs_listbox.selection_set(0)
+                on_select()
+
+                button_frame = tk.Frame(dialog)
+                button_frame.pack(pady=10)
+                tk.Button(button_frame, text="Άνοιγμα", command=open_selected, bg='green', fg='white', width=15).pack(side=tk.LEFT, padx=5)
+                tk.Button(button_frame, text="Ακύρωση", command=dialog.destroy, bg='red', fg='white', width=15).pack(side=tk.LEFT, padx=5)
 
         except Exception as e:
             logging.error(f"Σφάλμα κατά το άνοιγμα εγγράφων: {str(e)}")
@@ -1290,22 +5214,8 @@ class OpticalSystem:
             values = item['values']
             
             if messagebox.askyesno("Επιβεβαίωση", f"Είστε σίγουροι ότι θέλετε να διαγράψετε το προϊόν {values[0]}?"):
-                rows = []
-                with open(INVENTORY_FILE, mode='r', newline='', encoding='utf-8') as file:
-                    reader = csv.reader(file)
-                    header = next(reader)
-                    for row in reader:
-                        if row[0] != values[0]:
-                            rows.append(row)
-
-                with open(INVENTORY_FILE, mode='w', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(header)
-                    writer.writerows(rows)
-
-                logging.info(f"Διαγράφηκε το προϊόν: {values[0]}")
+                self.inventory_service.delete(values[0])
                 messagebox.showinfo("Επιτυχία", "Το προϊόν διαγράφηκε επιτυχώς!")
-                self.fortose_apothiki()
         except Exception as e:
             logging.error(f"Σφάλμα κατά τη διαγραφή προϊόντος: {str(e)}")
             messagebox.showerror("Σφάλμα", f"Σφάλμα κατά τη διαγραφή: {str(e)}")
@@ -1345,6 +5255,8 @@ class OpticalSystem:
                 self.help_modal.destroy()
                 self.help_modal = None
         self.help_modal.bind('<FocusOut>', close_modal)
+        # Κρυφό παράθυρο διαγνωστικών για την υποστήριξη
+        self.help_modal.bind('<Control-Shift-D>', lambda event: [close_modal(event), self.show_diagnostics()])
 
     def populate_help_drawer(self):
         for widget in self.help_drawer.winfo_children():
@@ -1354,6 +5266,46 @@ class OpticalSystem:
         btn_about = ttk.Button(self.help_drawer, text='Σχετικά με το Πρόγραμμα', command=self.show_about)
         btn_about.pack(side='left', padx=20, pady=10)
 
+    def show_diagnostics(self):
+        window = tk.Toplevel(self.root)
+        window.title('Διαγνωστικά')
+        window.geometry('700x450')
+        window.transient(self.root)
+
+        columns = ('operation', 'count', 'p50', 'p95', 'max', 'mean')
+        titles = ('Λειτουργία', 'Πλήθος', 'p50 (ms)', 'p95 (ms)', 'Μέγιστο (ms)', 'Μέσος (ms)')
+        frame = tk.Frame(window)
+        frame.pack(expand=True, fill='both', padx=10, pady=10)
+        tree = ttk.Treeview(frame, columns=columns, show='headings')
+        for column, title in zip(columns, titles):
+            tree.heading(column, text=title)
+            tree.column(column, width=90, anchor='e')
+        tree.column('operation', width=220, anchor='w')
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='left', expand=True, fill='both')
+        scrollbar.pack(side='right', fill='y')
+        status = tk.Label(window, anchor='w')
+        status.pack(fill='x', padx=10)
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            for name, values in METRICS.summary().items():
+                tree.insert('', 'end', values=(name, values['count'], values['p50_ms'], values['p95_ms'],
+                                               values['max_ms'], values['mean_ms']))
+            status.config(text=f"{platform.node()} - από {METRICS.started:%d/%m/%Y %H:%M}")
+
+        def export():
+            self.export_metrics(reschedule=False)
+            status.config(text=f"Εξήχθη στο {os.path.abspath(METRICS_FILE)}")
+
+        buttons = tk.Frame(window)
+        buttons.pack(pady=10)
+        ttk.Button(buttons, text='Ανανέωση', command=refresh).pack(side='left', padx=5)
+        ttk.Button(buttons, text='Εξαγωγή', command=export).pack(side='left', padx=5)
+        ttk.Button(buttons, text='Κλείσιμο', command=window.destroy).pack(side='left', padx=5)
+        refresh()
+
     def show_about(self):
         about_win = tk.Toplevel(self.root)
         about_win.title('Σχετικά με το Πρόγραμμα')
@@ -1502,18 +5454,7 @@ class OpticalSystem:
         except Exception as e:
             messagebox.showerror('Σφάλμα', f'Σφάλμα κατά την ενημέρωση: {str(e)}')
 
-    def create_prescription_form(self, parent_window, customer_name=''):
-        PRESCRIPTION_CSV = "συνταγολόγια.csv"
-        if not os.path.exists(PRESCRIPTION_CSV):
-            with open(PRESCRIPTION_CSV, mode='w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    "Ημερομηνία", "Ονοματεπώνυμο",
-                    "Μακριά_Sph1", "Μακριά_Cyl1", "Μακριά_Axe1", "Μακριά_Sph2", "Μακριά_Cyl2", "Μακριά_Axe2", "Μακριά_Ecartement",
-                    "Πλησίον_Sph1", "Πλησίον_Cyl1", "Πλησίον_Axe1", "Πλησίον_Sph2", "Πλησίον_Cyl2", "Πλησίον_Axe2", "Πλησίον_Ecartement",
-                    "Δ_Γραμμές", "A_Γραμμές"
-                ])
-
+    def create_prescription_form(self, parent_window, customer_name='', customer_id=None):
         prescription_window = tk.Toplevel(parent_window)
         prescription_window.title("Συνταγή")
         prescription_window.geometry("1400x800")
@@ -1524,49 +5465,13 @@ class OpticalSystem:
         canvas = tk.Canvas(prescription_window, width=1100, height=350, bg='white')
         canvas.pack(padx=10, pady=10)
 
-        if self.prescription_logo:
-            canvas.create_image(50, 30, image=self.prescription_logo, anchor='nw')
-
-        canvas.create_text(300, 50, text="Ονοματεπώνυμο:", anchor='w', font=('Arial', 12))
-        canvas.create_line(420, 55, 1000, 55, dash=(4, 2))
-        canvas.create_text(430, 50, text=customer_name, anchor='w', font=('Arial', 12))
+        PrescriptionRenderer.draw_template(canvas, customer_name, self.prescription_logo)
 
-        def draw_protractor(cx, cy, letter):
-            radius = 120
-            canvas.create_arc(cx-radius, cy-radius, cx+radius, cy+radius, start=0, extent=180, style='arc', width=2)
-            canvas.create_line(cx-radius, cy, cx+radius, cy, width=2)
-            for angle in range(0, 181):
-                rad = math.radians(angle)
-                arc_x = cx + radius * math.cos(rad)
-                arc_y = cy - radius * math.sin(rad)
-                dx = math.cos(rad)
-                dy = -math.sin(rad)
-                if angle % 10 == 0:
-                    line_len = 25
-                else:
-                    line_len = 12
-                x1 = arc_x
-                y1 = arc_y
-                x2 = arc_x + line_len * dx
-                y2 = arc_y + line_len * dy
-                canvas.create_line(x1, y1, x2, y2, width=2 if angle % 10 == 0 else 1)
-                if angle % 10 == 0:
-                    label_dist = 40
-                    label_x = cx + (radius + label_dist) * math.cos(rad)
-                    label_y = cy - (radius + label_dist) * math.sin(rad)
-                    canvas.create_text(label_x, label_y, text=str(angle), font=('Arial', 9))
-            canvas.create_text(cx, cy+30, text=letter, font=('Arial', 32, 'bold'))
-
-        draw_protractor(350, 260, "Δ")
-        draw_protractor(800, 260, "A")
-
-        # Drawing functionality
-        drawing = {'active': False, 'x': None, 'y': None, 'lines_D': [], 'lines_A': [], 'current': None}
+        # Drawing functionality: κάθε πινελιά είναι μία γραμμή του canvas που
+        # μεγαλώνει με canvas.coords, αντί για ένα αντικείμενο ανά κίνηση
+        drawing = {'active': False, 'item': None, 'points': None, 'lines_D': [], 'lines_A': [], 'current': None}
 
         def start_draw(event):
-            drawing['active'] = True
-            drawing['x'] = event.x
-            drawing['y'] = event.y
             # Determine which protractor
             if abs(event.x - 350) < 130:
                 drawing['current'] = 'D'
@@ -1574,20 +5479,35 @@ class OpticalSystem:
                 drawing['current'] = 'A'
             else:
                 drawing['current'] = None
+            drawing['active'] = drawing['current'] is not None
+            if drawing['active']:
+                drawing['points'] = [(event.x, event.y)]
+                drawing['item'] = canvas.create_line(event.x, event.y, event.x, event.y,
+                                                     fill='red', width=2, tags='stroke')
 
         def draw(event):
-            if drawing['active'] and drawing['current']:
-                canvas.create_line(drawing['x'], drawing['y'], event.x, event.y, fill='red', width=2)
-                if drawing['current'] == 'D':
-                    drawing['lines_D'].append((drawing['x'], drawing['y'], event.x, event.y))
-                elif drawing['current'] == 'A':
-                    drawing['lines_A'].append((drawing['x'], drawing['y'], event.x, event.y))
-                drawing['x'] = event.x
-                drawing['y'] = event.y
+            if drawing['active']:
+                last_x, last_y = drawing['points'][-1]
+                # Τα σημεία που απέχουν λιγότερο από DRAWING_MIN_STEP αγνοούνται
+                if abs(event.x - last_x) < DRAWING_MIN_STEP and abs(event.y - last_y) < DRAWING_MIN_STEP:
+                    return
+                drawing['points'].append((event.x, event.y))
+                canvas.coords(drawing['item'], *[value for point in drawing['points'] for value in point])
 
         def stop_draw(event):
+            if drawing['active']:
+                points = drawing['points']
+                if (event.x, event.y) != points[-1]:
+                    points.append((event.x, event.y))
+                    canvas.coords(drawing['item'], *[value for point in points for value in point])
+                if len(points) < 2:
+                    canvas.delete(drawing['item'])
+                else:
+                    drawing['lines_' + drawing['current']].append(points)
             drawing['active'] = False
             drawing['current'] = None
+            drawing['item'] = None
+            drawing['points'] = None
 
         canvas.bind('<Button-1>', start_draw)
         canvas.bind('<B1-Motion>', draw)
@@ -1622,34 +5542,17 @@ class OpticalSystem:
             entries.append(row_entries)
 
         def clear_drawing():
-            canvas.delete('all')
-            if self.prescription_logo:
-                canvas.create_image(50, 30, image=self.prescription_logo, anchor='nw')
-            canvas.create_text(300, 50, text="Ονοματεπώνυμο:", anchor='w', font=('Arial', 12))
-            canvas.create_line(420, 55, 1000, 55, dash=(4, 2))
-            canvas.create_text(430, 50, text=customer_name, anchor='w', font=('Arial', 12))
-            draw_protractor(350, 260, "Δ")
-            draw_protractor(800, 260, "A")
+            # Σβήνονται μόνο οι πινελιές, το φόντο της συνταγής μένει ως έχει
+            canvas.delete('stroke')
             drawing['lines_D'].clear()
             drawing['lines_A'].clear()
 
         def save_csv():
             try:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                row = [timestamp, customer_name]
-                
                 # Get values from entries in the correct order (Μακριά first, then Πλησίον)
-                for row_entries in entries:
-                    for entry in row_entries:
-                        row.append(entry.get("1.0", "end-1c"))
-                
-                # Add the drawing lines
-                row.append(str(drawing['lines_D']))
-                row.append(str(drawing['lines_A']))
-
-                with open(PRESCRIPTION_CSV, mode='a', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(row)
+                values = [entry.get("1.0", "end-1c") for row_entries in entries for entry in row_entries]
+                self.prescription_service.add(customer_id, customer_name, values,
+                                              drawing['lines_D'], drawing['lines_A'])
 
                 messagebox.showinfo("Επιτυχία", "Η συνταγή αποθηκεύτηκε επιτυχώς!")
                 prescription_window.destroy()
@@ -1676,18 +5579,7 @@ class OpticalSystem:
             customer_name = f"{str(values[0])} {str(values[1])}"
         customer_name = customer_name.strip()
         
-        prescription_rows = []
-        PRESCRIPTION_CSV = "συνταγολόγια.csv"
-        if not os.path.exists(PRESCRIPTION_CSV):
-            messagebox.showinfo("Πληροφορία", "Δεν υπάρχουν αποθηκευμένες συνταγές για αυτόν τον πελάτη.")
-            return
-        with open(PRESCRIPTION_CSV, mode='r', newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            headers = next(reader)
-            for row in reader:
-                # Normalize both names by removing extra spaces and converting to lowercase
-                if len(row) > 1 and row[1].strip().replace('  ', ' ').lower() == customer_name.strip().replace('  ', ' ').lower():
-                    prescription_rows.append(row)
+        prescription_rows = self.prescription_service.for_customer(self.selected_customer())
         if not prescription_rows:
             messagebox.showinfo("Πληροφορία", "Δεν βρέθηκαν συνταγές για τον πελάτη.")
             return
@@ -1700,48 +5592,10 @@ class OpticalSystem:
             center_window(win)
             canvas = tk.Canvas(win, width=1100, height=350, bg='white')
             canvas.pack(padx=10, pady=10)
-            if self.prescription_logo:
-                canvas.create_image(50, 30, image=self.prescription_logo, anchor='nw')
-            canvas.create_text(300, 50, text="Ονοματεπώνυμο:", anchor='w', font=('Arial', 12))
-            canvas.create_line(420, 55, 1000, 55, dash=(4, 2))
-            canvas.create_text(430, 50, text=customer_name, anchor='w', font=('Arial', 12))
-            def draw_protractor(cx, cy, letter):
-                radius = 120
-                canvas.create_arc(cx-radius, cy-radius, cx+radius, cy+radius, start=0, extent=180, style='arc', width=2)
-                canvas.create_line(cx-radius, cy, cx+radius, cy, width=2)
-                for angle in range(0, 181):
-                    rad = math.radians(angle)
-                    arc_x = cx + radius * math.cos(rad)
-                    arc_y = cy - radius * math.sin(rad)
-                    dx = math.cos(rad)
-                    dy = -math.sin(rad)
-                    if angle % 10 == 0:
-                        line_len = 25
-                    else:
-                        line_len = 12
-                    x1 = arc_x
-                    y1 = arc_y
-                    x2 = arc_x + line_len * dx
-                    y2 = arc_y + line_len * dy
-                    canvas.create_line(x1, y1, x2, y2, width=2 if angle % 10 == 0 else 1)
-                    if angle % 10 == 0:
-                        label_dist = 40
-                        label_x = cx + (radius + label_dist) * math.cos(rad)
-                        label_y = cy - (radius + label_dist) * math.sin(rad)
-                        canvas.create_text(label_x, label_y, text=str(angle), font=('Arial', 9))
-                canvas.create_text(cx, cy+30, text=letter, font=('Arial', 32, 'bold'))
-            draw_protractor(350, 260, "Δ")
-            draw_protractor(800, 260, "A")
+            PrescriptionRenderer.draw_template(canvas, customer_name, self.prescription_logo)
             # --- Εμφάνιση αποθηκευμένων γραμμών ---
-            try:
-                lines_D = eval(row[-2]) if len(row) > 16 else []
-                lines_A = eval(row[-1]) if len(row) > 17 else []
-                for l in lines_D:
-                    canvas.create_line(*l, fill='red', width=2)
-                for l in lines_A:
-                    canvas.create_line(*l, fill='red', width=2)
-            except Exception:
-                pass
+            lines_D, lines_A = PrescriptionService.drawings(row)
+            PrescriptionRenderer.draw_strokes(canvas, lines_D + lines_A)
             table_frame = tk.Frame(win)
             table_frame.pack(pady=10)
             headers_table = ["", "Sph.", "Cyl.", "Axe", "Sph.", "Cyl.", "Axe", "Ecartement Pupillaire"]
@@ -1788,7 +5642,7 @@ class OpticalSystem:
             ttk.Button(sel_win, text="Προβολή", command=open_selected).pack(pady=10)
             ttk.Button(sel_win, text="Κλείσιμο", command=sel_win.destroy).pack(pady=5)
 
-    def create_notes_form(self, parent_window, customer_name=''):
+    def create_notes_form(self, parent_window, customer_name='', customer_id=None):
         notes_window = tk.Toplevel(parent_window)
         notes_window.title("Σημειώσεις")
         notes_window.geometry("800x600")
@@ -1805,19 +5659,12 @@ class OpticalSystem:
 
         def save_notes():
             try:
-                notes_content = text_area.get("1.0", tk.END).strip()
-                if not notes_content:
-                    messagebox.showwarning("Προειδοποίηση", "Οι σημειώσεις είναι κενές!")
-                    return
-
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                with open(NOTES_CSV, mode='a', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow([timestamp, customer_name, notes_content])
+                self.notes_service.add(customer_id, customer_name, text_area.get("1.0", tk.END))
 
                 messagebox.showinfo("Επιτυχία", "Οι σημειώσεις αποθηκεύτηκαν επιτυχώς!")
                 notes_window.destroy()
+            except ValidationError as e:
+                messagebox.showwarning("Προειδοποίηση", str(e))
             except Exception as e:
                 messagebox.showerror("Σφάλμα", f"Σφάλμα κατά την αποθήκευση: {str(e)}")
 
@@ -1834,17 +5681,7 @@ class OpticalSystem:
         values = item['values']
         customer_name = f"{values[0]} {values[1]}".strip()
 
-        if not os.path.exists(NOTES_CSV):
-            messagebox.showinfo("Πληροφορία", "Δεν υπάρχουν αποθηκευμένες σημειώσεις.")
-            return
-
-        notes = []
-        with open(NOTES_CSV, mode='r', newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            next(reader)  # Skip header
-            for row in reader:
-                if row[1].strip().lower() == customer_name.lower():
-                    notes.append(row)
+        notes = self.notes_service.for_customer(self.selected_customer())
 
         if not notes:
             messagebox.showinfo("Πληροφορία", "Δεν υπάρχουν σημειώσεις για αυτόν τον πελάτη.")
@@ -1897,19 +5734,81 @@ class OpticalSystem:
         tk.Button(dialog, text="Κλείσιμο", command=dialog.destroy, bg='red', fg='white', width=15).pack(pady=10)
 
     def run(self):
-        self.root.mainloop()
-
-def check_duplicate_customer(name, surname, phone, email_val):
-    with open(FILE_NAME, mode='r', newline='', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        next(reader)
-        for row in reader:
-            if (row[0].lower() == name.lower() and row[1].lower() == surname.lower()) or \
-               (phone and row[2] == phone) or \
-               (email_val and row[3] and row[3].lower() == email_val.lower()):
-                return True
-    return False
+        try:
+            self.root.mainloop()
+        finally:
+            self.sales.close()
+            self.storage.close()
+            self.export_metrics(reschedule=False)
+            if os.path.isdir(BACKUP_DIR):
+                try:
+                    BackupStore().prune_if_due()
+                except Exception as e:
+                    logging.error(f"Σφάλμα κατά τον καθαρισμό αντιγράφων: {str(e)}")
+
+def run_command(args):
+    # Εργασίες συντήρησης από τη γραμμή εντολών, χωρίς γραφικό περιβάλλον
+    if args[0] == '--migrate-sqlite':
+        counts = migrate_csv_to_sqlite(args[1] if len(args) > 1 else STORAGE_DB)
+        print(f"Η μεταφορά ολοκληρώθηκε: {counts}")
+    elif args[0] == '--export-csv':
+        if not os.path.exists(STORAGE_DB):
+            print(f"Δεν βρέθηκε η βάση {STORAGE_DB}")
+            return 1
+        storage = SqliteStorage(STORAGE_DB)
+        try:
+            storage.export_csv(args[1] if len(args) > 1 else '.')
+        finally:
+            storage.close()
+        print("Η εξαγωγή ολοκληρώθηκε.")
+    elif args[0] == '--backup':
+        store = BackupStore()
+        name = store.snapshot("Χειροκίνητο αντίγραφο")
+        store.prune()
+        print(f"Δημιουργήθηκε το αντίγραφο {name}")
+    elif args[0] == '--list-backups':
+        store = BackupStore()
+        for name in store.snapshots():
+            manifest = store.manifest(name)
+            print(f"{name}  {manifest['created']}  {manifest.get('reason', '')}")
+    elif args[0] == '--restore':
+        # Επαναφορά στο τελευταίο αντίγραφο μέχρι την ώρα που δίνεται (ΕΕΕΕ-ΜΜ-ΗΗ ΩΩ:ΛΛ)
+        store = BackupStore()
+        when = datetime.strptime(' '.join(args[1:]), "%Y-%m-%d %H:%M") if len(args) > 1 else None
+        name = store.find(when)
+        if name is None:
+            print("Δεν βρέθηκε αντίγραφο ασφαλείας για αυτή τη χρονική στιγμή")
+            return 1
+        store.snapshot("Πριν από επαναφορά")
+        store.restore(name)
+        print(f"Έγινε επαναφορά από το αντίγραφο {name}")
+    elif args[0] == '--verify-backups':
+        problems = BackupStore().verify()
+        for problem in problems:
+            print(problem)
+        print("Τα αντίγραφα ασφαλείας είναι ακέραια." if not problems else f"Βρέθηκαν {len(problems)} προβλήματα.")
+        return 1 if problems else 0
+    elif args[0] == '--migrate-documents':
+        storage = open_storage()
+        try:
+            moved = DocumentStore().migrate(CustomerRepository(storage))
+        finally:
+            storage.close()
+        print(f"Μεταφέρθηκαν {moved} έγγραφα στην αποθήκη εγγράφων.")
+    elif args[0] == '--migrate-drawings':
+        storage = open_storage()
+        try:
+            changed = storage.migrate_drawings()
+        finally:
+            storage.close()
+        print(f"Μετατράπηκαν {changed} σχέδια συνταγών.")
+    else:
+        print(f"Άγνωστη εντολή: {args[0]}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_command(sys.argv[1:]))
     app = OpticalSystem()
     app.run()
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Το optic δημιουργεί αρχεία στον τρέχοντα φάκελο ήδη κατά το import, οπότε
+# εισάγεται μία φορά μέσα σε προσωρινό φάκελο, όπως και στο benchmark
+_IMPORT_DIR = tempfile.TemporaryDirectory(prefix='optic-tests-')
+_previous_dir = os.getcwd()
+os.chdir(_IMPORT_DIR.name)
+sys.path.insert(0, REPO_DIR)
+try:
+    import optic  # noqa: F401
+finally:
+    os.chdir(_previous_dir)
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # Κάθε test τρέχει σε δικό του άδειο φάκελο, αφού τα αρχεία δεδομένων
+    # έχουν σταθερά ονόματα στον τρέχοντα φάκελο
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
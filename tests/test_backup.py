@@ -0,0 +1,47 @@
+import os
+import sqlite3
+import unittest
+from unittest import mock
+
+import optic
+
+class BackupStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = optic.BackupStore()
+
+    def write_db(self, rows):
+        connection = sqlite3.connect(optic.STORAGE_DB)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS t (v TEXT)")
+            connection.executemany("INSERT INTO t VALUES (?)", [(row,) for row in rows])
+            connection.commit()
+        finally:
+            connection.close()
+
+    def read_db(self, path):
+        connection = sqlite3.connect(path)
+        try:
+            return [row[0] for row in connection.execute("SELECT v FROM t ORDER BY rowid")]
+        finally:
+            connection.close()
+
+    def test_unchanged_database_is_not_copied(self):
+        self.write_db(['α', 'β'])
+        first = self.store.snapshot()
+        with mock.patch.object(optic.sqlite3, 'connect', side_effect=AssertionError("αντιγραφή")):
+            second = self.store.snapshot()
+        self.assertEqual(self.store.manifest(first)['files'], self.store.manifest(second)['files'])
+        self.write_db(['γ'])
+        third = self.store.snapshot()
+        os.mkdir('restore')
+        self.store.restore(third, 'restore')
+        self.assertEqual(self.read_db(os.path.join('restore', optic.STORAGE_DB)), ['α', 'β', 'γ'])
+
+    def test_prune_runs_at_most_once_per_interval(self):
+        with open(optic.FILE_NAME, mode='w', encoding='utf-8') as file:
+            file.write("1,Γιώργος\n")
+        self.store.snapshot()
+        self.assertIsNotNone(self.store.prune_if_due())
+        self.assertIsNone(self.store.prune_if_due())
+        self.assertIsNotNone(self.store.prune_if_due(interval=0))
@@ -0,0 +1,60 @@
+import base64
+import unittest
+
+import optic
+
+class DrawingFormatTest(unittest.TestCase):
+    def test_round_trip_with_negative_offsets(self):
+        # Διαφορές προς όλες τις κατευθύνσεις και μεγάλες τιμές, που χρειάζονται
+        # varints πολλών bytes μετά το zigzag
+        polylines = [[(10, 10), (5, 30), (-7, 2), (40, -3)], [(300, 200), (-20000, 150), (70000, -90000)]]
+        text = optic.encode_drawing(polylines)
+        self.assertTrue(text.startswith(optic.DRAWING_FORMAT))
+        self.assertEqual(optic.decode_drawing(text), polylines)
+
+    def test_simplified_points_are_dropped(self):
+        text = optic.encode_drawing([[(0, 0), (5, 0), (10, 0), (10, 10)], [(3, 3)]])
+        self.assertEqual(optic.decode_drawing(text), [[(0, 0), (10, 0), (10, 10)]])
+        self.assertEqual(optic.encode_drawing([]), '')
+
+    def test_varints(self):
+        values = [0, 1, -1, 63, -64, 64, 127, -128, 2 ** 40, -(2 ** 40)]
+        out = bytearray()
+        for value in values:
+            optic._write_varint(out, value)
+        self.assertEqual(list(optic._read_varints(bytes(out))), values)
+        self.assertEqual(bytes(out[:3]), b'\x00\x02\x01')
+
+    def test_legacy_segments(self):
+        # Η παλιά μορφή: str μιας λίστας τμημάτων (x1, y1, x2, y2)
+        legacy = str([(1, 2, 30, 40), (30, 40, -5, 60), (100, 100, 120, 90)])
+        expected = [[(1, 2), (30, 40), (-5, 60)], [(100, 100), (120, 90)]]
+        self.assertEqual(optic.decode_drawing(legacy), expected)
+        migrated = optic.migrate_drawing(legacy)
+        self.assertTrue(migrated.startswith(optic.DRAWING_FORMAT))
+        self.assertEqual(optic.decode_drawing(migrated), expected)
+        self.assertEqual(optic.migrate_drawing(migrated), migrated)
+        self.assertEqual(optic.migrate_drawing('[]'), '')
+
+    def test_malformed_input_is_rejected(self):
+        truncated = bytearray()
+        for value in (2, 3, 10, 10):
+            optic._write_varint(truncated, value)
+        for text in (optic.DRAWING_FORMAT + '!!!',
+                     optic.DRAWING_FORMAT + base64.b64encode(bytes(truncated)).decode('ascii'),
+                     "__import__('os').remove('πελάτες.csv')",
+                     "[(1, 2, 3)",
+                     "[(1, 2, 3, 'x')]"):
+            with self.subTest(text=text):
+                self.assertEqual(optic.decode_drawing(text), [])
+        # Ό,τι δεν αναγνωρίζεται μένει όπως είναι κατά τη μετατροπή
+        self.assertEqual(optic.migrate_drawing("όχι σχέδιο"), "όχι σχέδιο")
+
+    def test_migrate_prescriptions(self):
+        storage = optic.CsvStorage()
+        legacy = str([(1, 2, 30, 40), (30, 40, -5, 60)])
+        storage.append_prescription(['2024-01-01 10:00:00', 'Γιώργος'] + [''] * 14 + [legacy, '', '1'])
+        self.assertEqual(storage.migrate_drawings(), 1)
+        self.assertEqual(storage.migrate_drawings(), 0)
+        row = storage.prescriptions_for(1)[0]
+        self.assertEqual(optic.PrescriptionService.drawings(row), ([[(1, 2), (30, 40), (-5, 60)]], []))
@@ -0,0 +1,58 @@
+import unittest
+
+import optic
+
+class CustomerImportTest(unittest.TestCase):
+    def setUp(self):
+        self.storage = optic.JournalStorage()
+        self.customers = optic.CustomerRepository(self.storage)
+        self.service = optic.CustomerService(self.customers, self.storage, optic.DocumentStore())
+
+    def tearDown(self):
+        self.storage.close()
+
+    def write(self, name, text, encoding):
+        with open(name, mode='wb') as file:
+            file.write(text.encode(encoding))
+        return name
+
+    def imported(self):
+        return sorted(row[:5] for row in self.customers.rows.values())
+
+    def test_greek_excel_file(self):
+        # Όπως το αποθηκεύει το ελληνικό Excel: cp1253, ερωτηματικό, CRLF
+        path = self.write('πελάτες_excel.csv',
+                          'Όνομα;Επώνυμο;Τηλέφωνο;Email;Διεύθυνση\r\n'
+                          'Γιώργος;Παπαδόπουλος;6912345678;;"Οδός; 5"\r\n'
+                          'Μαρία;Νικολάου;2101234567;maria@example.gr;Ερμού 1\r\n'
+                          'Ελένη;Λάθος;12345;;\r\n', 'cp1253')
+        result = self.service.import_csv(path)
+        self.assertEqual((result['imported'], result['rejected']), (2, 1))
+        self.assertEqual(self.imported(), [
+            ['Γιώργος', 'Παπαδόπουλος', '6912345678', '', 'Οδός; 5'],
+            ['Μαρία', 'Νικολάου', '2101234567', 'maria@example.gr', 'Ερμού 1'],
+        ])
+
+    def test_comma_file_with_quoted_comma(self):
+        path = self.write('πελάτες_κόμμα.csv',
+                          'Επώνυμο,Όνομα,Διεύθυνση\n'
+                          'Παπαδόπουλος,Γιώργος,"Οδός, 5"\n', 'utf-8-sig')
+        result = self.service.import_csv(path)
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual(self.imported(), [['Γιώργος', 'Παπαδόπουλος', '', '', 'Οδός, 5']])
+
+    def test_quoted_commas_in_semicolon_header(self):
+        # Ο πιο συχνός χαρακτήρας της επικεφαλίδας είναι το κόμμα, μέσα σε
+        # εισαγωγικά· διαχωριστικό είναι το ερωτηματικό
+        path = self.write('πελάτες_εισαγωγικά.csv',
+                          'Όνομα;Επώνυμο;"Διεύθυνση, Οδός, Αριθμός, Τ.Κ."\r\n'
+                          'Γιώργος;Παπαδόπουλος;"Ερμού, 5"\r\n', 'cp1253')
+        result = self.service.import_csv(path)
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual(self.imported(), [['Γιώργος', 'Παπαδόπουλος', '', '', '']])
+
+    def test_single_column_file_is_rejected(self):
+        path = self.write('μία_στήλη.csv', 'Όνομα Επώνυμο\nΓιώργος Παπαδόπουλος\n', 'utf-8')
+        with self.assertRaises(optic.ValidationError):
+            self.service.import_csv(path)
+        self.assertEqual(self.customers.rows, {})
@@ -0,0 +1,103 @@
+import csv
+import os
+import random
+import unittest
+
+import optic
+
+PRODUCTS = [('Γυαλιά Ηλίου Ray-Ban', 'Γυαλιά Ηλίου'), ('Φακοί Επαφής Μηνιαίοι', 'Φακοί Επαφής'),
+            ('Υγρό Φακών 360ml', 'Αξεσουάρ'), ('Σκελετός Οράσεως', 'Σκελετοί'), ('Θήκη Γυαλιών', 'Αξεσουάρ')]
+
+def sales(rng, count, start=0):
+    # Αποδείξεις με 1-3 γραμμές σε διάφορες ημέρες δύο μηνών
+    rows = []
+    receipt = start
+    while len(rows) < count:
+        receipt += 1
+        date = f"2024-{rng.choice(['04', '05'])}-{rng.randint(1, 28):02d} {rng.randint(9, 20):02d}:15:00"
+        for _ in range(rng.randint(1, 3)):
+            product, category = rng.choice(PRODUCTS)
+            quantity = rng.randint(1, 4)
+            price = rng.choice([4.5, 19.99, 89.9, 120.0])
+            rows.append([date, f"R{receipt}", product, category, str(quantity), f"{price:.2f}",
+                         f"{quantity * price:.2f}"])
+    return rows, receipt
+
+def recompute():
+    # Τα σύνολα από την αρχή, με απλή ανάγνωση ολόκληρου του πωλήσεις.csv
+    days, months, products, categories, month_products = {}, {}, {}, {}, {}
+    last_receipt = None
+    with open(optic.SALES_CSV, mode='r', newline='', encoding='utf-8') as file:
+        for row in list(csv.reader(file))[1:]:
+            date, receipt, product, category = row[:4]
+            quantity, cents = int(row[4]), round(float(row[6]) * 100)
+            new_receipt = int(receipt != last_receipt)
+            last_receipt = receipt
+            for totals in (days.setdefault(date[:10], [0, 0, 0]), months.setdefault(date[:7], [0, 0, 0])):
+                totals[0] += quantity
+                totals[1] += cents
+                totals[2] += new_receipt
+            key = optic.normalize_text(product)
+            entry = products.setdefault(key, [product, category, 0, 0])
+            entry[2] += quantity
+            entry[3] += cents
+            for totals in (categories.setdefault(category, [0, 0]),
+                           month_products.setdefault(date[:7], {}).setdefault(key, [0, 0])):
+                totals[0] += quantity
+                totals[1] += cents
+    return days, months, products, categories, month_products
+
+class SalesLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(3)
+        self.storage = optic.JournalStorage()
+        self.receipt = 0
+
+    def tearDown(self):
+        self.storage.close()
+
+    def append(self, count):
+        rows, self.receipt = sales(self.rng, count, self.receipt)
+        self.storage.append_sales(rows)
+
+    def assertMatchesRecompute(self, ledger):
+        self.assertEqual((ledger.days, ledger.months, ledger.products, ledger.categories, ledger.month_products),
+                         recompute())
+
+    def test_incremental_refresh(self):
+        ledger = optic.SalesLedger(self.storage)
+        for count in (1, 40, 300):
+            self.append(count)
+            ledger.refresh()
+            self.assertMatchesRecompute(ledger)
+        totals = ledger.totals()
+        self.assertEqual(totals['revenue'], sum(row[1] for row in ledger.months.values()) / 100)
+
+    def test_rebuild_after_rollup_is_deleted(self):
+        self.append(500)
+        optic.SalesLedger(self.storage).close()
+        self.assertTrue(os.path.exists(optic.SALES_ROLLUP_FILE))
+        os.remove(optic.SALES_ROLLUP_FILE)
+        ledger = optic.SalesLedger(self.storage)
+        self.assertMatchesRecompute(ledger)
+        self.assertTrue(os.path.exists(optic.SALES_ROLLUP_FILE))
+
+    def test_resume_from_checkpoint(self):
+        self.append(500)
+        optic.SalesLedger(self.storage).close()
+        self.append(200)
+        ledger = optic.SalesLedger(self.storage)
+        # Διαβάστηκαν μόνο οι γραμμές που προστέθηκαν μετά το checkpoint
+        self.assertEqual(ledger.pending, 200)
+        self.assertMatchesRecompute(ledger)
+
+    def test_replaced_ledger_is_read_from_start(self):
+        self.append(300)
+        optic.SalesLedger(self.storage).close()
+        # Π.χ. επαναφορά από αντίγραφο ασφαλείας με λιγότερες πωλήσεις
+        with open(optic.SALES_CSV, mode='r', newline='', encoding='utf-8') as file:
+            rows = list(csv.reader(file))
+        with open(optic.SALES_CSV, mode='w', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerows(rows[:120])
+        ledger = optic.SalesLedger(self.storage)
+        self.assertMatchesRecompute(ledger)
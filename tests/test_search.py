@@ -0,0 +1,91 @@
+import random
+import unittest
+from unittest import mock
+
+import optic
+
+NAMES = ['Γιώργος', 'Μαρία', 'Ελένη', 'Νίκος', 'Άννα', 'Παναγιώτης', 'Ευλαΐα', 'Χρήστος', 'Σοφία']
+SURNAMES = ['Παπαδόπουλος', 'Νικολάου', 'Γεωργίου', 'ΚΑΡΑΓΙΑΝΝΗΣ', 'Οικονόμου', 'Δημητρίου', 'Ζαΐμης']
+STREETS = ['Ερμού', 'Σταδίου', 'Πανεπιστημίου', 'Αγίου Δημητρίου', 'Ελ. Βενιζέλου']
+QUERIES = {
+    'name': ['γιω', 'ΠΑΠΑ', 'όπουλος', 'ος', 'α', 'γ π', 'ιωργ παπαδ', 'ευλαια', 'ζαϊμησ', 'καραγιάννης', 'ξξξ', ' '],
+    'phone': ['691', '69', '210 12', '2101234', '0000'],
+    'email': ['exam', '@', 'gr', 'maria.'],
+    'address': ['ερμ', 'αγιου δημ', 'ου', '1', 'ελ. β'],
+}
+
+def customer(rng, customer_id):
+    name, surname = rng.choice(NAMES), rng.choice(SURNAMES)
+    phone = rng.choice(['69', '21']) + ''.join(rng.choice('0123456789') for _ in range(8))
+    email = rng.choice(['', f"{optic.fold_text(name)[:4]}.{customer_id}@example.gr", f"c{customer_id}@mail.com"])
+    address = f"{rng.choice(STREETS)} {rng.randint(1, 120)}"
+    return [name, surname, phone, email, address, '', '', str(customer_id)]
+
+class FoldTextTest(unittest.TestCase):
+    def test_accents_case_and_final_sigma(self):
+        self.assertEqual(optic.fold_text('Γιώργος'), 'γιωργοσ')
+        self.assertEqual(optic.fold_text('ΆΝΝΑ  Παπαδοπούλου'), 'αννα παπαδοπουλου')
+        self.assertEqual(optic.fold_text('Ευλαΐα Ζαΐμη'), 'ευλαια ζαιμη')
+        self.assertEqual(optic.fold_text(' Café '), 'cafe')
+
+class CustomerSearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.storage = optic.JournalStorage()
+        self.customers = optic.CustomerRepository(self.storage)
+        self.customers.add_many([customer(self.rng, customer_id) for customer_id in range(1, 301)])
+        self.index = optic.CustomerSearchIndex(self.customers)
+        self.index.rebuild()
+
+    def tearDown(self):
+        self.storage.close()
+
+    def brute_force(self, field, text):
+        # Απλό φιλτράρισμα υποσυμβολοσειρών πάνω σε όλους τους πελάτες
+        if field == 'phone':
+            words = optic.normalize_phone(text).split()
+        else:
+            words = optic.fold_text(text).split()
+        if not words:
+            return []
+        results = []
+        for row_id, row in self.customers.rows.items():
+            if field == 'name':
+                value = optic.fold_text(f"{row[0]} {row[1]}")
+            elif field == 'phone':
+                value = optic.normalize_phone(row[2])
+            else:
+                value = optic.fold_text(row[3 if field == 'email' else 4])
+            if all(word in value for word in words):
+                results.append(row_id)
+        return sorted(results)
+
+    def check(self):
+        for field, queries in QUERIES.items():
+            for query in queries:
+                with self.subTest(field=field, query=query):
+                    self.assertEqual(self.index.search(field, query), self.brute_force(field, query))
+
+    def test_matches_substring_filter(self):
+        self.check()
+        self.assertTrue(self.index.search('name', 'ΓΙΏΡΓΟΣ παπαδοπουλος'))
+
+    def test_follows_repository_changes(self):
+        self.customers.add(customer(self.rng, 301))
+        self.customers.update(5, ['Ευλαΐα', 'Ζαΐμη', '6900000000', 'nea@example.gr', 'Ερμού 200', '', '', '5'])
+        deleted = self.customers.by_id[6]
+        self.customers.delete(6)
+        self.customers.add_many([customer(self.rng, customer_id) for customer_id in range(302, 310)])
+        self.check()
+        self.assertIn(self.customers.by_id[5], self.index.search('name', 'ζαιμη'))
+        self.assertNotIn(deleted, self.index.search('phone', '69') + self.index.search('phone', '21'))
+
+    def test_many_updates_rebuild(self):
+        # Μετά από πολλές αλλαγές οι παλιές αναφορές ξαναχτίζονται από την αρχή
+        with mock.patch.object(self.index, 'rebuild', wraps=self.index.rebuild) as rebuild:
+            for _ in range(4):
+                for customer_id in range(1, 301):
+                    self.customers.update(customer_id, customer(self.rng, customer_id))
+        self.assertEqual(rebuild.call_count, 1)
+        self.assertEqual(self.index.stale, 4 * 300 - 1001)
+        self.check()
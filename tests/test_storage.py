@@ -0,0 +1,212 @@
+import csv
+import json
+import unittest
+import zlib
+from unittest import mock
+
+import optic
+
+GEORGE = ['Γιώργος', 'Παπαδόπουλος', '6912345678', '', 'Ερμού 1', '', '', '1']
+MARIA = ['Μαρία', 'Νικολάου', '2101234567', '', '', '', '', '2']
+ELENI = ['Ελένη', 'Γεωργίου', '', '', '', '', '', '3']
+
+class FailedGroupTest(unittest.TestCase):
+    # Μια ομάδα εγγραφών που δεν ολοκληρώνεται δεν αφήνει αλλαγές ούτε στη
+    # μνήμη της αποθήκευσης ούτε στα αποθετήρια
+    def open(self, factory):
+        storage = factory()
+        self.addCleanup(storage.close)
+        customers = optic.CustomerRepository(storage)
+        customers.add(list(GEORGE))
+        return storage, customers
+
+    def fail_group(self, storage, customers):
+        # Στα CSV αποτυγχάνει το commit της ομάδας, στη SQLite η συναλλαγή
+        # ακυρώνεται από εξαίρεση μέσα στο block
+        with mock.patch.object(optic.AtomicWriteGroup, 'commit', side_effect=OSError("γεμάτος δίσκος")):
+            with self.assertRaises(OSError):
+                with storage.atomic():
+                    customers.update(1, ['Γιώργος', 'Αλλαγμένος'] + GEORGE[2:])
+                    customers.add(list(MARIA))
+                    if isinstance(storage, optic.SqliteStorage):
+                        raise OSError("γεμάτος δίσκος")
+
+    def check(self, factory):
+        storage, customers = self.open(factory)
+        self.fail_group(storage, customers)
+        self.assertEqual(customers.all(), [GEORGE])
+        self.assertIsNone(customers.get(2))
+        # Οι επόμενες αλλαγές γράφονται πάνω στη σωστή κατάσταση
+        customers.add(list(ELENI))
+        self.assertEqual(sorted(customers.all()), sorted([GEORGE, ELENI]))
+        reopened = factory()
+        try:
+            self.assertEqual(sorted(row for _, row in reopened.load_rows('customers')), sorted([GEORGE, ELENI]))
+        finally:
+            reopened.close()
+
+    def test_csv(self):
+        self.check(optic.CsvStorage)
+
+    def test_journal(self):
+        self.check(optic.JournalStorage)
+
+    def test_journal_state(self):
+        storage, customers = self.open(optic.JournalStorage)
+        state = dict(storage.state['customers'])
+        disk_ids = dict(storage.disk_ids['customers'])
+        next_disk = storage.next_disk['customers']
+        self.fail_group(storage, customers)
+        self.assertEqual(storage.state['customers'], state)
+        self.assertEqual(storage.disk_ids['customers'], disk_ids)
+        self.assertEqual(storage.next_disk['customers'], next_disk)
+
+    def test_sqlite(self):
+        self.check(lambda: optic.SqliteStorage(optic.STORAGE_DB))
+
+    def test_customer_service_reloads(self):
+        storage, customers = self.open(optic.JournalStorage)
+        service = optic.CustomerService(customers, storage, optic.DocumentStore())
+        with mock.patch.object(optic.AtomicWriteGroup, 'commit', side_effect=OSError("γεμάτος δίσκος")):
+            with self.assertRaises(OSError):
+                service.update(1, 'Γιώργος', 'Αλλαγμένος', '6912345678')
+        self.assertEqual(list(customers.rows.values()), [GEORGE])
+
+    def test_failed_delete_keeps_documents(self):
+        storage, customers = self.open(optic.JournalStorage)
+        documents = optic.DocumentStore()
+        with open('συνταγή.pdf', mode='wb') as file:
+            file.write(b'%PDF-1.4')
+        ref = documents.put('συνταγή.pdf')
+        service = optic.CustomerService(customers, storage, documents)
+        service.update(1, 'Γιώργος', 'Παπαδόπουλος', '6912345678', documents=[ref])
+        with mock.patch.object(optic.AtomicWriteGroup, 'commit', side_effect=OSError("γεμάτος δίσκος")):
+            with self.assertRaises(OSError):
+                service.delete(1)
+        self.assertEqual(service.documents_for(1), [ref])
+        self.assertTrue(documents.exists(ref))
+        self.assertEqual(service.delete(1), [])
+        self.assertFalse(documents.exists(ref))
+
+    def test_failed_link_delete_aborts_customer_delete(self):
+        # Αν αποτύχει το ξαναγράψιμο των σημειώσεων, δεν γράφεται ούτε η
+        # διαγραφή του πελάτη ούτε των συνταγών του
+        storage, customers = self.open(optic.JournalStorage)
+        service = optic.CustomerService(customers, storage, optic.DocumentStore())
+        optic.PrescriptionService(storage).add(1, 'Γιώργος Παπαδόπουλος', range(14))
+        optic.NotesService(storage).add(1, 'Γιώργος Παπαδόπουλος', 'Φακοί επαφής')
+        rewrite = storage._rewrite
+        def failing_rewrite(table, rows):
+            if table == 'notes':
+                raise OSError("γεμάτος δίσκος")
+            rewrite(table, rows)
+        with mock.patch.object(storage, '_rewrite', side_effect=failing_rewrite):
+            with self.assertRaises(OSError):
+                service.delete(1)
+        self.assertEqual(customers.all(), [GEORGE])
+        self.assertEqual(len(storage.prescriptions_for(1)), 1)
+        self.assertEqual(len(storage.notes_for(1)), 1)
+
+class JournalStorageTest(unittest.TestCase):
+    def rows(self, storage):
+        return [row for _, row in storage.load_rows('customers')]
+
+    def journal(self):
+        with open(optic.FILE_NAME + '.journal', mode='rb') as file:
+            return file.read()
+
+    def write_changes(self):
+        storage = optic.JournalStorage()
+        storage.load_rows('customers')
+        george = storage.insert_row('customers', list(GEORGE))
+        maria = storage.insert_row('customers', list(MARIA))
+        storage.insert_rows('customers', [list(ELENI)])
+        storage.update_row('customers', george, ['Γιώργος', 'Αλλαγμένος'] + GEORGE[2:], None)
+        storage.delete_rows('customers', [maria], None)
+        # Χωρίς close(), που θα συμπύκνωνε το journal
+        return storage
+
+    def test_replay(self):
+        self.write_changes()
+        with open(optic.FILE_NAME, mode='rb') as file:
+            self.assertEqual(len(file.read().splitlines()), 1)
+        self.assertEqual(len(self.journal().splitlines()), 6)
+        storage = optic.JournalStorage()
+        self.addCleanup(storage.close)
+        self.assertEqual(self.rows(storage), [['Γιώργος', 'Αλλαγμένος'] + GEORGE[2:], ELENI])
+        self.assertEqual(storage.records['customers'], 5)
+
+    def test_truncated_last_record(self):
+        self.write_changes()
+        complete = self.journal()
+        with open(optic.FILE_NAME + '.journal', mode='ab') as file:
+            file.write('{"op": "insert", "row": ["Μισογραμμένη'.encode('utf-8'))
+        storage = optic.JournalStorage()
+        self.addCleanup(storage.close)
+        self.assertEqual(self.rows(storage), [['Γιώργος', 'Αλλαγμένος'] + GEORGE[2:], ELENI])
+        self.assertEqual(self.journal(), complete)
+        # Οι επόμενες εγγραφές συνεχίζουν από το σωστό σημείο
+        storage.insert_row('customers', list(MARIA))
+        reopened = optic.JournalStorage()
+        self.assertEqual(len(self.rows(reopened)), 3)
+
+    def test_compaction(self):
+        storage = self.write_changes()
+        expected = self.rows(storage)
+        storage.compact('customers')
+        header = json.loads(self.journal().decode('utf-8'))
+        self.assertEqual(self.journal().count(b'\n'), 1)
+        with open(optic.FILE_NAME, mode='rb') as file:
+            self.assertEqual(header['snapshot'], zlib.crc32(file.read()))
+        self.assertEqual(storage.records['customers'], 0)
+        with open(optic.FILE_NAME, mode='r', newline='', encoding='utf-8') as file:
+            self.assertEqual(list(csv.reader(file))[1:], expected)
+        # Οι αλλαγές μετά τη συμπύκνωση γράφονται πάνω στις νέες θέσεις
+        row_id = next(row_id for row_id, row in storage.load_rows('customers') if row == ELENI)
+        storage.update_row('customers', row_id, ['Ελένη', 'Νέα'] + ELENI[2:], None)
+        reopened = optic.JournalStorage()
+        self.assertEqual(self.rows(reopened), [expected[0], ['Ελένη', 'Νέα'] + ELENI[2:]])
+
+    def test_journal_of_an_older_snapshot_is_ignored(self):
+        # Διακοπή ανάμεσα στις δύο μετονομασίες της συμπύκνωσης: το νέο
+        # στιγμιότυπο έχει ήδη γραφτεί, το journal είναι ακόμα το παλιό
+        storage = self.write_changes()
+        old_journal = self.journal()
+        expected = self.rows(storage)
+        storage.compact('customers')
+        with open(optic.FILE_NAME + '.journal', mode='wb') as file:
+            file.write(old_journal)
+        reopened = optic.JournalStorage()
+        self.addCleanup(reopened.close)
+        self.assertEqual(self.rows(reopened), expected)
+        self.assertEqual(reopened.records['customers'], 0)
+
+class OffsetIndexTest(unittest.TestCase):
+    def test_appends_are_saved_on_close(self):
+        storage = optic.CsvStorage()
+        notes = optic.NotesService(storage)
+        self.assertEqual(storage.max_linked_id(), 0)
+        index_path = optic.NOTES_CSV + '.idx'
+        with open(index_path, mode='rb') as file:
+            saved = file.read()
+        for customer_id in (3, 7, 3):
+            notes.add(customer_id, 'Πελάτης', f"Σημείωση {customer_id}")
+        # Το ευρετήριο στον δίσκο δεν ξαναγράφεται σε κάθε προσθήκη
+        with open(index_path, mode='rb') as file:
+            self.assertEqual(file.read(), saved)
+        self.assertEqual([row[2] for row in storage.notes_for(3)], ['Σημείωση 3', 'Σημείωση 3'])
+        self.assertEqual(storage.max_linked_id(), 7)
+        storage.close()
+        reopened = optic.CsvStorage()
+        self.addCleanup(reopened.close)
+        with mock.patch.object(optic.CsvOffsetIndex, 'rebuild', side_effect=AssertionError("rebuild")):
+            self.assertEqual(len(reopened.notes_for(3)), 2)
+            self.assertEqual(reopened.max_linked_id(), 7)
+
+    def test_unsaved_index_is_rebuilt(self):
+        storage = optic.CsvStorage()
+        storage.max_linked_id()
+        optic.NotesService(storage).add(5, 'Πελάτης', 'Χωρίς close()')
+        reopened = optic.CsvStorage()
+        self.addCleanup(reopened.close)
+        self.assertEqual([row[2] for row in reopened.notes_for(5)], ['Χωρίς close()'])